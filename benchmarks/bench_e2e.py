@@ -0,0 +1,183 @@
+"""
+Сквозной бенчмарк на локальном заменителе магазина (benchmarks/standin.py), без сети.
+Сценарии: разбор прайса, извлечение цены из карточек всех шаблонов, полная
+проверка цен check_prices и обход sitemap-файлов. Каждый сценарий выполняется
+в отдельном процессе: замеряются пропускная способность и пиковый RSS.
+Запуск: python benchmarks/bench_e2e.py [--offers N] [--check-offers N]
+        [--latency SEC] [--error-rate P] [--save-baseline]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tests', 'sitemap'))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from standin import StandInShop, TEMPLATES, offer_price
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+PAGES_PER_TEMPLATE = 300
+
+
+def peak_rss_mb():
+    """Пиковый RSS текущего процесса, МБ (None, если недоступно)"""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def bench_feed(shop_url, options):
+    """Потоковая загрузка и разбор прайса: товаров в секунду"""
+    from feed import iter_offers
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_offers(shop_url + "/yml/feed.xml"))
+    elapsed = time.perf_counter() - start
+    return {"offers": count, "offers_per_sec": round(count / elapsed)}
+
+
+def bench_parse_price(shop_url, options):
+    """parse_price на карточках всех шаблонов stand-in: страниц в секунду"""
+    from price_parser import parse_price, SelectorStats
+    pages = []
+    for pid in range(1, PAGES_PER_TEMPLATE + 1):
+        for section, template in TEMPLATES.items():
+            price = offer_price(pid)
+            html = template.format(pid=pid, price=price, spaced=f"{price:,.0f}".replace(",", "\xa0"))
+            pages.append((f"{shop_url}/{section}/item?pid={pid}", html.encode("utf-8")))
+    stats = SelectorStats()
+    start = time.perf_counter()
+    for url, page in pages:
+        parse_price(page, url, stats)
+    elapsed = time.perf_counter() - start
+    return {"pages": len(pages), "pages_per_sec": round(len(pages) / elapsed)}
+
+
+def bench_check_prices(shop_url, options):
+    """Полная проверка цен через HTTP: товаров в секунду"""
+    import main
+    main.XML_URL = shop_url + "/yml/feed.xml"
+    start = time.perf_counter()
+    main.check_prices(full=True, concurrency=options["concurrency"], rate_per_host=1e6,
+                      use_http_cache=False)
+    elapsed = time.perf_counter() - start
+    return {"offers": options["offers"], "offers_per_sec": round(options["offers"] / elapsed, 1)}
+
+
+def bench_sitemaps(shop_url, options):
+    """Обход дерева sitemap-файлов: URL в секунду"""
+    import check_sitemaps
+    start = time.perf_counter()
+    results = check_sitemaps.crawl_sitemaps([shop_url + "/sitemap.xml"])
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for _, ok, _ in results if not ok)
+    return {"files": len(results), "failed": failed, "urls_per_sec": round(options["offers"] / elapsed)}
+
+
+# Сценарий -> (функция, размер прайса stand-in: ключ в options)
+SCENARIOS = {
+    "feed": (bench_feed, "offers"),
+    "parse_price": (bench_parse_price, None),
+    "check_prices": (bench_check_prices, "check_offers"),
+    "sitemaps": (bench_sitemaps, "offers"),
+}
+
+
+def _run_in_child(name, shop_url, options, queue):
+    """Тело дочернего процесса: сценарий во временном каталоге, вывод подавлен"""
+    func = SCENARIOS[name][0]
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = func(shop_url, options)
+    result["peak_rss_mb"] = peak_rss_mb()
+    queue.put(result)
+
+
+def run_scenario(name, options):
+    """Поднимает stand-in нужного размера и выполняет сценарий в отдельном процессе"""
+    size_key = SCENARIOS[name][1]
+    offers = options[size_key] if size_key else 1
+    with StandInShop(offers=offers, latency=options["latency"], error_rate=options["error_rate"],
+                     sitemap_files=options["sitemap_files"]) as shop:
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(target=_run_in_child,
+                                  args=(name, shop.url, dict(options, offers=offers), queue))
+        process.start()
+        result = queue.get()
+        process.join()
+    return result
+
+
+def compare(results, baseline):
+    """Строки сравнения с базовыми значениями: изменение каждой метрики в процентах"""
+    lines = []
+    for name, metrics in results.items():
+        base = baseline.get("results", {}).get(name, {})
+        for key, value in metrics.items():
+            old = base.get(key)
+            if not isinstance(value, (int, float)) or not old:
+                continue
+            lines.append(f"{name}.{key}: {old} -> {value} ({(value - old) / old * 100:+.1f}%)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--offers", type=int, default=100_000,
+                        help="товаров в прайсе для разбора прайса и sitemap (10 000 - 1 000 000)")
+    parser.add_argument("--check-offers", type=int, default=2_000,
+                        help="товаров в прайсе для полной проверки цен по HTTP")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа stand-in, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503 на карточки")
+    parser.add_argument("--sitemap-files", type=int, default=8, help="дочерних sitemap-файлов")
+    parser.add_argument("--concurrency", type=int, default=32, help="потолок параллельности check_prices")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="выполнить только указанные сценарии")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="файл базовых значений")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="сохранить результаты как базовые значения")
+    args = parser.parse_args()
+
+    options = {
+        "offers": args.offers,
+        "check_offers": args.check_offers,
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "sitemap_files": args.sitemap_files,
+        "concurrency": args.concurrency,
+    }
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(name, options)
+        print(f"{name:<14} " + ", ".join(f"{key}: {value}" for key, value in results[name].items()))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nБазовые значения сохранены: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("options") != options:
+            print("\nВНИМАНИЕ: параметры отличаются от базовых, сравнение приблизительное")
+        print("\nСравнение с базовыми значениями:")
+        for line in compare(results, baseline):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Микро-бенчмарк извлечения цены: страниц в секунду для каждого уровня price_parser
+и для пула процессов parse_pool с разным числом обработчиков.
+Запуск: python benchmarks/bench_parse_price.py [--pages N] [--workers 1,2,4,8]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from parse_pool import ParsePool
+from price_parser import (
+    parse_price, extract_price_fast, extract_price_lxml, extract_price_soup,
+    extract_price_regex,
+)
+
+# Типичная карточка товара: ~40 КБ разметки, цена в <head> и в блоке товара
+FILLER = "".join(
+    f'<li class="menu-item"><a href="/catalog/{i}">Раздел каталога {i}</a></li>' for i in range(400)
+)
+PAGE_TEMPLATE = (
+    '<!DOCTYPE html><html><head><title>Турбина</title>'
+    '<meta itemprop="price" content="{price}"></head><body>'
+    '<nav><ul>' + FILLER + '</ul></nav>'
+    '<div class="product"><h1>Турбина</h1><div class="price">{price} ₽</div></div>'
+    '<footer>Контакты</footer></body></html>'
+)
+
+TIERS = [
+    ("fast (bytes regex)", extract_price_fast),
+    ("lxml.html + XPath", extract_price_lxml),
+    ("BeautifulSoup", extract_price_soup),
+    ("regex по тексту", extract_price_regex),
+    ("parse_price", parse_price),
+]
+
+
+def bench(func, pages):
+    """Возвращает страниц в секунду для func на списке pages"""
+    start = time.perf_counter()
+    for page in pages:
+        func(page)
+    return len(pages) / (time.perf_counter() - start)
+
+
+def bench_pool(workers, pages):
+    """Страниц в секунду через ParsePool из workers процессов (без учёта запуска пула)"""
+    with ParsePool(workers) as pool:
+        # Прогрев: процессы стартуют и импортируют price_parser
+        for pending in [pool.submit(page) for page in pages[:workers * 2]]:
+            pending.result()
+        start = time.perf_counter()
+        for pending in [pool.submit(page) for page in pages]:
+            pending.result()
+        return len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200, help="страниц на каждый уровень")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}",
+                        help="число процессов пула через запятую; 0 — не замерять пул")
+    args = parser.parse_args()
+
+    pages = [PAGE_TEMPLATE.format(price=1000 + i).encode("utf-8") for i in range(args.pages)]
+    print(f"Страниц: {len(pages)}, размер страницы: {len(pages[0]) // 1024} КБ")
+    for name, func in TIERS:
+        print(f"{name:<22} {bench(func, pages):>10.0f} стр/сек")
+    for workers in sorted({int(n) for n in args.workers.split(",") if int(n) > 0}):
+        print(f"{f'ParsePool x{workers}':<22} {bench_pool(workers, pages * 5):>10.0f} стр/сек")
+
+
+if __name__ == "__main__":
+    main()
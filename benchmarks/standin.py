@@ -0,0 +1,229 @@
+"""
+Локальный заменитель магазина для бенчмарков и офлайн-тестов.
+Отдаёт синтетический YML-прайс любого размера (генерируется на лету, не
+хранится в памяти), карточки товаров в нескольких шаблонах, robots.txt и
+дерево sitemap-файлов. Задержка ответа и доля ошибок 503 настраиваются.
+
+    with StandInShop(offers=10_000, latency=0.005) as shop:
+        shop.feed_url      # http://127.0.0.1:<порт>/yml/feed.xml
+        shop.sitemap_url   # http://127.0.0.1:<порт>/sitemap.xml
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FEED_PATH = "/yml/feed.xml"
+SITEMAP_PATH = "/sitemap.xml"
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+FEED_BATCH = 1000   # Товаров в одном куске chunked-ответа прайса
+
+# Раздел каталога -> шаблон карточки: цена в <meta> (быстрый уровень
+# price_parser), в блоке .product-price (lxml) или только в тексте (regex)
+SECTIONS = ("turbo", "parts", "misc")
+FILLER = "".join(
+    f'<li class="menu-item"><a href="/catalog/{i}">Раздел каталога {i}</a></li>' for i in range(400)
+)
+TEMPLATES = {
+    "turbo": (
+        '<!DOCTYPE html><html><head><title>Турбина {pid}</title>'
+        '<meta itemprop="price" content="{price:.0f}"></head><body><nav><ul>' + FILLER + '</ul></nav>'
+        '<div class="product"><h1>Турбина {pid}</h1></div></body></html>'
+    ),
+    "parts": (
+        '<!DOCTYPE html><html><head><title>Запчасть {pid}</title></head><body>'
+        '<nav><ul>' + FILLER + '</ul></nav>'
+        '<div class="card"><h1>Запчасть {pid}</h1>'
+        '<div class="product-price">{spaced} ₽</div></div></body></html>'
+    ),
+    "misc": (
+        '<!DOCTYPE html><html><head><title>Товар {pid}</title></head><body>'
+        '<nav><ul>' + FILLER + '</ul></nav>'
+        '<p>Товар {pid}. Цена: {price:.0f} руб. Доставка по России.</p></body></html>'
+    ),
+}
+
+
+def offer_price(pid):
+    """Цена товара в прайсе — детерминированная функция pid"""
+    return float(500 + (pid * 7919) % 100_000)
+
+
+def offer_path(pid):
+    """Путь карточки товара; раздел (и шаблон) определяется pid"""
+    return f"/{SECTIONS[pid % len(SECTIONS)]}/item?pid={pid}"
+
+
+class _Server(ThreadingHTTPServer):
+    # Очередь listen() по умолчанию — 5 соединений: при параллельной загрузке
+    # лишние SYN отбрасываются, и клиент повторяет соединение через секунду
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StandInShop:
+    """
+    HTTP-сервер в фоновом потоке на свободном порту 127.0.0.1.
+    offers — товаров в прайсе; latency — задержка каждого ответа, сек;
+    error_rate — доля запросов карточек, на которые отвечает 503;
+    mismatch_rate — доля товаров, цена которых на странице отличается
+    от прайса на 500 RUB; sitemap_files — число дочерних sitemap-файлов.
+    """
+
+    def __init__(self, offers=10_000, latency=0.0, error_rate=0.0, mismatch_rate=0.0,
+                 sitemap_files=4, crawl_delay=None, seed=1):
+        self.offers = offers
+        self.latency = latency
+        self.error_rate = error_rate
+        self.mismatch_rate = mismatch_rate
+        self.sitemap_files = max(1, sitemap_files)
+        self.crawl_delay = crawl_delay
+        self.seed = seed
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.server = _Server(("127.0.0.1", 0), self._handler_class())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = None
+
+    @property
+    def feed_url(self):
+        return self.url + FEED_PATH
+
+    @property
+    def sitemap_url(self):
+        return self.url + SITEMAP_PATH
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def site_price(self, pid):
+        """Цена на карточке товара (с учётом mismatch_rate)"""
+        price = offer_price(pid)
+        if self.mismatch_rate and random.Random(pid * 31 + self.seed).random() < self.mismatch_rate:
+            price += 500
+        return price
+
+    def _inject_error(self):
+        with self.lock:
+            self.requests += 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return True
+        return False
+
+    def iter_feed(self):
+        """YML-прайс кусками по FEED_BATCH товаров"""
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<yml_catalog date="2026-01-01 00:00"><shop><name>Stand-in</name>'
+               '<categories><category id="1">Турбины</category></categories><offers>\n').encode("utf-8")
+        for start in range(1, self.offers + 1, FEED_BATCH):
+            parts = []
+            for pid in range(start, min(start + FEED_BATCH, self.offers + 1)):
+                parts.append(
+                    f'<offer id="{pid}" available="true"><url>{self.url}{offer_path(pid)}</url>'
+                    f'<price>{offer_price(pid):.0f}</price><categoryId>1</categoryId>'
+                    f'<vendor>Vendor{pid % 50}</vendor></offer>\n'
+                )
+            yield "".join(parts).encode("utf-8")
+        yield b"</offers></shop></yml_catalog>\n"
+
+    def iter_sitemap(self, index):
+        """Дочерний sitemap-файл index со своей долей карточек товаров"""
+        lastmod = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'.encode("utf-8")
+        pids = range(index + 1, self.offers + 1, self.sitemap_files)
+        for start in range(0, len(pids), FEED_BATCH):
+            yield "".join(
+                f"<url><loc>{self.url}{offer_path(pid)}</loc><lastmod>{lastmod}</lastmod></url>\n"
+                for pid in pids[start:start + FEED_BATCH]
+            ).encode("utf-8")
+        yield b"</urlset>\n"
+
+    def sitemap_index(self):
+        lastmod = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        entries = "".join(
+            f"<sitemap><loc>{self.url}/sitemaps/{i}.xml</loc><lastmod>{lastmod}</lastmod></sitemap>"
+            for i in range(self.sitemap_files)
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{SITEMAP_NS}">{entries}</sitemapindex>'.encode("utf-8")
+
+    def robots(self):
+        lines = ["User-agent: *", "Disallow: /admin", f"Sitemap: {self.sitemap_url}"]
+        if self.crawl_delay:
+            lines.insert(1, f"Crawl-delay: {self.crawl_delay:g}")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _handler_class(self):
+        shop = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело уходят разными send: с алгоритмом Нейгла и
+            # отложенным ACK клиента каждый ответ keep-alive ждал бы ~40 мс
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if shop.latency:
+                    time.sleep(shop.latency)
+                parts = urlsplit(self.path)
+                if parts.path == FEED_PATH:
+                    return self._send_chunked("application/xml", shop.iter_feed())
+                if parts.path == SITEMAP_PATH:
+                    return self._send(200, "application/xml", shop.sitemap_index())
+                if parts.path == "/robots.txt":
+                    return self._send(200, "text/plain", shop.robots())
+                if parts.path.startswith("/sitemaps/"):
+                    try:
+                        index = int(parts.path[len("/sitemaps/"):].split(".")[0])
+                    except ValueError:
+                        index = -1
+                    if 0 <= index < shop.sitemap_files:
+                        return self._send_chunked("application/xml", shop.iter_sitemap(index))
+                    return self._send(404, "text/plain", b"not found")
+                section = parts.path.strip("/").split("/")[0]
+                pid = parse_qs(parts.query).get("pid", [""])[0]
+                if section in TEMPLATES and pid.isdigit() and 1 <= int(pid) <= shop.offers:
+                    if shop._inject_error():
+                        return self._send(503, "text/plain", b"unavailable")
+                    price = shop.site_price(int(pid))
+                    spaced = f"{price:,.0f}".replace(",", "\xa0")
+                    page = TEMPLATES[section].format(pid=pid, price=price, spaced=spaced)
+                    return self._send(200, "text/html; charset=utf-8", page.encode("utf-8"))
+                return self._send(404, "text/plain", b"not found")
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunked(self, content_type, chunks):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
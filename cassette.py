@@ -0,0 +1,194 @@
+"""
+Записанные HTTP-ответы для быстрых тестов без сети.
+Кассета — gzip-файл со строками JSON: первая — точки входа записи
+(URL прайса и индекса sitemap), остальные — ответы: метод, URL, статус,
+нужные заголовки и тело. Cassette воспроизводит их с интерфейсом
+HttpClient (get/head/request), поэтому check_prices, check_sitemaps и
+разбор цены работают с кассетой как с сайтом (use_cassette подменяет
+общий клиент http_client.default_client).
+
+record_site записывает кассету с сайта: robots.txt, прайс, урезанный до
+первых max_offers товаров, страницы этих товаров, индекс sitemap (первые
+max_sitemaps файлов) и сами sitemap-файлы (первые max_urls URL). Обновить
+кассету тестов:
+
+    python cassette.py --out tests/cassettes/shop.jsonl.gz
+"""
+import argparse
+import base64
+import gzip
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+from feed import parse_offers
+from http_cache import CachedResponse
+from settings import XML_URL, HEADERS
+from sitemaps import SITEMAP_INDEX_URL, iter_sitemap_entries
+
+MAX_OFFERS = 30      # Товаров прайса (и страниц товаров) в кассете
+MAX_SITEMAPS = 5     # Sitemap-файлов из индекса
+MAX_URLS = 200       # URL в каждом sitemap-файле
+# Заголовки, которые сохраняются в кассете; Content-Length считается по телу
+KEEP_HEADERS = ("Content-Type", "Location", "ETag", "Last-Modified", "Retry-After")
+FEED_TAIL = "</offers></shop></yml_catalog>"
+
+
+def trim_xml(body, tag, limit, tail):
+    """
+    Оставляет в XML body первые limit элементов <tag> и закрывает документ
+    строкой tail. Если элементов не больше limit, body возвращается как есть.
+    """
+    closing = f"</{tag}>".encode("utf-8")
+    end = 0
+    for _ in range(limit):
+        found = body.find(closing, end)
+        if found < 0:
+            return body
+        end = found + len(closing)
+    if body.find(closing, end) < 0:
+        return body
+    return body[:end] + b"\n" + tail.encode("utf-8") + b"\n"
+
+
+class Cassette:
+    """
+    Записанные ответы по (метод, URL). Запрос, которого нет в кассете,
+    завершается requests.ConnectionError (как недоступный сайт) и
+    попадает в misses — тесты проверяют, что кассета покрывает прогон.
+    """
+
+    def __init__(self, meta=None):
+        self.meta = dict(meta or {})
+        self.entries = {}
+        self.misses = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            cassette = cls(json.loads(f.readline())["meta"])
+            for line in f:
+                record = json.loads(line)
+                if "body_b64" in record:
+                    body = base64.b64decode(record["body_b64"])
+                else:
+                    body = record["body"].encode("utf-8")
+                cassette.entries[(record["method"], record["url"])] = (
+                    record["status"], record["headers"], record["encoding"], body,
+                )
+        return cassette
+
+    def save(self, path):
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=9) as f:
+            f.write(json.dumps({"meta": self.meta}, ensure_ascii=False) + "\n")
+            for (method, url), (status, headers, encoding, body) in self.entries.items():
+                record = {"method": method, "url": url, "status": status, "headers": headers, "encoding": encoding}
+                try:
+                    record["body"] = body.decode("utf-8")
+                except UnicodeDecodeError:
+                    record["body_b64"] = base64.b64encode(body).decode("ascii")
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def add(self, method, url, status, headers, body, encoding=None):
+        """Сохраняет ответ; из заголовков остаются только KEEP_HEADERS"""
+        kept = {name: headers[name] for name in KEEP_HEADERS if headers.get(name) is not None}
+        with self.lock:
+            self.entries[(method, url)] = (status, kept, encoding, body)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, url, headers=None, timeout=15, stream=False):
+        return self.request("GET", url, headers=headers, timeout=timeout, stream=stream)
+
+    def head(self, url, headers=None, timeout=15):
+        return self.request("HEAD", url, headers=headers, timeout=timeout, allow_redirects=False)
+
+    def request(self, method, url, headers=None, timeout=15, stream=False, allow_redirects=True):
+        """Записанный ответ (http_cache.CachedResponse); редиректы не проходятся"""
+        entry = self.entries.get((method, url))
+        if entry is None:
+            with self.lock:
+                self.misses.append((method, url))
+            raise requests.ConnectionError(f"Нет в кассете: {method} {url}")
+        status, headers, encoding, body = entry
+        response_headers = CaseInsensitiveDict(headers)
+        response_headers["Content-Length"] = str(len(body))
+
+        def chunks(chunk_size):
+            for i in range(0, len(body), chunk_size):
+                yield body[i:i + chunk_size]
+
+        return CachedResponse(url, status, response_headers, encoding, chunks, True)
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def use_cassette(path):
+    """Общий HTTP-клиент на время блока with — кассета из path"""
+    cassette = Cassette.load(path)
+    previous = http_client.set_default_client(cassette)
+    try:
+        yield cassette
+    finally:
+        http_client.set_default_client(previous)
+
+
+def record_site(path, feed_url=XML_URL, sitemap_url=SITEMAP_INDEX_URL, max_offers=MAX_OFFERS,
+                max_sitemaps=MAX_SITEMAPS, max_urls=MAX_URLS, http=None):
+    """Записывает кассету path с сайта (см. описание модуля); возвращает Cassette"""
+    http = http or http_client.default_client()
+    cassette = Cassette({
+        "feed_url": feed_url,
+        "sitemap_url": sitemap_url,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+
+    def fetch(url, trim=None):
+        with http.get(url, headers=HEADERS, timeout=30) as response:
+            body = response.content
+            if trim is not None and response.status_code == 200:
+                body = trim_xml(body, *trim)
+            cassette.add("GET", url, response.status_code, response.headers, body, response.encoding)
+        print(f"[{response.status_code}] {url} ({len(body)} байт)")
+        return response.status_code, body
+
+    for site in dict.fromkeys(urlsplit(url)[:2] for url in (feed_url, sitemap_url)):
+        fetch(f"{site[0]}://{site[1]}/robots.txt")
+
+    status, feed = fetch(feed_url, ("offer", max_offers, FEED_TAIL))
+    if status == 200:
+        for offer in parse_offers([feed]):
+            fetch(offer.url)
+
+    status, index = fetch(sitemap_url, ("sitemap", max_sitemaps, "</sitemapindex>"))
+    if status == 200:
+        for entry in iter_sitemap_entries([index]):
+            if entry.kind == "sitemap" and entry.loc:
+                fetch(entry.loc, ("url", max_urls, "</urlset>"))
+
+    cassette.save(path)
+    print(f"Кассета сохранена: {path}, ответов: {len(cassette)}")
+    return cassette
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запись кассеты HTTP-ответов для тестов")
+    parser.add_argument("--out", required=True, help="файл кассеты (.jsonl.gz)")
+    parser.add_argument("--feed", default=XML_URL, help="URL YML-прайса")
+    parser.add_argument("--sitemap", default=SITEMAP_INDEX_URL, help="URL индекса sitemap")
+    parser.add_argument("--max-offers", type=int, default=MAX_OFFERS, help="товаров прайса в кассете")
+    parser.add_argument("--max-sitemaps", type=int, default=MAX_SITEMAPS, help="sitemap-файлов из индекса")
+    parser.add_argument("--max-urls", type=int, default=MAX_URLS, help="URL в каждом sitemap-файле")
+    args = parser.parse_args()
+
+    record_site(args.out, args.feed, args.sitemap, args.max_offers, args.max_sitemaps, args.max_urls)
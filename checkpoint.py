@@ -0,0 +1,54 @@
+"""
+Контрольные точки полной проверки цен.
+Результаты отдаются в порядке прайса, поэтому прогресс — это число
+прочитанных товаров прайса (все до него проверены или отфильтрованы)
+и хеш этого начала прайса. После каждой порции в JSON сохраняются
+позиция, хеш, размеры журнала результатов и счётчики; --resume
+пропускает начало прайса, если его хеш не изменился, и дописывает тот
+же журнал.
+"""
+import hashlib
+import json
+import os
+
+
+class FeedHash:
+    """Накопительный хеш товаров прайса (URL и цена) в порядке чтения"""
+
+    def __init__(self):
+        self._hash = hashlib.blake2b(digest_size=16)
+
+    def update(self, offer):
+        self._hash.update(f"{offer.url}\t{offer.price!r}\n".encode("utf-8"))
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class Checkpoint:
+    """Состояние прогона в JSON-файле path; запись атомарная (временный файл и замена)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Сохранённое состояние (dict) или None, если файла нет или он повреждён"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, **state):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        """Удаляет контрольную точку (прогон завершён)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
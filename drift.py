@@ -0,0 +1,217 @@
+"""
+Статистика расхождений цен прайса и сайта.
+Пары цен (прайс, сайт) копятся по ходу проверки в колоночном виде
+(OfferStore и array('d')), а после прогона обрабатываются векторно в NumPy:
+распределение расхождений, сводки по категориям и производителям из прайса
+(categoryId, vendor) и самые большие расхождения. Допуск сравнения задают
+правила DriftRules: в рублях и в процентах от цены прайса, с отдельными
+значениями для категорий и производителей.
+"""
+import json
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from offer_store import OfferStore
+
+DEFAULT_ABS_TOLERANCE = 10.0   # Допуск в RUB (прежняя проверка ±10 RUB)
+DEFAULT_PCT_TOLERANCE = 0.0    # Допуск в процентах от цены прайса
+TOP_OUTLIERS = 10              # Самых больших расхождений в отчёте
+TOP_GROUPS = 10                # Категорий и производителей в отчёте
+PERCENTILES = (5, 25, 50, 75, 95)
+# Границы корзин распределения расхождения, % от цены прайса
+DRIFT_BUCKETS = (-50, -20, -10, -5, -1, 1, 5, 10, 20, 50)
+
+# Сводка по категории или производителю
+GroupDrift = namedtuple("GroupDrift", "name count mismatches mean_pct max_abs_pct")
+# Товар с большим расхождением
+Outlier = namedtuple("Outlier", "url feed_price site_price pct")
+
+
+class DriftRules:
+    """
+    Допуск расхождения цены: max(abs_tolerance RUB, pct_tolerance % цены прайса).
+    categories и vendors — {categoryId или vendor: {"abs": RUB, "pct": %}};
+    правило производителя важнее правила категории, а оно — общего.
+    Ключ, которого нет в правиле, берётся из правила уровнем выше.
+    """
+
+    def __init__(self, abs_tolerance=DEFAULT_ABS_TOLERANCE, pct_tolerance=DEFAULT_PCT_TOLERANCE,
+                 categories=None, vendors=None):
+        self.abs_tolerance = float(abs_tolerance)
+        self.pct_tolerance = float(pct_tolerance)
+        self.categories = dict(categories or {})
+        self.vendors = dict(vendors or {})
+
+    @classmethod
+    def load(cls, path, abs_tolerance=DEFAULT_ABS_TOLERANCE, pct_tolerance=DEFAULT_PCT_TOLERANCE):
+        """
+        Правила из JSON: {"abs": 10, "pct": 0, "categories": {...}, "vendors": {...}}.
+        abs_tolerance и pct_tolerance — значения, если в файле нет "abs" и "pct".
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("abs", abs_tolerance), data.get("pct", pct_tolerance),
+                   data.get("categories"), data.get("vendors"))
+
+    def rule(self, category_id=None, vendor=None):
+        """(допуск RUB, допуск %) для товара"""
+        abs_tolerance, pct_tolerance = self.abs_tolerance, self.pct_tolerance
+        for override in (self.categories.get(category_id), self.vendors.get(vendor)):
+            if override:
+                abs_tolerance = float(override.get("abs", abs_tolerance))
+                pct_tolerance = float(override.get("pct", pct_tolerance))
+        return abs_tolerance, pct_tolerance
+
+    def tolerance(self, feed_price, category_id=None, vendor=None):
+        """Допустимое расхождение в RUB для товара с ценой feed_price"""
+        abs_tolerance, pct_tolerance = self.rule(category_id, vendor)
+        return max(abs_tolerance, pct_tolerance * feed_price / 100)
+
+    def tolerances(self, store):
+        """Векторный tolerance: массив допусков в RUB для всех товаров OfferStore"""
+        # Допуски правила для каждого кода словаря, затем выборка по кодам товаров
+        categories = np.array(store.categories.column, dtype=np.intp)
+        vendors = np.array(store.vendors.column, dtype=np.intp)
+        category_rules = np.array([self.rule(value) for value in store.categories.values],
+                                  dtype=np.float64)
+        abs_tolerance = category_rules[categories, 0]
+        pct_tolerance = category_rules[categories, 1]
+        # У производителя могут быть заданы не оба ключа: пропуски — NaN
+        vendor_rules = np.full((len(store.vendors.values), 2), np.nan)
+        for code, value in enumerate(store.vendors.values):
+            override = self.vendors.get(value) or {}
+            vendor_rules[code] = (override.get("abs", np.nan), override.get("pct", np.nan))
+        vendor_abs = vendor_rules[vendors, 0]
+        vendor_pct = vendor_rules[vendors, 1]
+        abs_tolerance = np.where(np.isnan(vendor_abs), abs_tolerance, vendor_abs)
+        pct_tolerance = np.where(np.isnan(vendor_pct), pct_tolerance, vendor_pct)
+        feed_prices = np.array(store.prices, dtype=np.float64)
+        return np.maximum(abs_tolerance, pct_tolerance * feed_prices / 100)
+
+
+class PricePairs:
+    """
+    Товары, цена которых найдена на сайте: товары в OfferStore (без индексов
+    по PID и id — analyze они не нужны), цены сайта в array('d')
+    """
+
+    def __init__(self):
+        self.offers = OfferStore(indexed=False)
+        self.site_prices = array('d')
+
+    def append(self, offer, price_site):
+        self.offers.append(offer)
+        self.site_prices.append(price_site)
+
+    def __len__(self):
+        return len(self.site_prices)
+
+
+class DriftReport:
+    """Результат analyze(): распределение, сводки по группам и выбросы"""
+
+    def __init__(self, count, mismatches, higher, lower, percentiles, mean_abs_diff,
+                 buckets, categories, vendors, outliers):
+        self.count = count
+        self.mismatches = mismatches
+        self.higher = higher
+        self.lower = lower
+        self.percentiles = percentiles
+        self.mean_abs_diff = mean_abs_diff
+        self.buckets = buckets
+        self.categories = categories
+        self.vendors = vendors
+        self.outliers = outliers
+
+    def summary_lines(self):
+        """Строки сводки для консоли и текстового отчёта"""
+        lines = [
+            f"Пар цен: {self.count}, вне допуска: {self.mismatches} "
+            f"({self.mismatches / max(self.count, 1) * 100:.1f}%)",
+            f"Сайт дороже: {self.higher}, дешевле: {self.lower}, "
+            f"среднее |разница|: {self.mean_abs_diff:.0f} RUB",
+            "Расхождение, % от прайса: " + ", ".join(
+                f"p{p} {value:+.1f}" for p, value in zip(PERCENTILES, self.percentiles)
+            ),
+            "Распределение, %: " + " | ".join(f"{label}: {n}" for label, n in self.buckets if n),
+        ]
+        for title, groups in (("Категории", self.categories), ("Производители", self.vendors)):
+            if not groups:
+                continue
+            lines.append(f"{title} (больше всего расхождений):")
+            for group in groups:
+                lines.append(f"  {group.name}: {group.count} товаров, вне допуска {group.mismatches}, "
+                             f"среднее {group.mean_pct:+.1f}%, до ±{group.max_abs_pct:.1f}%")
+        if self.outliers:
+            lines.append("Самые большие расхождения:")
+            for outlier in self.outliers:
+                lines.append(f"  {outlier.url}: прайс {outlier.feed_price:.0f} RUB, "
+                             f"сайт {outlier.site_price:.0f} RUB ({outlier.pct:+.1f}%)")
+        return lines
+
+
+def _bucket_labels():
+    edges = DRIFT_BUCKETS
+    return ([f"<{edges[0]}"] + [f"{low}..{high}" for low, high in zip(edges, edges[1:])]
+            + [f">{edges[-1]}"])
+
+
+def _group_stats(codes, values, pct, mismatch, top):
+    """Сводки GroupDrift по кодам словаря: сначала группы с наибольшим числом расхождений"""
+    size = len(values)
+    counts = np.bincount(codes, minlength=size)
+    mismatches = np.bincount(codes, weights=mismatch, minlength=size)
+    pct_sums = np.bincount(codes, weights=pct, minlength=size)
+    max_abs_pct = np.zeros(size)
+    np.maximum.at(max_abs_pct, codes, np.abs(pct))
+    present = np.flatnonzero(counts)
+    # Группы без значения в прайсе (код 0, None) показываются как «—»
+    order = present[np.lexsort((-counts[present], -mismatches[present]))][:top]
+    return [
+        GroupDrift("—" if values[code] is None else values[code], int(counts[code]),
+                   int(mismatches[code]), pct_sums[code] / counts[code], max_abs_pct[code])
+        for code in order
+    ]
+
+
+def analyze(pairs, rules=None, top=TOP_OUTLIERS, top_groups=TOP_GROUPS):
+    """
+    Векторная статистика расхождений по PricePairs. Расхождение считается
+    относительно цены прайса; вне допуска — |сайт - прайс| больше допуска
+    rules (DriftRules, по умолчанию ±DEFAULT_ABS_TOLERANCE RUB).
+    """
+    rules = rules or DriftRules()
+    store = pairs.offers
+    feed = np.array(store.prices, dtype=np.float64)
+    site = np.array(pairs.site_prices, dtype=np.float64)
+    category_codes = np.array(store.categories.column, dtype=np.intp)
+    vendor_codes = np.array(store.vendors.column, dtype=np.intp)
+
+    diff = site - feed
+    pct = np.divide(diff * 100, feed, out=np.zeros_like(diff), where=feed != 0)
+    tolerance = rules.tolerances(store)
+    mismatch = np.abs(diff) > tolerance
+
+    count = len(diff)
+    percentiles = np.percentile(pct, PERCENTILES) if count else np.zeros(len(PERCENTILES))
+    histogram, _ = np.histogram(pct, bins=[-np.inf, *DRIFT_BUCKETS, np.inf])
+
+    abs_pct = np.abs(pct)
+    top = min(top, count)
+    outlier_rows = np.argpartition(-abs_pct, top - 1)[:top] if top else np.array([], dtype=np.intp)
+    outlier_rows = outlier_rows[np.argsort(-abs_pct[outlier_rows], kind="stable")]
+
+    return DriftReport(
+        count=count,
+        mismatches=int(mismatch.sum()),
+        higher=int((diff > 0).sum()),
+        lower=int((diff < 0).sum()),
+        percentiles=[float(value) for value in percentiles],
+        mean_abs_diff=float(np.abs(diff).mean()) if count else 0.0,
+        buckets=list(zip(_bucket_labels(), (int(n) for n in histogram))),
+        categories=_group_stats(category_codes, store.categories.values, pct, mismatch, top_groups),
+        vendors=_group_stats(vendor_codes, store.vendors.values, pct, mismatch, top_groups),
+        outliers=[Outlier(store.url(row), feed[row], site[row], float(pct[row])) for row in outlier_rows],
+    )
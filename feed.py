@@ -0,0 +1,75 @@
+"""
+Потоковая загрузка YML-прайса.
+Прайс читается по частям и разбирается инкрементально (XMLPullParser),
+каждый <offer> удаляется из дерева сразу после обработки, поэтому
+потребление памяти не зависит от размера файла.
+"""
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+from http_client import default_client
+
+CHUNK_BYTES = 64 * 1024
+
+# Компактная запись о товаре из прайса
+Offer = namedtuple("Offer", "price url offer_id available category_id vendor")
+
+
+def _offer_record(elem):
+    """Собирает Offer из элемента <offer>; None, если нет url или цены"""
+    url = elem.findtext('url')
+    price_text = elem.findtext('price')
+    if not url or price_text is None:
+        return None
+    try:
+        price = float(price_text)
+    except ValueError:
+        return None
+    return Offer(
+        price=price,
+        url=url.strip(),
+        offer_id=elem.get('id'),
+        available=elem.get('available'),
+        category_id=elem.findtext('categoryId'),
+        vendor=elem.findtext('vendor'),
+    )
+
+
+def parse_offers(chunks):
+    """
+    Инкрементально разбирает YML из итератора байтовых кусков
+    и отдаёт Offer по мере появления закрытых тегов </offer>.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    container = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if elem.tag == "offers":
+                    container = elem
+                continue
+            if elem.tag != "offer":
+                continue
+            record = _offer_record(elem)
+            elem.clear()
+            if container is not None:
+                try:
+                    container.remove(elem)
+                except ValueError:
+                    pass
+            if record is not None:
+                yield record
+    parser.close()
+
+
+def iter_offers(url, headers=None, timeout=30, http=None):
+    """
+    Загружает прайс по url потоково и отдаёт Offer по одному.
+    http — HttpClient или HttpCache (по умолчанию общий HttpClient).
+    Ошибки сети и разбора XML пробрасываются вызывающему коду.
+    """
+    http = http or default_client()
+    with http.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        yield from parse_offers(response.iter_content(CHUNK_BYTES))
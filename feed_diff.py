@@ -0,0 +1,216 @@
+"""
+Изменения прайса между запусками.
+Для каждого товара считается отпечаток — 64-битный хеш URL, цены и
+наличия. Отпечатки хранятся на диске в компактном индексе, отсортированном
+по ключу товара (PID или URL, см. feeds.offer_key): около 33 байт на товар
+плюс URL. Следующий прогон за один потоковый проход по прайсу отдаёт
+добавленные и изменившиеся товары, в конце — удалённые, и строит новый
+индекс. Поиск в старом индексе — бинарный, страницы сайта не загружаются.
+"""
+import bisect
+import hashlib
+import os
+import struct
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from feeds import offer_key
+from offer_store import AVAILABLE_CODES, AVAILABLE_VALUES
+from sitemaps import KEY_BUFFER, UrlKeySet
+
+MAGIC = b"GTFIDX1\n"
+HEADER = struct.Struct("<8sQ")   # Сигнатура и число товаров
+
+# Изменение товара: kind — added, changed или removed; old_* — значения
+# из прошлого прогона (None для добавленного), price/available — текущие
+# (None для удалённого)
+FeedChange = namedtuple("FeedChange", "kind url price available old_price old_available")
+
+def offer_fingerprint(offer):
+    """64-битный отпечаток товара: URL, цена и наличие"""
+    data = f"{offer.url}\t{offer.price!r}\t{offer.available}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def _available_code(available):
+    return AVAILABLE_CODES.get(available, AVAILABLE_CODES[None])
+
+
+class FingerprintIndex:
+    """
+    Отпечатки товаров, отсортированные по ключу: параллельные массивы
+    keys, fingerprints, prices, available и URL в общем буфере urls
+    (границы — offsets). Файл — те же массивы подряд после заголовка.
+    """
+
+    def __init__(self, keys=None, fingerprints=None, prices=None, available=None, offsets=None, urls=b""):
+        self.keys = keys if keys is not None else array('Q')
+        self.fingerprints = fingerprints if fingerprints is not None else array('Q')
+        self.prices = prices if prices is not None else array('d')
+        self.available = available if available is not None else array('b')
+        self.offsets = offsets if offsets is not None else array('Q', [0])
+        self.urls = urls
+
+    @classmethod
+    def load(cls, path):
+        """Индекс из файла path или None, если файла нет или он повреждён"""
+        try:
+            with open(path, "rb") as f:
+                magic, count = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC:
+                    return None
+                arrays = []
+                for typecode, length in (('Q', count), ('Q', count), ('d', count), ('b', count), ('Q', count + 1)):
+                    values = array(typecode)
+                    values.fromfile(f, length)
+                    arrays.append(values)
+                urls = f.read()
+        except (OSError, EOFError, struct.error):
+            return None
+        if len(urls) != arrays[4][-1]:
+            return None
+        return cls(*arrays, urls=urls)
+
+    def save(self, path):
+        """Записывает индекс атомарно (временный файл и замена)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self.keys)))
+            for values in (self.keys, self.fingerprints, self.prices, self.available, self.offsets):
+                values.tofile(f)
+            f.write(self.urls)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, key):
+        """Номер строки товара с ключом key или -1"""
+        row = bisect.bisect_left(self.keys, key)
+        if row < len(self.keys) and self.keys[row] == key:
+            return row
+        return -1
+
+    def url(self, row):
+        return self.urls[self.offsets[row]:self.offsets[row + 1]].decode("utf-8")
+
+
+class FeedDiff:
+    """
+    Сравнение прайса с индексом прошлого прогона previous.
+    update() вызывается для каждого товара в порядке прайса и возвращает
+    FeedChange (added/changed) или None для товара без изменений;
+    removed() после прохода отдаёт товары, которых больше нет в прайсе;
+    index() — индекс текущего прайса для следующего прогона.
+    discard(row) оставляет товар строки row (номер среди update(), см.
+    len()) в новом индексе таким, как в прошлом: следующий прогон снова
+    отдаст его как добавленный или изменившийся.
+    Повтор товара с тем же ключом не учитывается.
+    """
+
+    def __init__(self, previous=None, added_buffer=KEY_BUFFER):
+        self.previous = previous if previous is not None else FingerprintIndex()
+        self.seen = bytearray(len(self.previous))
+        # Повторы добавленных товаров — по ключам в отсортированном массиве
+        self.added_keys = UrlKeySet(buffer_size=added_buffer)
+        self.added = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.removed_count = 0
+        # Строки нового индекса в порядке прайса
+        self._keys = array('Q')
+        self._fingerprints = array('Q')
+        self._prices = array('d')
+        self._available = array('b')
+        self._offsets = array('Q', [0])
+        self._urls = bytearray()
+        self._discarded = bytearray()
+
+    def __len__(self):
+        """Товаров, прошедших через update() (строк нового индекса)"""
+        return len(self._keys)
+
+    def update(self, offer):
+        key = offer_key(offer.url)
+        fingerprint = offer_fingerprint(offer)
+        row = self.previous.find(key)
+        if row < 0:
+            if not self.added_keys.add(key):
+                return None
+            change = FeedChange("added", offer.url, offer.price, offer.available, None, None)
+            self.added += 1
+        else:
+            if self.seen[row]:
+                return None
+            self.seen[row] = 1
+            if self.previous.fingerprints[row] == fingerprint:
+                change = None
+                self.unchanged += 1
+            else:
+                change = FeedChange("changed", offer.url, offer.price, offer.available, self.previous.prices[row],
+                                    AVAILABLE_VALUES[self.previous.available[row]])
+                self.changed += 1
+        self._keys.append(key)
+        self._fingerprints.append(fingerprint)
+        self._prices.append(offer.price)
+        self._available.append(_available_code(offer.available))
+        self._urls += offer.url.encode("utf-8")
+        self._offsets.append(len(self._urls))
+        self._discarded.append(0)
+        return change
+
+    def discard(self, row):
+        """Строка row не попадает в новый индекс: остаётся строка прошлого (у добавленного — никакой)"""
+        self._discarded[row] = 1
+
+    def removed(self):
+        """Товары прошлого прогона, которых не было среди update()"""
+        previous = self.previous
+        for row, seen in enumerate(self.seen):
+            if not seen:
+                self.removed_count += 1
+                yield FeedChange("removed", previous.url(row), None, None, previous.prices[row],
+                                 AVAILABLE_VALUES[previous.available[row]])
+
+    def index(self):
+        """Индекс товаров, прошедших через update(), отсортированный по ключу"""
+        previous = self.previous
+        index = FingerprintIndex()
+        urls = bytearray()
+        # Порядок строк — argsort в NumPy, без списка номеров всех строк
+        for row in np.argsort(np.frombuffer(self._keys, dtype=np.uint64), kind="stable"):
+            row = int(row)
+            if self._discarded[row]:
+                old = previous.find(self._keys[row])
+                if old < 0:
+                    continue
+                index.keys.append(previous.keys[old])
+                index.fingerprints.append(previous.fingerprints[old])
+                index.prices.append(previous.prices[old])
+                index.available.append(previous.available[old])
+                urls += previous.urls[previous.offsets[old]:previous.offsets[old + 1]]
+            else:
+                index.keys.append(self._keys[row])
+                index.fingerprints.append(self._fingerprints[row])
+                index.prices.append(self._prices[row])
+                index.available.append(self._available[row])
+                urls += self._urls[self._offsets[row]:self._offsets[row + 1]]
+            index.offsets.append(len(urls))
+        index.urls = bytes(urls)
+        return index
+
+    def summary_line(self):
+        return (f"добавлено {self.added}, изменилось {self.changed}, удалено {self.removed_count}, "
+                f"без изменений {self.unchanged}")
+
+
+def diff_offers(offers, diff):
+    """Поток изменений: добавленные и изменившиеся товары по ходу offers, затем удалённые"""
+    for offer in offers:
+        change = diff.update(offer)
+        if change is not None:
+            yield change
+    yield from diff.removed()
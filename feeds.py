@@ -0,0 +1,232 @@
+"""
+Несколько YML-прайсов одновременно.
+Каждый прайс загружается и разбирается потоково в своём потоке, товары
+пишутся во временный файл прайса (_Spool): загрузка идёт с полной
+скоростью сети и не ждёт ни проверки, ни других прайсов, поэтому
+N прайсов загружаются примерно за время самого большого. Из файлов
+товары читаются по очереди из каждого прайса (round-robin), поэтому
+порядок объединённого потока не зависит от скорости загрузки — на нём
+работают контрольные точки --resume. Товар, который есть в нескольких
+прайсах (тот же PID или URL), отдаётся один раз; для отчёта запоминается,
+в каких прайсах он есть, и расхождения цен между прайсами.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from array import array
+
+from feed import Offer, iter_offers
+from http_client import is_transient
+from offer_store import extract_pid
+
+MAX_FEEDS = 64         # Прайсов в одном FeedMerger: маска прайсов товара — 64 бита
+SPOOL_FLUSH = 256      # Товаров между сбросами временного файла, пока читатель не ждёт
+MAX_CONFLICTS = 100    # Расхождений цен между прайсами в отчёте
+PRICE_EPSILON = 0.005  # Цены в прайсах сравниваются с точностью до копейки
+
+
+def offer_key(url):
+    """64-битный ключ товара: по PID, а без него — по URL"""
+    pid = extract_pid(url)
+    key = f"pid:{pid}" if pid is not None else url.strip()
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def read_feed_list(path):
+    """URL прайсов из файла: по одному в строке, # — комментарий"""
+    with open(path, encoding="utf-8") as f:
+        urls = (line.split("#", 1)[0].strip() for line in f)
+        return [url for url in urls if url]
+
+
+class _Spool:
+    """
+    Товары одного прайса во временном файле. Поток загрузки дописывает
+    их через put() и finish(); читатель (iter) получает товары по порядку
+    и ждёт, только если догнал запись, — тогда запись сбрасывается на диск
+    после каждого товара. Ошибка загрузки пробрасывается читателю после
+    всех товаров, записанных до неё.
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="feed_", suffix=".spool")
+        self.writer = os.fdopen(fd, "wb")
+        self.reader = open(self.path, "rb")
+        self.condition = threading.Condition()
+        self.committed = 0    # Байт целых записей, доступных читателю
+        self.pending = 0      # Товаров записано после последнего сброса
+        self.waiting = False  # Читатель догнал запись и ждёт
+        self.done = False
+        self.error = None
+
+    def put(self, offer):
+        pickle.dump(tuple(offer), self.writer, pickle.HIGHEST_PROTOCOL)
+        self.pending += 1
+        if self.pending >= SPOOL_FLUSH or self.waiting:
+            self._commit()
+
+    def _commit(self):
+        self.writer.flush()
+        self.pending = 0
+        with self.condition:
+            self.committed = self.writer.tell()
+            self.condition.notify_all()
+
+    def finish(self, error=None):
+        """Запись окончена: весь прайс или ошибка error"""
+        try:
+            self._commit()
+        except Exception as e:
+            error = error or e
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def __iter__(self):
+        while True:
+            with self.condition:
+                while self.reader.tell() >= self.committed and not self.done:
+                    self.waiting = True
+                    self.condition.wait()
+                self.waiting = False
+                if self.reader.tell() >= self.committed:
+                    if self.error is not None:
+                        raise self.error
+                    return
+            yield Offer(*pickle.load(self.reader))
+
+    def close(self):
+        self.writer.close()
+        self.reader.close()
+        os.remove(self.path)
+
+
+class FeedMerger:
+    """
+    Объединённый поток Offer из прайсов urls (не больше MAX_FEEDS) без
+    повторов; с одним прайсом товары отдаются как есть. Ошибка загрузки
+    или разбора любого прайса пробрасывается из итератора, когда до этого
+    прайса доходит очередь, — как и с одним прайсом, прогон не завершён.
+    """
+
+    def __init__(self, urls, headers=None, timeout=30, http=None):
+        self.urls = list(urls)
+        if len(self.urls) > MAX_FEEDS:
+            raise ValueError(f"Не больше {MAX_FEEDS} прайсов, получено {len(self.urls)}")
+        self.headers = headers
+        self.timeout = timeout
+        self.http = http
+        self.read = [0] * len(self.urls)         # Товаров прочитано из каждого прайса
+        self.duplicates = [0] * len(self.urls)   # Из них уже встречались раньше
+        self.conflicts = []                      # (url, прайс, цена, прайс, цена)
+        self.conflict_count = 0
+        # Ключ товара -> строка: маска прайсов, где он есть, первый прайс и цена в нём
+        self.rows = {}
+        self.masks = array('Q')
+        self.first_feeds = array('H')
+        self.prices = array('d')
+
+    def _produce(self, index, spool, stop):
+        """Поток загрузки прайса index: товары в spool, пока не установлен stop"""
+        error = None
+        try:
+            for offer in iter_offers(self.urls[index], headers=self.headers, timeout=self.timeout,
+                                     http=self.http):
+                if stop.is_set():
+                    break
+                spool.put(offer)
+        except Exception as e:
+            error = e
+        finally:
+            spool.finish(error)
+
+    def _accept(self, index, offer):
+        """Учитывает товар прайса index; True, если он встретился впервые"""
+        self.read[index] += 1
+        if len(self.urls) == 1:
+            return True
+        key = offer_key(offer.url)
+        row = self.rows.get(key)
+        if row is None:
+            self.rows[key] = len(self.masks)
+            self.masks.append(1 << index)
+            self.first_feeds.append(index)
+            self.prices.append(offer.price)
+            return True
+        self.duplicates[index] += 1
+        mask = self.masks[row]
+        if abs(self.prices[row] - offer.price) > PRICE_EPSILON and not mask & (1 << index):
+            self.conflict_count += 1
+            if len(self.conflicts) < MAX_CONFLICTS:
+                self.conflicts.append((offer.url, self.first_feeds[row], self.prices[row], index, offer.price))
+        self.masks[row] = mask | (1 << index)
+        return False
+
+    def __iter__(self):
+        stop = threading.Event()
+        spools = []
+        threads = []
+        try:
+            for index in range(len(self.urls)):
+                spools.append(_Spool())
+                threads.append(threading.Thread(target=self._produce, args=(index, spools[index], stop),
+                                                daemon=True))
+                threads[-1].start()
+            readers = [iter(spool) for spool in spools]
+            active = list(range(len(self.urls)))
+            while active:
+                for index in list(active):
+                    offer = next(readers[index], None)
+                    if offer is None:
+                        active.remove(index)
+                    elif self._accept(index, offer):
+                        yield offer
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for spool in spools:
+                spool.close()
+
+    def feeds_of(self, url):
+        """Номера прайсов, в которых есть товар url"""
+        if len(self.urls) == 1:
+            return [0]
+        row = self.rows.get(offer_key(url))
+        mask = self.masks[row] if row is not None else 0
+        return [index for index in range(len(self.urls)) if mask & (1 << index)]
+
+    def summary_lines(self, results):
+        """
+        Строки отчёта по прайсам: прочитано, повторов, проверено и итоги
+        проверки товаров каждого прайса по результатам results
+        (price_csv, url, price_site, status). Общий товар учитывается
+        в каждом прайсе, где он есть.
+        """
+        checked = [{"OK": 0, "DIFF": 0, "ERROR": 0, "RETRY": 0} for _ in self.urls]
+        for _, url, _, status in results:
+            if status == "OK":
+                group = "OK"
+            elif status.startswith("DIFF_"):
+                group = "DIFF"
+            elif is_transient(status):
+                group = "RETRY"
+            else:
+                group = "ERROR"
+            for index in self.feeds_of(url):
+                checked[index][group] += 1
+        lines = []
+        for index, url in enumerate(self.urls):
+            counts = checked[index]
+            lines.append(f"{url}: товаров {self.read[index]} (повторов {self.duplicates[index]}), "
+                         f"проверено {sum(counts.values())}: OK {counts['OK']}, расхождений {counts['DIFF']}, "
+                         f"ошибок {counts['ERROR']}, перепроверить {counts['RETRY']}")
+        if self.conflict_count:
+            lines.append(f"Цена товара различается в прайсах: {self.conflict_count}")
+            for url, first_index, first_price, index, price in self.conflicts:
+                lines.append(f"  {url}: {first_price:.0f} RUB в {self.urls[first_index]}, "
+                             f"{price:.0f} RUB в {self.urls[index]}")
+        return lines
@@ -0,0 +1,160 @@
+"""
+Движок параллельной загрузки страниц товаров.
+Ограничивает число одновременных запросов и частоту обращений к каждому хосту
+(token bucket), чтобы не перегружать сайт. AdaptiveConcurrency подбирает
+число одновременных запросов по задержкам и ошибкам сервера (AIMD).
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_CONCURRENCY = 8      # Одновременных запросов
+DEFAULT_RATE_PER_HOST = 4.0  # Запросов в секунду на один хост
+DEFAULT_BURST = 2            # Запас токенов для коротких всплесков
+
+ADAPTIVE_INITIAL = 2         # Начальная параллельность адаптивного режима
+ADAPTIVE_LATENCY_P95 = 2.0   # Порог p95 времени запроса, сек
+ADAPTIVE_ERROR_RATE = 0.05   # Порог доли ответов 429/5xx и таймаутов
+ADAPTIVE_MIN_WINDOW = 4      # Минимум запросов для решения об изменении
+
+
+class TokenBucket:
+    """
+    Ведро токенов: в среднем не более rate запросов в секунду,
+    допускается всплеск до burst запросов подряд.
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate должен быть положительным")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Блокирует поток, пока не появится свободный токен"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    Отдельное ведро токенов для каждого хоста.
+    crawl_delay(url) — Crawl-delay хоста в секундах или None (например,
+    из robots.txt), запрашивается один раз при первом обращении к хосту.
+    Если задержка есть, к хосту — не чаще одного запроса за это время
+    и без всплесков (burst=1).
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_PER_HOST, burst=DEFAULT_BURST, crawl_delay=None):
+        self.rate = rate
+        self.burst = burst
+        self.crawl_delay = crawl_delay
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, url):
+        rate, burst = self.rate, self.burst
+        delay = self.crawl_delay(url) if self.crawl_delay is not None else None
+        if delay:
+            rate, burst = min(rate, 1.0 / delay), 1
+        return TokenBucket(rate, burst)
+
+    def acquire(self, url):
+        """Ждёт разрешения на запрос к хосту из url"""
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+        if bucket is None:
+            # robots.txt загружается вне блокировки: другие хосты не ждут
+            bucket = self._bucket(url)
+            with self.lock:
+                bucket = self.buckets.setdefault(host, bucket)
+        bucket.acquire()
+
+
+class AdaptiveConcurrency:
+    """
+    Ограничение одновременных запросов, которое подстраивается под сервер (AIMD).
+    После каждого окна из max(limit, ADAPTIVE_MIN_WINDOW) завершённых запросов:
+    если p95 времени и доля перегрузок (429/5xx, таймауты) ниже порогов —
+    limit растёт на 1 (до maximum), иначе уменьшается вдвое (до minimum).
+    """
+
+    def __init__(self, maximum, initial=ADAPTIVE_INITIAL, minimum=1,
+                 latency_target=ADAPTIVE_LATENCY_P95, error_rate_max=ADAPTIVE_ERROR_RATE):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = min(self.maximum, max(self.minimum, int(initial)))
+        self.latency_target = latency_target
+        self.error_rate_max = error_rate_max
+        self.in_flight = 0
+        self.peak = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self.latencies = []
+        self.overloads = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Блокирует поток, пока число выполняющихся запросов не меньше limit"""
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, overloaded=False):
+        """Освобождает слот и учитывает время запроса (сек) и признак перегрузки"""
+        with self.condition:
+            self.in_flight -= 1
+            self.latencies.append(latency)
+            if overloaded:
+                self.overloads += 1
+            if len(self.latencies) >= max(self.limit, ADAPTIVE_MIN_WINDOW):
+                self._adjust()
+            self.condition.notify_all()
+
+    def _adjust(self):
+        latencies = sorted(self.latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        error_rate = self.overloads / len(latencies)
+        if p95 <= self.latency_target and error_rate <= self.error_rate_max:
+            if self.limit < self.maximum:
+                self.limit += 1
+                self.increases += 1
+                self.peak = max(self.peak, self.limit)
+        elif self.limit > self.minimum:
+            self.limit = max(self.minimum, self.limit // 2)
+            self.decreases += 1
+        self.latencies = []
+        self.overloads = 0
+
+
+def fetch_all(items, worker, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Выполняет worker(item) для каждого элемента в пуле потоков.
+    Результаты отдаются генератором в исходном порядке; вперёд ставится
+    не больше 2 * concurrency задач, поэтому items может быть генератором
+    любой длины.
+    """
+    concurrency = max(1, int(concurrency))
+    window = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for item in items:
+            window.append(pool.submit(worker, item))
+            if len(window) >= concurrency * 2:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
@@ -0,0 +1,241 @@
+"""
+Дисковый HTTP-кеш с условными запросами.
+Для каждого URL хранится тело ответа и валидаторы ETag/Last-Modified.
+При повторном запросе отправляются If-None-Match/If-Modified-Since,
+и на ответ 304 тело берётся с диска. Общий размер кеша ограничен,
+давно не использованные записи вытесняются (LRU). Размер кеша ведётся
+в памяти, изменения индекса сохраняются пачками (раз в COMMIT_EVERY
+изменений или COMMIT_SECONDS секунд и при завершении процесса).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+import requests
+
+from http_client import default_client, response_charset
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "gt-shop", "http")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CHUNK_BYTES = 64 * 1024
+COMMIT_EVERY = 100     # Изменений индекса между коммитами SQLite
+COMMIT_SECONDS = 1.0   # Но не реже, чем раз в столько секунд
+EVICT_BATCH = 64       # Записей, выбираемых за раз при вытеснении
+
+
+class CachedResponse:
+    """
+    Ответ из сети или из кеша с интерфейсом, похожим на requests.Response.
+    Тело читается потоково (iter_content) или целиком (content/text).
+    retry_wait — как у ответа HttpClient: секунды на повторы запроса.
+    """
+
+    def __init__(self, url, status_code, headers, encoding, chunks, from_cache, close=None, retry_wait=0.0):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.encoding = encoding
+        self.from_cache = from_cache
+        self._chunks = chunks
+        self._close = close
+        self._content = None
+        self.retry_wait = retry_wait
+
+    def raise_for_status(self):
+        """Исключение requests.HTTPError для статусов 4xx/5xx"""
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} для {self.url}", response=self)
+
+    def iter_content(self, chunk_size=CHUNK_BYTES):
+        """Отдаёт тело кусками по chunk_size байт"""
+        if self._content is not None:
+            for i in range(0, len(self._content), chunk_size):
+                yield self._content[i:i + chunk_size]
+            return
+        yield from self._chunks(chunk_size)
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b"".join(self._chunks(CHUNK_BYTES))
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HttpCache:
+    """
+    Кеш ответов GET по URL. Сохраняются только ответы 200 с ETag или
+    Last-Modified. Запросы идут через HttpClient (пул соединений, повторы).
+    Потокобезопасен: индекс в SQLite под общей блокировкой. flush()
+    сохраняет ещё не записанные изменения индекса (при завершении процесса
+    это делается само).
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, client=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.client = client or default_client()
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+            " encoding TEXT, size INTEGER, used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self.db.commit()
+        self.total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.pending = 0                        # Изменений индекса после коммита
+        self.committed_at = time.monotonic()
+        self._finalizer = weakref.finalize(self, self.db.commit)
+
+    def _body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".body")
+
+    def get(self, url, headers=None, timeout=30, stream=True):
+        """
+        Выполняет условный GET. Возвращает CachedResponse; from_cache=True,
+        если сервер ответил 304 и тело взято с диска. Тело всегда читается
+        потоково, stream оставлен для совместимости с HttpClient.get.
+        """
+        path = self._body_path(url)
+        with self.lock:
+            entry = self.db.execute(
+                "SELECT etag, last_modified, encoding FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+
+        request_headers = dict(headers or {})
+        if entry is not None and os.path.exists(path):
+            etag, last_modified, _ = entry
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+        else:
+            entry = None
+
+        response = self.client.get(url, headers=request_headers, timeout=timeout, stream=True)
+        retry_wait = getattr(response, "retry_wait", 0.0)
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            try:
+                body = open(path, "rb")
+            except OSError:
+                # Запись вытеснили между проверкой и чтением — загружаем заново
+                return self.get(url, headers, timeout)
+            with self.lock:
+                self.db.execute("UPDATE entries SET used = ? WHERE url = ?", (time.time(), url))
+                self._changed()
+            return CachedResponse(url, 200, {}, entry[2], self._file_chunks(body), True, body.close, retry_wait)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return CachedResponse(url, response.status_code, response.headers, response.encoding,
+                                  response.iter_content, False, response.close, retry_wait)
+
+        def chunks(chunk_size):
+            yield from self._store_chunks(url, path, response, etag, last_modified, chunk_size)
+
+        return CachedResponse(url, 200, response.headers, response.encoding, chunks, False, response.close,
+                              retry_wait)
+
+    @staticmethod
+    def _file_chunks(body):
+        def chunks(chunk_size):
+            with body:
+                while True:
+                    chunk = body.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+        return chunks
+
+    def _store_chunks(self, url, path, response, etag, last_modified, chunk_size):
+        """Отдаёт тело ответа и параллельно пишет его во временный файл кеша"""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        size = 0
+        complete = False
+        try:
+            with open(tmp_path, "wb") as tmp:
+                for chunk in response.iter_content(chunk_size):
+                    size += len(chunk)
+                    if size <= self.max_bytes:
+                        tmp.write(chunk)
+                    yield chunk
+            complete = size <= self.max_bytes
+        finally:
+            if complete:
+                os.replace(tmp_path, path)
+                self._add_entry(url, etag, last_modified, response_charset(response), size)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _add_entry(self, url, etag, last_modified, encoding, size):
+        with self.lock:
+            previous = self.db.execute("SELECT size FROM entries WHERE url = ?", (url,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoding, size, time.time()),
+            )
+            self.total += size - (previous[0] if previous else 0)
+            if self.total > self.max_bytes:
+                self._evict()
+            self._changed()
+
+    def _evict(self):
+        """Удаляет давно не использованные записи, пока кеш больше max_bytes"""
+        while self.total > self.max_bytes:
+            rows = self.db.execute("SELECT url, size FROM entries ORDER BY used LIMIT ?",
+                                   (EVICT_BATCH,)).fetchall()
+            if not rows:
+                self.total = 0
+                return
+            for url, size in rows:
+                if self.total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._body_path(url))
+                except OSError:
+                    pass
+                self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self.total -= size
+
+    def _changed(self):
+        """Учитывает изменение индекса (под self.lock) и при необходимости сохраняет пачку"""
+        self.pending += 1
+        now = time.monotonic()
+        if self.pending >= COMMIT_EVERY or now - self.committed_at >= COMMIT_SECONDS:
+            self.db.commit()
+            self.pending = 0
+            self.committed_at = now
+
+    def flush(self):
+        """Сохраняет несохранённые изменения индекса"""
+        with self.lock:
+            self.db.commit()
+            self.pending = 0
+            self.committed_at = time.monotonic()
+
+    def total_bytes(self):
+        """Суммарный размер тел в кеше"""
+        with self.lock:
+            return self.total
@@ -0,0 +1,173 @@
+"""
+Общий HTTP-клиент для проверки цен, sitemap-файлов и тестов.
+Одна requests.Session с пулом соединений (keep-alive) и повтором запросов
+при 429/5xx и сетевых сбоях: экспоненциальная задержка со случайным
+разбросом (jitter), заголовок Retry-After имеет приоритет.
+"""
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = 32                 # Соединений в пуле на хост
+MAX_RETRIES = 4                # Повторов после первой попытки
+BACKOFF_BASE = 0.5             # Задержка перед первым повтором, сек
+BACKOFF_MAX = 30.0             # Потолок задержки, сек
+RETRY_AFTER_MAX = 120.0        # Потолок ожидания по Retry-After, сек
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def response_charset(response):
+    """
+    Кодировка тела, объявленная сервером: charset из Content-Type, а у ответа
+    без заголовков (из HTTP-кеша по 304) — сохранённая вместе с телом.
+    None, если не объявлена: ISO-8859-1, которую requests подставляет
+    для text/* без charset, не учитывается.
+    """
+    content_type = response.headers.get("Content-Type")
+    if content_type is None:
+        return response.encoding
+    match = _CHARSET_RE.search(content_type)
+    return match.group(1) if match else None
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Экспоненциальная задержка с полным jitter: случайное число в [0, base * 2^attempt]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_delay(response, cap=RETRY_AFTER_MAX):
+    """
+    Задержка из заголовка Retry-After (секунды или HTTP-дата).
+    None, если заголовка нет или он не разобран.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(cap, float(value))
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return min(cap, max(0.0, (when - datetime.now(timezone.utc)).total_seconds()))
+
+
+def classify_error(error):
+    """
+    Статус проверки для исключения запроса:
+    HTTP_<код>, TIMEOUT, CONNECTION_ERROR или REQUEST_ERROR.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"HTTP_{error.response.status_code}"
+    if isinstance(error, requests.Timeout):
+        return "TIMEOUT"
+    if isinstance(error, requests.ConnectionError):
+        return "CONNECTION_ERROR"
+    return "REQUEST_ERROR"
+
+
+def is_transient(status):
+    """Временная ли ошибка: такой товар нужно перепроверить, а не считать расхождением"""
+    if status in ("TIMEOUT", "CONNECTION_ERROR"):
+        return True
+    if status.startswith("HTTP_"):
+        code = int(status[5:])
+        return code in RETRY_STATUSES
+    return False
+
+
+class HttpClient:
+    """
+    Клиент с общей сессией. get() повторяет запрос при 429/5xx и сетевых
+    ошибках до max_retries раз; после исчерпания повторов возвращает
+    последний ответ или пробрасывает последнее исключение. В retry_wait
+    ответа — секунды до начала последней попытки (неудачные попытки
+    и паузы между ними), 0.0 без повторов.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, max_retries=MAX_RETRIES, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=15, stream=False):
+        """GET с повторами; возвращает requests.Response"""
+        return self.request("GET", url, headers=headers, timeout=timeout, stream=stream)
+
+    def head(self, url, headers=None, timeout=15):
+        """HEAD с повторами, без перехода по редиректам"""
+        return self.request("HEAD", url, headers=headers, timeout=timeout, allow_redirects=False)
+
+    def request(self, method, url, headers=None, timeout=15, stream=False, allow_redirects=True):
+        """Запрос method с повторами при 429/5xx и сетевых ошибках; возвращает requests.Response"""
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            attempt_started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=timeout, stream=stream,
+                                                allow_redirects=allow_redirects)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    response.retry_wait = attempt_started - started if attempt else 0.0
+                    return response
+                delay = retry_after_delay(response)
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                response.close()
+            with self.lock:
+                self.retries += 1
+            attempt += 1
+            self.sleep(delay)
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """Общий для процесса HttpClient (создаётся при первом вызове)"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def set_default_client(client):
+    """
+    Заменяет общий клиент (например, кассетой cassette.Cassette в тестах);
+    None — следующий default_client() создаст новый. Возвращает прежний.
+    """
+    global _default_client
+    with _default_lock:
+        previous, _default_client = _default_client, client
+        return previous
+
+
+def get(url, headers=None, timeout=15, stream=False):
+    """GET через общий клиент"""
+    return default_client().get(url, headers=headers, timeout=timeout, stream=stream)
@@ -0,0 +1,298 @@
+"""
+Проверка доступности страниц из sitemap.
+URL страниц потоково извлекаются из всех дочерних sitemap-файлов индекса
+(вложенные индексы раскрываются) и проверяются параллельно запросами HEAD;
+если сервер не поддерживает HEAD (403/405/501), запрос повторяется GET без
+чтения тела. Редиректы проходятся вручную, чтобы собрать цепочку кодов.
+Из каждого раздела каталога (первый сегмент пути) берётся детерминированная
+выборка; повторы URL отбрасываются. В памяти держатся только счётчики
+распределений и ключи выбранных URL (sitemaps.UrlKeySet, около 8 байт на
+адрес), а не список всех адресов sitemap.
+"""
+import argparse
+import os
+import tempfile
+from collections import Counter, namedtuple
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+from fetcher import fetch_all, HostRateLimiter, DEFAULT_CONCURRENCY, DEFAULT_RATE_PER_HOST
+from http_client import classify_error, default_client
+from robots import crawl_delay_callback
+from settings import HEADERS
+from sitemaps import (
+    CHUNK_BYTES, MAX_INDEX_DEPTH, MAX_WORKERS, SITEMAP_INDEX_URL, UrlKeySet, crawl_index,
+    iter_sitemap_entries, url_key,
+)
+from timing import Timings
+
+TIMEOUT = 15
+MAX_REDIRECTS = 5                        # Переходов по редиректам на один URL
+HEAD_FALLBACK_STATUSES = (403, 405, 501)  # Ответы на HEAD, после которых повторяем GET
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+EXAMPLES_PER_STATUS = 5                  # Примеров URL на каждый код ошибки в отчёте
+SAMPLE_SCALE = 10_000                    # Точность доли выборки
+
+# Результат проверки URL: status — итоговый код (int) или ошибка
+# (TIMEOUT, CONNECTION_ERROR, ..., TOO_MANY_REDIRECTS); chain — коды
+# всех ответов по порядку; method — HEAD или GET (после отказа в HEAD)
+Probe = namedtuple("Probe", "url status chain method")
+
+
+def probe(url, http=None, timeout=TIMEOUT, headers=HEADERS):
+    """Проверяет url запросом HEAD (при отказе — GET) и проходит редиректы"""
+    http = http or default_client()
+    method = "HEAD"
+    chain = []
+    current = url
+    try:
+        while True:
+            if method == "HEAD":
+                response = http.head(current, headers=headers, timeout=timeout)
+                if response.status_code in HEAD_FALLBACK_STATUSES:
+                    response.close()
+                    method = "GET"
+            if method == "GET":
+                response = http.request("GET", current, headers=headers, timeout=timeout,
+                                        stream=True, allow_redirects=False)
+            response.close()
+            status = response.status_code
+            chain.append(status)
+            location = response.headers.get("Location")
+            if status not in REDIRECT_STATUSES or not location:
+                return Probe(url, status, tuple(chain), method)
+            if len(chain) > MAX_REDIRECTS:
+                return Probe(url, "TOO_MANY_REDIRECTS", tuple(chain), method)
+            current = urljoin(current, location)
+    except Exception as e:
+        return Probe(url, classify_error(e), tuple(chain), method)
+
+
+def url_section(url):
+    """Раздел каталога — первый сегмент пути ("/" для корня)"""
+    path = urlsplit(url).path.strip("/")
+    return path.split("/", 1)[0] if path else "/"
+
+
+class SectionSampler:
+    """
+    Отбор URL для проверки: доля rate (0..1) от каждого раздела и не больше
+    per_section URL из раздела (None — без ограничения). Выборка
+    детерминирована ключом URL — повторный прогон проверяет те же страницы.
+    Повторы отбрасываются по ключам уже выбранных URL.
+    """
+
+    def __init__(self, rate=1.0, per_section=None):
+        if not 0 < rate <= 1:
+            raise ValueError("rate должен быть в диапазоне (0, 1]")
+        self.threshold = int(rate * SAMPLE_SCALE)
+        self.per_section = per_section
+        self.keys = UrlKeySet()
+        self.seen = Counter()       # Раздел -> URL в sitemap
+        self.selected = Counter()   # Раздел -> выбрано для проверки
+        self.duplicates = 0
+
+    def accept(self, url):
+        """True, если url нужно проверить"""
+        section = url_section(url)
+        self.seen[section] += 1
+        key = url_key(url)
+        if key % SAMPLE_SCALE >= self.threshold:
+            return False
+        if key in self.keys:
+            self.duplicates += 1
+            return False
+        if self.per_section is not None and self.selected[section] >= self.per_section:
+            return False
+        self.keys.add(key)
+        self.selected[section] += 1
+        return True
+
+
+class LinkStats:
+    """Распределения по результатам проверок: коды, число редиректов, цепочки, методы"""
+
+    def __init__(self, examples_per_status=EXAMPLES_PER_STATUS):
+        self.examples_per_status = examples_per_status
+        self.count = 0
+        self.statuses = Counter()
+        self.hops = Counter()
+        self.chains = Counter()
+        self.methods = Counter()
+        self.bad_sections = Counter()
+        self.examples = {}
+
+    def add(self, result):
+        self.count += 1
+        self.statuses[result.status] += 1
+        self.hops[max(0, len(result.chain) - 1)] += 1
+        if len(result.chain) > 1 or not isinstance(result.status, int):
+            pattern = " → ".join(str(code) for code in result.chain) or "—"
+            if not isinstance(result.status, int):
+                pattern += f" → {result.status}"
+            self.chains[pattern] += 1
+        self.methods[result.method] += 1
+        if not isinstance(result.status, int) or result.status >= 400:
+            self.bad_sections[url_section(result.url)] += 1
+            examples = self.examples.setdefault(result.status, [])
+            if len(examples) < self.examples_per_status:
+                examples.append(result.url)
+
+    @property
+    def bad_count(self):
+        return sum(self.bad_sections.values())
+
+    def summary_lines(self, top=10):
+        """Строки отчёта: коды ответов, число редиректов, частые цепочки и ошибки по разделам"""
+        if not self.count:
+            return ["Проверено страниц: 0"]
+        lines = [f"Проверено страниц: {self.count}, с ошибками: {self.bad_count}"]
+        lines.append("Коды ответов: " + ", ".join(
+            f"{status}: {count}" for status, count in sorted(self.statuses.items(), key=lambda x: str(x[0]))))
+        lines.append("Редиректов до ответа: " + ", ".join(
+            f"{hops}: {count}" for hops, count in sorted(self.hops.items())))
+        lines.append("Методы: " + ", ".join(f"{method}: {count}" for method, count in sorted(self.methods.items())))
+        if self.chains:
+            lines.append("Частые цепочки:")
+            for pattern, count in self.chains.most_common(top):
+                lines.append(f"  {pattern}: {count}")
+        if self.bad_sections:
+            lines.append("Ошибки по разделам:")
+            for section, count in self.bad_sections.most_common(top):
+                lines.append(f"  {section}: {count}")
+        return lines
+
+
+def iter_sitemap_urls(index_url, http=None, max_depth=MAX_INDEX_DEPTH, errors=None, workers=MAX_WORKERS):
+    """
+    URL страниц (<url><loc>) из индекса index_url и всех вложенных sitemap-файлов.
+    Файлы скачиваются во временные файлы параллельно (workers потоков) —
+    соединение не держится, пока проверяются страницы файла. Недоступные
+    или битые sitemap-файлы пропускаются; (url, ошибка) добавляются в список errors.
+    """
+    http = http or default_client()
+
+    def download(sitemap_url):
+        # (временный файл или None, вложенные sitemap — заполняются при чтении, ошибка)
+        buffer = tempfile.TemporaryFile()
+        try:
+            with http.get(sitemap_url, headers=HEADERS, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(CHUNK_BYTES):
+                    buffer.write(chunk)
+        except Exception as e:
+            buffer.close()
+            return None, [], e
+        buffer.seek(0)
+        return buffer, [], None
+
+    downloaded = crawl_index([index_url], download, lambda result: result[1],
+                             workers=workers, max_depth=max_depth)
+    for sitemap_url, (buffer, children, error) in downloaded:
+        if buffer is not None:
+            try:
+                with buffer:
+                    for entry in iter_sitemap_entries(iter(lambda: buffer.read(CHUNK_BYTES), b"")):
+                        if entry.kind == "url":
+                            if entry.loc:
+                                yield entry.loc
+                        elif entry.loc:
+                            children.append(entry.loc)
+            except Exception as e:
+                error = e
+        if error is not None:
+            if errors is not None:
+                errors.append((sitemap_url, error))
+            print(f"[FAIL] {sitemap_url} -> {error}")
+
+
+def check_links(index_url=SITEMAP_INDEX_URL, sample_rate=1.0, per_section=None,
+                concurrency=DEFAULT_CONCURRENCY, rate_per_host=DEFAULT_RATE_PER_HOST, http=None,
+                timeout=TIMEOUT):
+    """
+    Проверяет страницы из sitemap index_url. Crawl-delay из robots.txt
+    хоста страницы ограничивает частоту запросов к нему (без всплесков).
+    Возвращает (LinkStats, SectionSampler, Timings, список недоступных
+    sitemap-файлов).
+    """
+    http = http or default_client()
+
+    crawl_delay = crawl_delay_callback(HEADERS["User-Agent"], http, rate_per_host)
+    limiter = HostRateLimiter(rate_per_host, crawl_delay=crawl_delay)
+    sampler = SectionSampler(sample_rate, per_section)
+    stats = LinkStats()
+    timings = Timings()
+    errors = []
+
+    def worker(url):
+        limiter.acquire(url)
+        with timings.measure("страница"):
+            return probe(url, http, timeout)
+
+    urls = (url for url in iter_sitemap_urls(index_url, http, errors=errors) if sampler.accept(url))
+    for result in fetch_all(urls, worker, concurrency=concurrency):
+        stats.add(result)
+        if stats.count % 1000 == 0:
+            print(f"Проверено {stats.count} страниц, ошибок {stats.bad_count}")
+    return stats, sampler, timings, errors
+
+
+def save_report(index_url, stats, sampler, timings, errors):
+    """Текстовый отчёт reports/links_<дата>.txt; возвращает имя файла"""
+    os.makedirs("reports", exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"reports/links_{timestamp}.txt"
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("="*70 + "\n")
+        f.write("ПРОВЕРКА СТРАНИЦ ИЗ SITEMAP\n")
+        f.write("="*70 + "\n")
+        f.write(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
+        f.write(f"Sitemap: {index_url}\n")
+        f.write("="*70 + "\n\n")
+
+        f.write("РАЗДЕЛЫ (в sitemap / проверено):\n")
+        for section, seen in sampler.seen.most_common():
+            f.write(f"{section}: {seen} / {sampler.selected[section]}\n")
+        f.write(f"Повторов URL: {sampler.duplicates}\n\n")
+
+        f.write("ИТОГИ:\n")
+        for line in stats.summary_lines():
+            f.write(line + "\n")
+
+        if stats.examples:
+            f.write("\nПРИМЕРЫ СТРАНИЦ С ОШИБКАМИ:\n")
+            for status, urls in sorted(stats.examples.items(), key=lambda x: str(x[0])):
+                for url in urls:
+                    f.write(f"{status}: {url}\n")
+
+        if errors:
+            f.write("\nНЕДОСТУПНЫЕ SITEMAP-ФАЙЛЫ:\n")
+            for url, error in errors:
+                f.write(f"{url} -> {error}\n")
+
+        timing_lines = timings.summary_lines()
+        if timing_lines:
+            f.write("\nВРЕМЯ ПРОВЕРКИ, мс:\n")
+            for line in timing_lines:
+                f.write(line + "\n")
+    return filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка доступности страниц из sitemap")
+    parser.add_argument("--sitemap", default=SITEMAP_INDEX_URL, help="URL индекса sitemap")
+    parser.add_argument("--sample-rate", type=float, default=1.0,
+                        help="доля страниц каждого раздела для проверки (0..1)")
+    parser.add_argument("--per-section", type=int, default=None,
+                        help="не больше N страниц из каждого раздела")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="одновременных запросов")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_HOST,
+                        help="запросов в секунду на хост")
+    args = parser.parse_args()
+
+    stats, sampler, timings, errors = check_links(args.sitemap, args.sample_rate, args.per_section,
+                                                  args.concurrency, args.rate)
+    for line in stats.summary_lines():
+        print(line)
+    print(f"\nОтчёт сохранён: {save_report(args.sitemap, stats, sampler, timings, errors)}")
@@ -1,66 +1,75 @@
-import requests
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
 import time
-import random
+import itertools
 import os
+import sys
+import argparse
+from collections import namedtuple
 from datetime import datetime
 
-XML_URL = "https://parts.gt-shop.ru/yml/gtun.4.xml"
-
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-    "Accept-Language": "ru-RU,ru;q=0.9",
-}
-
-def parse_price(html):
-    """Парсит цену со страницы сайта"""
-    soup = BeautifulSoup(html, 'lxml')
-    
-    price_selectors = [
-        'meta[itemprop="price"]',
-        '.price',
-        '.current-price',
-        '.product-price',
-        '[itemprop="price"]',
-        '.price-value',
-    ]
-    
-    for selector in price_selectors:
-        price_tag = soup.select_one(selector)
-        if price_tag:
-            price_text = price_tag.get('content', '') if selector.startswith('meta') else price_tag.get_text(strip=True)
-            if price_text:
-                clean_price = (
-                    price_text
-                    .replace('₽', '')
-                    .replace(' ', '')
-                    .replace(',', '.')
-                    .replace('\xa0', '')
-                    .replace('Руб.', '')
-                    .replace('Руб', '')
-                    .replace('От', '')
-                    .replace('от', '')
-                    .strip()
-                )
-                try:
-                    return float(clean_price)
-                except (ValueError, TypeError):
-                    continue
-    
-    import re
-    price_pattern = r'(\d+(?:[.,]\d+)?)\s*(?:₽|руб|Руб)'
-    matches = re.findall(price_pattern, html, re.IGNORECASE)
-    if matches:
-        try:
-            return float(matches[0].replace(',', '.'))
-        except:
-            pass
-    
-    return None
+from feeds import MAX_FEEDS, FeedMerger, read_feed_list
+from http_cache import HttpCache
+from http_client import default_client, classify_error, is_transient, response_charset
+from offer_store import OfferStore, shard_of
+from price_parser import parse_price, SelectorStats, MetaPriceScanner
+from result_store import ResultStore, DEFAULT_TTL_HOURS
+from scheduler import CheckScheduler
+from reporter import ResultLog, read_results, write_junit, FLUSH_EVERY
+from timing import RequestTimings, Timings
+from parse_pool import ParsePool
+from fetcher import (
+    TokenBucket, HostRateLimiter, AdaptiveConcurrency, fetch_all,
+    DEFAULT_CONCURRENCY, DEFAULT_RATE_PER_HOST, ADAPTIVE_LATENCY_P95,
+)
+from robots import crawl_delay_callback
+from checkpoint import Checkpoint, FeedHash
+from feed_diff import FeedDiff, FingerprintIndex, diff_offers
+from drift import DriftRules, PricePairs, analyze, DEFAULT_ABS_TOLERANCE, DEFAULT_PCT_TOLERANCE
+from settings import XML_URL, HEADERS, STATE_DIR, HTTP_CACHE_DIR
+
+SAMPLE_SIZE = 20   # Товаров в выборочной проверке (--budget)
+CHUNK_SIZE = 500   # Товаров в одной порции полной проверки
+
+SELECTOR_STATS_PATH = os.path.join(STATE_DIR, "selector_stats.json")
+RESULTS_DB_PATH = os.path.join(STATE_DIR, "results.sqlite3")
+CHECKPOINT_PATH = os.path.join(STATE_DIR, "checkpoint_{shard}.json")
+# Отпечатки прайса: последней полной проверки (по шардам) и отчёта --feed-diff
+FEED_INDEX_PATH = os.path.join(STATE_DIR, "feed_index_{shard}.bin")
+FEED_DIFF_INDEX_PATH = os.path.join(STATE_DIR, "feed_index.bin")
 
-def save_report(offers_checked, errors, correct_count, total_time):
-    """Сохраняет отчёт в файл с уникальным именем"""
+# Фазы замеров check_offer: ответ — от отправки последней попытки запроса
+# до заголовков (DNS, TCP/TLS на новом соединении и ожидание сервера), тело —
+# загрузка страницы, разбор — извлечение цены, всего — от первой попытки до
+# цены; ожидание повторов — неудачные попытки и паузы HttpClient между ними
+# (только у запросов, которые повторялись)
+TIMING_PHASES = ("ответ", "тело", "разбор", "всего", "ожидание повторов")
+# Сетевая часть запроса: по ней AdaptiveConcurrency подбирает параллельность
+HTTP_PHASES = (TIMING_PHASES[0], TIMING_PHASES[1], TIMING_PHASES[4])
+
+# Тело страницы читается кусками по PAGE_CHUNK_BYTES; в первых SCAN_BYTES
+# ищется <meta itemprop="price">, после него чтение прекращается. Если до
+# конца страницы осталось не больше DRAIN_BYTES, она дочитывается, чтобы
+# соединение вернулось в пул, а не закрывалось
+PAGE_CHUNK_BYTES = 16 * 1024
+SCAN_BYTES = 64 * 1024
+DRAIN_BYTES = 16 * 1024
+
+def save_report(offers_checked, errors, correct_count, total_time, selector_stats=None, skipped=0,
+                timings=None, feed_time=None, drift=None, sources=None, feed_lines=None):
+    """
+    Сохраняет отчёт в файл с уникальным именем.
+    skipped — товары, пропущенные инкрементальной проверкой (без изменений).
+    timings (timing.Timings) добавляет перцентили времени по фазам запроса,
+    feed_time — время загрузки и разбора прайса в секундах.
+    Товары с временными ошибками (таймаут, 429/5xx) выводятся отдельно:
+    это не расхождение цен, их нужно перепроверить.
+    selector_stats (SelectorStats) добавляет раздел о сработавших селекторах цены,
+    drift (drift.DriftReport) — раздел о распределении расхождений цен.
+    sources — URL проверенных прайсов (по умолчанию XML_URL), feed_lines —
+    раздел с итогами по каждому прайсу (feeds.FeedMerger.summary_lines).
+    offers_checked и errors — списки или reporter.ResultLog и его errors:
+    отчёт пишется за несколько проходов, без копирования в память.
+    """
+    unchecked = sum(1 for item in offers_checked if is_transient(item[3]))
     os.makedirs("reports", exist_ok=True)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -71,9 +80,11 @@ def save_report(offers_checked, errors, correct_count, total_time):
         f.write("ПРОВЕРКА ЦЕН С PID\n")
         f.write("="*70 + "\n")
         f.write(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
-        f.write(f"Источник: {XML_URL}\n")
+        f.write(f"Источник: {', '.join(sources or [XML_URL])}\n")
         f.write(f"Проверено товаров: {len(offers_checked)}\n")
         f.write(f"Время выполнения: {total_time:.1f} сек\n")
+        if feed_time is not None:
+            f.write(f"Загрузка и разбор прайса: {feed_time:.1f} сек\n")
         f.write("="*70 + "\n\n")
         
         for i, (price_csv, url, price_site, status) in enumerate(offers_checked, 1):
@@ -83,8 +94,11 @@ def save_report(offers_checked, errors, correct_count, total_time):
         f.write("="*70 + "\n")
         f.write("ИТОГИ ПРОВЕРКИ\n")
         f.write("="*70 + "\n")
-        f.write(f"Корректных: {correct_count}/{len(offers_checked)} ({correct_count/len(offers_checked)*100:.1f}%)\n")
+        f.write(f"Корректных: {correct_count}/{len(offers_checked)} ({correct_count/max(len(offers_checked), 1)*100:.1f}%)\n")
         f.write(f"Ошибок: {len(errors)}\n")
+        f.write(f"Не проверено (временные ошибки): {unchecked}\n")
+        if skipped:
+            f.write(f"Пропущено (без изменений с прошлой проверки): {skipped}\n")
         f.write("="*70 + "\n")
         
         if errors:
@@ -96,99 +110,761 @@ def save_report(offers_checked, errors, correct_count, total_time):
                 if price_site is not None:
                     f.write(f"  Сайт: {price_site:.0f} RUB\n")
                 f.write(f"  Ошибка: {error_type}\n")
+        
+        if unchecked:
+            f.write("\nПОВТОРИТЬ ПРОВЕРКУ (временные ошибки):\n")
+            f.write("="*70 + "\n")
+            for price_csv, url, price_site, status in offers_checked:
+                if is_transient(status):
+                    f.write(f"{url} | {status}\n")
+        
+        if selector_stats is not None and selector_stats.run_hits:
+            f.write("\n" + "="*70 + "\n")
+            f.write("СЕЛЕКТОРЫ ЦЕНЫ (этот запуск)\n")
+            f.write("="*70 + "\n")
+            for pattern, counts in sorted(selector_stats.run_hits.items()):
+                hits = ", ".join(f"{tier}: {n}" for tier, n in sorted(counts.items(), key=lambda item: -item[1]))
+                f.write(f"{pattern} -> {hits}\n")
+            for (pattern, expected, actual), n in sorted(selector_stats.drifts.items()):
+                f.write(f"ВНИМАНИЕ: {pattern}: цена найдена через {actual} вместо {expected} ({n} раз)\n")
+        
+        timing_lines = timings.summary_lines(TIMING_PHASES) if timings is not None else []
+        if timing_lines:
+            f.write("\n" + "="*70 + "\n")
+            f.write("ВРЕМЯ ЗАПРОСОВ, мс (успешные загрузки страниц)\n")
+            f.write("="*70 + "\n")
+            for line in timing_lines:
+                f.write(line + "\n")
+        
+        if feed_lines:
+            f.write("\n" + "="*70 + "\n")
+            f.write("ПРАЙСЫ\n")
+            f.write("="*70 + "\n")
+            for line in feed_lines:
+                f.write(line + "\n")
+        
+        if drift is not None and drift.count:
+            f.write("\n" + "="*70 + "\n")
+            f.write("РАСХОЖДЕНИЯ ЦЕН (товары с найденной ценой)\n")
+            f.write("="*70 + "\n")
+            for line in drift.summary_lines():
+                f.write(line + "\n")
     
     print(f"\nОтчёт сохранён: {filename}")
     return filename
 
-def check_prices():
-    start_time = time.time()
+def merge_shard_results(paths):
+    """
+    Объединяет журналы шардов (reports/shard_*.jsonl) в один журнал
+    и текстовый отчёт. Время выполнения неизвестно и не указывается.
+    """
+    os.makedirs("reports", exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results = (result for path in paths for result in read_results(path))
+    log = ResultLog.from_results(f"reports/merged_{timestamp}", results)
+    print(f"Объединено шардов: {len(paths)}, товаров: {len(log)}")
+    write_junit(log, f"reports/merged_{timestamp}.junit.xml", 0.0)
+    return save_report(log, log.errors, log.correct, 0.0)
+
+def format_feed_change(change):
+    """Строка отчёта об изменении товара: + добавлен, ~ изменился, - удалён"""
+    if change.kind == "added":
+        return f"+ {change.url}: {change.price:.0f} RUB, наличие {change.available}"
+    if change.kind == "removed":
+        return f"- {change.url}: было {change.old_price:.0f} RUB"
+    details = []
+    if change.price != change.old_price:
+        details.append(f"{change.old_price:.0f} -> {change.price:.0f} RUB")
+    if change.available != change.old_available:
+        details.append(f"наличие {change.old_available} -> {change.available}")
+    return f"~ {change.url}: {', '.join(details) or 'изменился URL'}"
+
+def feed_diff_report(feed_urls=None, use_http_cache=True, index_path=FEED_DIFF_INDEX_PATH):
+    """
+    Отчёт об изменениях каталога без загрузки страниц: товары прайса
+    (или прайсов feed_urls), добавленные, изменившиеся и удалённые с прошлого
+    вызова. Изменения пишутся в reports/feed_diff_<дата>.txt за один проход
+    по прайсу; отпечатки хранятся в index_path (feed_diff.FingerprintIndex)
+    и заменяются, только если прайс прочитан целиком. При первом вызове
+    список товаров не выводится. Возвращает (имя отчёта, FeedDiff или None
+    при ошибке загрузки прайса).
+    """
+    http = HttpCache(HTTP_CACHE_DIR) if use_http_cache else default_client()
+    feed_urls = list(feed_urls or [XML_URL])
+    previous = FingerprintIndex.load(index_path)
+    diff = FeedDiff(previous)
+    merger = FeedMerger(feed_urls, headers=HEADERS, timeout=30, http=http)
+    os.makedirs("reports", exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"reports/feed_diff_{timestamp}.txt"
     
-    print("Загрузка XML...")
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("="*70 + "\n")
+        f.write("ИЗМЕНЕНИЯ ПРАЙСА\n")
+        f.write("="*70 + "\n")
+        f.write(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
+        for url in feed_urls:
+            f.write(f"Прайс: {url}\n")
+        f.write("="*70 + "\n\n")
+        if previous is None:
+            f.write("Прошлый прогон не найден: товары сохранены для следующего сравнения\n")
+        try:
+            for change in diff_offers(merger, diff):
+                if previous is not None:
+                    f.write(format_feed_change(change) + "\n")
+        except Exception as e:
+            print(f"Ошибка загрузки XML: {e}")
+            f.write(f"\nОшибка загрузки XML: {e}\n")
+            return filename, None
+        f.write("\n" + "="*70 + "\n")
+        f.write(f"Итого: {diff.summary_line()}\n")
+        f.write("="*70 + "\n")
     
+    diff.index().save(index_path)
+    print(f"Изменения прайса: {diff.summary_line()}")
+    print(f"\nОтчёт сохранён: {filename}")
+    return filename, diff
+
+def read_page(response, scan_bytes=SCAN_BYTES):
+    """
+    Читает тело страницы кусками и возвращает байты. Как только в первых
+    scan_bytes (с точностью до куска PAGE_CHUNK_BYTES) найден
+    <meta itemprop="price">, чтение прекращается и
+    возвращается прочитанное начало страницы — остаток не загружается.
+    Если тега нет, страница дочитывается целиком (для остальных уровней
+    price_parser). scan_bytes 0 — всегда целиком.
+    """
+    if not scan_bytes:
+        return response.content
+    scanner = MetaPriceScanner()
+    chunks = response.iter_content(PAGE_CHUNK_BYTES)
+    for chunk in chunks:
+        if len(scanner.buffer) >= scan_bytes:
+            scanner.buffer += chunk
+        elif scanner.feed(chunk):
+            # Content-Length сжатого ответа не сравнить с распакованным буфером
+            length = response.headers.get("Content-Length", "")
+            if (length.isdigit() and not response.headers.get("Content-Encoding")
+                    and int(length) - len(scanner.buffer) <= DRAIN_BYTES):
+                for _ in chunks:
+                    pass
+            break
+    return bytes(scanner.buffer)
+
+def fetch_page(url_with_pid, http=None, timings=None, scan_bytes=SCAN_BYTES):
+    """
+    Загружает страницу товара. Возвращает (body, encoding, status, error):
+    body — байты страницы (только начало, если цена в <meta> нашлась в первых
+    scan_bytes, см. read_page), encoding — charset из заголовка ответа или
+    None (см. http_client.response_charset); при ошибке запроса body None, status — HTTP_<код>, TIMEOUT
+    или CONNECTION_ERROR (см. http_client.classify_error), иначе status None.
+    timings получает фазы «ответ», «тело» и «ожидание повторов».
+    """
+    http = http or default_client()
+    started = time.perf_counter()
     try:
-        response = requests.get(XML_URL, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        root = ET.fromstring(response.content)
+        with http.get(url_with_pid, headers=HEADERS, timeout=15, stream=True) as response:
+            headers_at = time.perf_counter()
+            retry_wait = getattr(response, "retry_wait", 0.0)
+            response.raise_for_status()
+            encoding = response_charset(response)
+            body = read_page(response, scan_bytes)
+            body_at = time.perf_counter()
     except Exception as e:
-        print(f"Ошибка загрузки XML: {e}")
-        return
-    
-    all_offers = []
-    for offer in root.findall('.//offer'):
-        url_tag = offer.find('url')
-        price_tag = offer.find('price')
-        if url_tag is not None and price_tag is not None:
-            try:
-                price = float(price_tag.text)
-                url_with_pid = url_tag.text
-                all_offers.append((price, url_with_pid))
-            except:
+        return None, None, classify_error(e), e
+    
+    if timings is not None:
+        timings.record(TIMING_PHASES[0], headers_at - started - retry_wait)
+        timings.record(TIMING_PHASES[1], body_at - headers_at)
+        if retry_wait:
+            timings.record(TIMING_PHASES[4], retry_wait)
+    return body, encoding, None, None
+
+def compare_price(price_csv, url_with_pid, price_site, tolerance=DEFAULT_ABS_TOLERANCE):
+    """
+    Результат проверки (price_csv, url, price_site, status, None) по найденной
+    на странице цене; расхождение больше tolerance RUB — статус DIFF_<разница>.
+    """
+    if price_site is None:
+        return (price_csv, url_with_pid, None, "PRICE_NOT_FOUND", None)
+    if abs(price_site - price_csv) > tolerance:
+        diff = abs(price_site - price_csv)
+        return (price_csv, url_with_pid, price_site, f"DIFF_{diff:.0f}", None)
+    return (price_csv, url_with_pid, price_site, "OK", None)
+
+def check_offer(price_csv, url_with_pid, selector_stats=None, http=None, timings=None,
+                scan_bytes=SCAN_BYTES, tolerance=DEFAULT_ABS_TOLERANCE):
+    """
+    Загружает страницу товара и сравнивает цену с прайсом (допуск tolerance RUB).
+    http — HttpClient или HttpCache (по умолчанию общий HttpClient).
+    scan_bytes — сколько байт начала страницы просматривать в поисках
+    <meta itemprop="price"> до прекращения загрузки (см. read_page).
+    timings (timing.Timings) получает длительности фаз TIMING_PHASES.
+    Возвращает (price_csv, url, price_site, status, error); при ошибке запроса
+    status — HTTP_<код>, TIMEOUT или CONNECTION_ERROR (см. http_client.classify_error).
+    """
+    started = time.perf_counter()
+    body, encoding, status, error = fetch_page(url_with_pid, http, timings, scan_bytes)
+    if status is not None:
+        return (price_csv, url_with_pid, None, status, error)
+    
+    parse_started = time.perf_counter()
+    price_site = parse_price(body, url_with_pid, selector_stats, encoding)
+    if timings is not None:
+        finished = time.perf_counter()
+        timings.record(TIMING_PHASES[2], finished - parse_started)
+        timings.record(TIMING_PHASES[3], finished - started)
+    return compare_price(price_csv, url_with_pid, price_site, tolerance)
+
+# Параметры check_prices (по умолчанию — выборочная проверка основного прайса):
+#   full — весь каталог (шард shard_index из shard_count) порциями по chunk_size,
+#     не быстрее target_rate товаров/сек; иначе budget товаров по приоритету
+#     CheckScheduler (без prioritize — случайных), с pids — только заданные товары;
+#   concurrency, rate_per_host — потоки загрузки и запросов/сек на хост (Crawl-delay
+#     из robots.txt уменьшает предел); adaptive, latency_target — AdaptiveConcurrency;
+#   parse_workers — процессов ParsePool (0 — разбор в потоках, None — по числу ядер
+#     в режиме full); scan_bytes — см. read_page; rules — drift.DriftRules;
+#   use_http_cache — условные запросы через HttpCache; incremental, ttl_hours —
+#     пропуск товаров, проверенных успешно и не изменившихся (ResultStore);
+#   flush_every — сброс журнала; resume — продолжить с контрольной точки;
+#   feed_urls — прайсы (FeedMerger); changed_only — только изменившиеся в прайсе
+#     с прошлой завершённой проверки шарда (FeedDiff)
+CheckOptions = namedtuple("CheckOptions", (
+    "full shard_index shard_count chunk_size target_rate concurrency rate_per_host use_http_cache "
+    "incremental ttl_hours flush_every adaptive latency_target parse_workers scan_bytes rules resume "
+    "feed_urls changed_only budget prioritize pids"
+), defaults=(
+    False, 0, 1, CHUNK_SIZE, None, DEFAULT_CONCURRENCY, DEFAULT_RATE_PER_HOST, True,
+    False, DEFAULT_TTL_HOURS, FLUSH_EVERY, True, ADAPTIVE_LATENCY_P95, None, SCAN_BYTES, None, False,
+    None, False, SAMPLE_SIZE, True, None,
+))
+
+
+class FeedReader:
+    """
+    Товары прайсов feed_urls (feeds.FeedMerger) со счётчиками: loaded —
+    прочитано, feed_hash — отпечаток прочитанного начала прайса, feed_time —
+    время внутри загрузки и разбора, без проверки товаров между чтениями.
+    """
+
+    def __init__(self, feed_urls, http, feed_time=0.0):
+        self.merger = FeedMerger(feed_urls, headers=HEADERS, timeout=30, http=http)
+        self.loaded = 0
+        self.feed_hash = FeedHash()
+        self.feed_time = feed_time
+
+    def __iter__(self):
+        resumed = time.perf_counter()
+        for offer in self.merger:
+            self.loaded += 1
+            self.feed_hash.update(offer)
+            self.feed_time += time.perf_counter() - resumed
+            yield offer
+            resumed = time.perf_counter()
+        self.feed_time += time.perf_counter() - resumed
+
+
+class ChangedOffers:
+    """
+    Отбор товаров полной проверки: только шард shard_index, с diff
+    (feed_diff.FeedDiff) — только изменившиеся в прайсе, с results_store —
+    только требующие проверки (ResultStore.needs_check). skipped — товары,
+    отброшенные двумя последними фильтрами.
+    """
+
+    def __init__(self, shard_index, shard_count, diff=None, results_store=None):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.diff = diff
+        self.results_store = results_store
+        self.skipped = 0
+        self.rows = {}  # URL товара текущей порции -> его строка в diff (см. FeedDiff.discard)
+
+    def in_shard(self, offer):
+        return shard_of(offer.url, self.shard_count) == self.shard_index
+
+    def update(self, offer):
+        """Добавляет offer в diff; номер строки или None, если товар не изменился"""
+        if self.diff.update(offer) is None:
+            return None
+        return len(self.diff) - 1
+
+    def __call__(self, offers):
+        for offer in offers:
+            if not self.in_shard(offer):
                 continue
+            if self.diff is not None:
+                row = self.update(offer)
+                if row is None:
+                    self.skipped += 1
+                    continue
+                self.rows[offer.url] = row
+            if self.results_store is not None and not self.results_store.needs_check(offer.url, offer.price):
+                self.skipped += 1
+                continue
+            yield offer
+
+    def checked(self, url, status):
+        """
+        Отпечаток товара, проверка которого не дала OK, не обновляется:
+        следующий прогон проверит товар снова
+        """
+        row = self.rows.pop(url, None)
+        if row is not None and status != "OK":
+            self.diff.discard(row)
+
+    def end_chunk(self):
+        # Остались товары, отфильтрованные incremental: они уже проверены успешно
+        self.rows.clear()
+
+
+def select_offers(store, results_store, options):
+    """
+    Товары выборочной проверки из OfferStore store: с options.pids — заданные
+    PID или id из прайса, иначе budget приоритетных (CheckScheduler) или
+    случайных. Возвращает (список товаров, описание выборки).
+    """
+    if options.pids:
+        rows = {}
+        for pid in options.pids:
+            row = store.row_by_pid(pid)
+            if row is None:
+                row = store.row_by_offer_id(pid)
+            if row is None:
+                print(f"Товар {pid} не найден в прайсе")
+            else:
+                rows.setdefault(row, pid)
+        return [store[row] for row in rows], "заданных"
+    if options.prioritize:
+        return CheckScheduler(results_store, options.ttl_hours).select(store, options.budget), "приоритетных"
+    return [store[row] for row in store.sample_rows(options.budget)], "случайных"
+
+
+def skip_checked(feed, reader, state, pairs, changes):
+    """
+    Читает без проверки начало прайса feed до позиции контрольной точки
+    state, добавляя в pairs цены сайта из журнала и обновляя отпечатки
+    changes. False, если прайс изменился.
+    """
+    prior = read_results(state["log_base"] + ".jsonl")
+    record = next(prior, None)
+    # Журнал — подпоследовательность прайса в том же порядке
+    for offer in itertools.islice(feed, state["position"]):
+        row = None
+        if changes.diff is not None and changes.in_shard(offer):
+            row = changes.update(offer)
+        if record is not None and record[1] == offer.url:
+            if record[2] is not None:
+                pairs.append(offer, record[2])
+            if row is not None and record[3] != "OK":
+                changes.diff.discard(row)
+            record = next(prior, None)
+    prior.close()
+    return reader.loaded == state["position"] and reader.feed_hash.hexdigest() == state["feed_hash"]
+
+
+def check_prices(options=None, **overrides):
+    """
+    Проверяет цены товаров прайса XML_URL (или options.feed_urls) на страницах
+    сайта. options — CheckOptions; отдельные поля можно передать именованными
+    аргументами. Каждый результат сразу дописывается в журнал
+    reports/<имя>.jsonl и .csv (шард — reports/shard_IofN_*.jsonl, см. --merge)
+    и в RESULTS_DB_PATH; в конце строятся текстовый отчёт и <имя>.junit.xml.
+    Полная проверка после каждой порции сохраняет контрольную точку CHECKPOINT_PATH.
+    """
+    options = (options or CheckOptions())._replace(**overrides)
+    full = options.full
+    start_time = time.time()
     
-    print(f"Загружено товаров: {len(all_offers)}")
+    print("Загрузка XML...")
     
-    if len(all_offers) > 20:
-        offers = random.sample(all_offers, 20)
+    http = HttpCache(HTTP_CACHE_DIR) if options.use_http_cache else default_client()
+    os.makedirs(STATE_DIR, exist_ok=True)
+    results_store = ResultStore(RESULTS_DB_PATH, options.ttl_hours)
+    timings = Timings()
+    rules = options.rules or DriftRules()
+    pairs = PricePairs()
+    feed_urls = list(options.feed_urls or [XML_URL])
+    reader = FeedReader(feed_urls, http)
+    shard = f"{options.shard_index}of{options.shard_count}"
+    feed_index_path = FEED_INDEX_PATH.format(shard=shard)
+    changes = None
+    
+    os.makedirs("reports", exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if options.shard_count > 1:
+        log_base = f"reports/shard_{shard}_{timestamp}"
     else:
-        offers = all_offers
+        log_base = f"reports/check_{timestamp}"
+    checkpoint = Checkpoint(CHECKPOINT_PATH.format(shard=shard)) if full else None
+    state = checkpoint.load() if checkpoint is not None and options.resume else None
+    if options.resume and (state is None or not os.path.exists(state["log_base"] + ".jsonl")):
+        print("Контрольная точка не найдена, проверка начинается с начала")
+        state = None
     
-    print(f"Выбрано случайных товаров для проверки: {len(offers)}\n")
+    if full:
+        diff = FeedDiff(FingerprintIndex.load(feed_index_path)) if options.changed_only else None
+        changes = ChangedOffers(options.shard_index, options.shard_count, diff,
+                                results_store if options.incremental else None)
+        # Прайс читается потоково: проверка начинается до окончания загрузки
+        feed = iter(reader)
+        if state is not None:
+            print(f"Продолжение с контрольной точки: {state['log_base']}.jsonl, "
+                  f"прочитано из прайса {state['position']}")
+            log = ResultLog(state["log_base"], flush_every=options.flush_every, resume_from=state["log_sizes"])
+            try:
+                unchanged = skip_checked(feed, reader, state, pairs, changes)
+            except Exception as e:
+                print(f"Ошибка загрузки XML: {e}")
+                log.close()
+                results_store.close()
+                return
+            if unchanged:
+                log_base = state["log_base"]
+                changes.skipped = state["skipped"]
+                start_time -= state["elapsed"]
+            else:
+                print("Прайс изменился после контрольной точки, проверка начинается с начала")
+                log.close()
+                feed.close()
+                reader = FeedReader(feed_urls, http, reader.feed_time)
+                pairs = PricePairs()
+                if diff is not None:
+                    changes.diff = FeedDiff(diff.previous)
+                feed = iter(reader)
+                state = None
+        offers = changes(feed)
+        total = None
+        print(f"Полная проверка: шард {options.shard_index + 1}/{options.shard_count}"
+              f"{' (только изменившиеся товары)' if options.incremental or diff is not None else ''}\n")
+    else:
+        try:
+            store = OfferStore.from_offers(reader)
+        except Exception as e:
+            print(f"Ошибка загрузки XML: {e}")
+            results_store.close()
+            return
+        offers, kind = select_offers(store, results_store, options)
+        total = len(offers)
+        print(f"Загружено товаров: {len(store)}")
+        print(f"Выбрано {kind} товаров для проверки: {total}\n")
     
-    errors = []
-    correct = 0
-    offers_checked = []
+    if state is None:
+        log = ResultLog(log_base, flush_every=options.flush_every)
     
-    for i, (price_csv, url_with_pid) in enumerate(offers, 1):
-        print(f"[{i}/20] Проверка: {url_with_pid}")
-        print(f"   Прайс: {price_csv:.0f} RUB")
-        
-        status = "OK"
-        price_site = None
-        
+    selector_stats = SelectorStats.load(SELECTOR_STATS_PATH)
+    
+    rate_per_host = options.rate_per_host
+    concurrency = options.concurrency
+    crawl_delay = crawl_delay_callback(HEADERS["User-Agent"], http, rate_per_host)
+    limiter = HostRateLimiter(rate_per_host, crawl_delay=crawl_delay)
+    throttle = TokenBucket(options.target_rate, burst=concurrency) if options.target_rate else None
+    controller = (AdaptiveConcurrency(concurrency, latency_target=options.latency_target)
+                  if options.adaptive else None)
+    parse_workers = options.parse_workers
+    if parse_workers is None:
+        parse_workers = os.cpu_count() if full else 0
+    parse_pool = ParsePool(parse_workers) if parse_workers else None
+    scan_bytes = options.scan_bytes
+    
+    def tolerance(offer):
+        return rules.tolerance(offer.price, offer.category_id, offer.vendor)
+    
+    def check(offer, request_timings):
+        if parse_pool is None:
+            return check_offer(offer.price, offer.url, selector_stats, http, request_timings, scan_bytes,
+                               tolerance(offer))
+        # Страница уходит на разбор в пул процессов, поток берёт следующую;
+        # вместо цены — (PendingPrice, секунды загрузки), их дожидается finish()
+        started = time.perf_counter()
+        body, encoding, status, error = fetch_page(offer.url, http, request_timings, scan_bytes)
+        if status is not None:
+            return (offer.price, offer.url, None, status, error)
+        fetched = time.perf_counter() - started
+        pending = parse_pool.submit(body, offer.url, selector_stats, encoding)
+        return (offer.price, offer.url, (pending, fetched), None, None)
+    
+    def finish(offer, result):
+        price_csv, url_with_pid, pending, status, error = result
+        if status is not None:
+            return result
+        pending, fetched = pending
+        price_site, seconds = pending.result()
+        timings.record(TIMING_PHASES[2], seconds)
+        timings.record(TIMING_PHASES[3], fetched + seconds)
+        return compare_price(price_csv, url_with_pid, price_site, tolerance(offer))
+    
+    def worker(offer):
+        if throttle is not None:
+            throttle.acquire()
+        limiter.acquire(offer.url)
+        if controller is None:
+            return check(offer, timings)
+        controller.acquire()
+        started = time.perf_counter()
+        request_timings = RequestTimings(timings, HTTP_PHASES)
+        failed = True
         try:
-            response = requests.get(url_with_pid, headers=HEADERS, timeout=15)
-            response.raise_for_status()
-            price_site = parse_price(response.text)
-            
-            if price_site is None:
-                print(f"   Ошибка: цена не найдена на странице")
-                errors.append((url_with_pid, price_csv, None, "PRICE_NOT_FOUND"))
-                status = "PRICE_NOT_FOUND"
-            elif abs(price_site - price_csv) > 10:
-                diff = abs(price_site - price_csv)
-                print(f"   Расхождение: сайт {price_site:.0f} RUB (разница {diff:.0f} RUB)")
-                errors.append((url_with_pid, price_csv, price_site, f"DIFF_{diff:.0f}"))
-                status = f"DIFF_{diff:.0f}"
-            else:
-                print(f"   Цена совпадает: {price_site:.0f} RUB")
-                correct += 1
-                status = "OK"
+            result = check(offer, request_timings)
+            failed = result[3] is not None and is_transient(result[3])
+            return result
+        finally:
+            # Задержка для AIMD — только сетевая часть: без разбора и ожидания места
+            # в ParsePool; у неудачного запроса фаз нет, и check — это сам запрос
+            latency = request_timings.seconds
+            if latency is None:
+                latency = time.perf_counter() - started
+            controller.release(latency, failed)
+    
+    offers = iter(offers)
+    completed = False
+    try:
+        while True:
+            try:
+                chunk = list(itertools.islice(offers, options.chunk_size))
+            except Exception as e:
+                print(f"Ошибка загрузки XML: {e}")
+                break
+            if not chunk:
+                completed = True
+                break
+            results = fetch_all(chunk, worker, concurrency=concurrency)
+            if parse_pool is not None:
+                results = map(finish, chunk, results)
+            checked_chunk = []
+            for i, (offer, (price_csv, url_with_pid, price_site, status, error)) in enumerate(
+                    zip(chunk, results), len(log) + 1):
+                # В полном режиме в лог попадают только проблемные товары
+                if not full or status != "OK":
+                    print(f"[{i}/{total or '?'}] Проверка: {url_with_pid}")
+                    print(f"   Прайс: {price_csv:.0f} RUB")
                 
-        except Exception as e:
-            print(f"   Ошибка запроса: {e}")
-            errors.append((url_with_pid, price_csv, None, f"REQUEST_ERROR"))
-            status = "REQUEST_ERROR"
-        
-        offers_checked.append((price_csv, url_with_pid, price_site, status))
-        time.sleep(1.0)
+                if status == "OK":
+                    if not full:
+                        print(f"   Цена совпадает: {price_site:.0f} RUB")
+                elif status == "PRICE_NOT_FOUND":
+                    print(f"   Ошибка: цена не найдена на странице")
+                elif status.startswith("DIFF_"):
+                    print(f"   Расхождение: сайт {price_site:.0f} RUB (разница {status[5:]} RUB)")
+                elif is_transient(status):
+                    print(f"   Временная ошибка ({status}), товар нужно перепроверить: {error}")
+                else:
+                    print(f"   Ошибка запроса ({status}): {error}")
+                
+                if price_site is not None:
+                    pairs.append(offer, price_site)
+                if changes is not None:
+                    changes.checked(url_with_pid, status)
+                result = (price_csv, url_with_pid, price_site, status)
+                log.append(result)
+                checked_chunk.append(result)
+            
+            results_store.record_many(checked_chunk)
+            if changes is not None:
+                changes.end_chunk()
+            if checkpoint is not None:
+                # Генератор прайса остановлен на последнем товаре порции:
+                # всё до позиции reader.loaded проверено или отфильтровано
+                checkpoint.save(log_base=log_base, position=reader.loaded, feed_hash=reader.feed_hash.hexdigest(),
+                                log_sizes=log.checkpoint(), skipped=changes.skipped,
+                                elapsed=time.time() - start_time)
+                selector_stats.save(SELECTOR_STATS_PATH)
+            if full:
+                elapsed = time.time() - start_time
+                print(f"Проверено {len(log)} (прочитано из прайса {reader.loaded}, пропущено {changes.skipped}, "
+                      f"{len(log) / max(elapsed, 1e-9):.1f} товаров/сек)")
+    finally:
+        log.close()
+        if parse_pool is not None:
+            parse_pool.close()
+            if parse_pool.broken:
+                print("ВНИМАНИЕ: пул процессов разбора остановился, страницы разбирались в потоках загрузки")
+    if changes is not None and changes.diff is not None and completed:
+        # Удалённые из прайса товары только подсчитываются
+        for _ in changes.diff.removed():
+            pass
+        changes.diff.index().save(feed_index_path)
+        print(f"Изменения прайса: {changes.diff.summary_line()}")
+    if checkpoint is not None:
+        if completed:
+            checkpoint.remove()
+        else:
+            shard_arg = f" --shard {options.shard_index}/{options.shard_count}" if options.shard_count > 1 else ""
+            print(f"Проверка прервана, продолжить: python main.py --full{shard_arg} --resume")
     
     total_time = time.time() - start_time
+    skipped = changes.skipped if changes is not None else 0
+    feed_time = reader.feed_time
+    correct = log.correct
     print("\n" + "="*70)
     print("РЕЗУЛЬТАТЫ ПРОВЕРКИ")
     print("="*70)
-    print(f"Корректных цен: {correct}/{len(offers)} ({correct/len(offers)*100:.1f}%)")
-    print(f"Ошибок: {len(errors)}")
-    print(f"Время: {total_time:.1f} сек")
+    print(f"Корректных цен: {correct}/{len(log)} ({correct/max(len(log), 1)*100:.1f}%)")
+    print(f"Ошибок: {log.error_count}")
+    print(f"Не проверено (временные ошибки): {log.transient_count}")
+    if skipped:
+        print(f"Пропущено (без изменений): {skipped}")
+    print(f"Время: {total_time:.1f} сек (прайс: {feed_time:.1f} сек)")
+    if controller is not None:
+        print(f"Параллельность: итог {controller.limit}, максимум {controller.peak} из {concurrency}, "
+              f"снижений {controller.decreases}")
+    timing_lines = timings.summary_lines(TIMING_PHASES)
+    if timing_lines:
+        print("Время запросов, мс:")
+        for line in timing_lines:
+            print(f"  {line}")
+    drift = analyze(pairs, rules) if len(pairs) else None
+    if drift is not None and full:
+        print("Расхождения цен:")
+        for line in drift.summary_lines():
+            print(f"  {line}")
+    feed_lines = reader.merger.summary_lines(log) if len(feed_urls) > 1 else None
+    if feed_lines:
+        print("Прайсы:")
+        for line in feed_lines:
+            print(f"  {line}")
     print("="*70)
+    for (pattern, expected, actual), n in sorted(selector_stats.drifts.items()):
+        print(f"ВНИМАНИЕ: {pattern}: цена найдена через {actual} вместо {expected} ({n} раз)")
+    
+    selector_stats.save(SELECTOR_STATS_PATH)
+    results_store.close()
+    save_report(log, log.errors, correct, total_time, selector_stats, skipped, timings, feed_time, drift,
+                feed_urls, feed_lines)
+    write_junit(log, log_base + ".junit.xml", total_time)
+    print(f"Журнал результатов: {log.path}")
+
+def parse_args(argv=None):
+    """Разбирает аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Проверка цен с PID")
+    parser.add_argument("--full", action="store_true",
+                        help="проверить весь каталог вместо выборки")
+    parser.add_argument("--budget", type=int, default=SAMPLE_SIZE,
+                        help="товаров в выборочной проверке")
+    parser.add_argument("--random-sample", action="store_true",
+                        help="случайная выборка вместо выбора по приоритету")
+    parser.add_argument("--pid", action="append", metavar="PID",
+                        help="проверить только товар с этим PID или id из прайса (можно несколько раз)")
+    parser.add_argument("--shard", default="0/1", metavar="I/N",
+                        help="проверить только шард I из N (нумерация с 0), например 2/8")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="товаров в одной порции полной проверки")
+    parser.add_argument("--target-rate", type=float, default=None,
+                        help="целевая пропускная способность, товаров в секунду")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="число одновременных запросов (в адаптивном режиме — верхний предел)")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="не подстраивать число одновременных запросов под сервер")
+    parser.add_argument("--latency-target", type=float, default=ADAPTIVE_LATENCY_P95,
+                        help="порог p95 времени ответа, сек: выше него параллельность снижается")
+    parser.add_argument("--rate-per-host", type=float, default=DEFAULT_RATE_PER_HOST,
+                        help="запросов в секунду на один хост")
+    parser.add_argument("--no-http-cache", action="store_true",
+                        help="не использовать дисковый HTTP-кеш")
+    parser.add_argument("--incremental", action="store_true",
+                        help="в полной проверке пропускать товары без изменений с прошлой проверки")
+    parser.add_argument("--ttl-hours", type=float, default=DEFAULT_TTL_HOURS,
+                        help="через сколько часов успешная проверка считается устаревшей")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="процессов для разбора страниц (0 — в потоках загрузки; "
+                             "по умолчанию по числу ядер в режиме --full)")
+    parser.add_argument("--scan-bytes", type=int, default=SCAN_BYTES,
+                        help="прекращать загрузку страницы, если цена в <meta> найдена "
+                             "в первых N байтах (0 — загружать страницы целиком)")
+    parser.add_argument("--feed", action="append", metavar="URL",
+                        help="URL YML-прайса (можно несколько раз; по умолчанию основной прайс)")
+    parser.add_argument("--feeds-file", metavar="PATH",
+                        help="файл со списком прайсов, по одному URL в строке")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="в полной проверке брать только товары, добавленные или изменившиеся "
+                             "в прайсе с прошлой завершённой проверки")
+    parser.add_argument("--feed-diff", action="store_true",
+                        help="только отчёт об изменениях прайса с прошлого --feed-diff, без проверки страниц")
+    parser.add_argument("--resume", action="store_true",
+                        help="продолжить прерванную полную проверку с контрольной точки")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_ABS_TOLERANCE,
+                        help="допустимое расхождение цены, RUB")
+    parser.add_argument("--tolerance-pct", type=float, default=DEFAULT_PCT_TOLERANCE,
+                        help="допустимое расхождение цены, %% от цены прайса (берётся большее из двух)")
+    parser.add_argument("--drift-rules", metavar="JSON",
+                        help="допуски по категориям и производителям (см. drift.DriftRules.load)")
+    parser.add_argument("--flush-every", type=int, default=FLUSH_EVERY,
+                        help="сбрасывать журнал результатов на диск каждые N товаров")
+    parser.add_argument("--merge", nargs="+", metavar="JSONL",
+                        help="объединить журналы шардов в один отчёт и выйти")
+    args = parser.parse_args(argv)
     
-    save_report(offers_checked, errors, correct, total_time)
+    try:
+        index, count = (int(part) for part in args.shard.split("/"))
+    except ValueError:
+        parser.error("--shard должен иметь вид I/N")
+    if count < 1 or not 0 <= index < count:
+        parser.error("--shard: требуется 0 <= I < N")
+    args.shard_index, args.shard_count = index, count
+    if args.chunk_size < 1:
+        parser.error("--chunk-size должен быть не меньше 1")
+    if args.budget < 1:
+        parser.error("--budget должен быть не меньше 1")
+    # Контрольные точки и отпечатки прайса есть только у полной проверки
+    args.full = args.full or args.resume or args.changed_only
+    if args.full and args.pid:
+        parser.error("--pid проверяет отдельные товары и не сочетается с полной проверкой")
+    args.feeds = list(args.feed or [])
+    if args.feeds_file:
+        args.feeds += read_feed_list(args.feeds_file)
+    if len(args.feeds) > MAX_FEEDS:
+        parser.error(f"не больше {MAX_FEEDS} прайсов за прогон")
+    return args
 
 if __name__ == "__main__":
+    args = parse_args()
+    
+    if args.merge:
+        merge_shard_results(args.merge)
+        sys.exit(0)
+    if args.feed_diff:
+        feed_diff_report(args.feeds, not args.no_http_cache)
+        sys.exit(0)
+    
     print("="*70)
-    print("ПРОВЕРКА ЦЕН С PID (20 случайных товаров)")
+    if args.full:
+        print(f"ПРОВЕРКА ЦЕН С PID (весь каталог, шард {args.shard})")
+    elif args.pid:
+        print(f"ПРОВЕРКА ЦЕН С PID (товары {', '.join(args.pid)})")
+    else:
+        print(f"ПРОВЕРКА ЦЕН С PID ({args.budget} {'случайных' if args.random_sample else 'приоритетных'} товаров)")
     print("="*70)
+    if args.drift_rules:
+        rules = DriftRules.load(args.drift_rules, args.tolerance, args.tolerance_pct)
+    else:
+        rules = DriftRules(args.tolerance, args.tolerance_pct)
     print("Требование: цена в прайсе должна совпадать с ценой на странице")
-    print("Допуск: +/-10 RUB")
+    print(f"Допуск: +/-{rules.abs_tolerance:g} RUB"
+          f"{f' или {rules.pct_tolerance:g}% цены' if rules.pct_tolerance else ''}"
+          f"{' (с правилами по категориям и производителям)' if rules.categories or rules.vendors else ''}")
     print("="*70 + "\n")
     
-    check_prices()
\ No newline at end of file
+    check_prices(CheckOptions(
+        full=args.full,
+        shard_index=args.shard_index,
+        shard_count=args.shard_count,
+        chunk_size=args.chunk_size,
+        target_rate=args.target_rate,
+        concurrency=args.concurrency,
+        rate_per_host=args.rate_per_host,
+        adaptive=not args.fixed_concurrency,
+        latency_target=args.latency_target,
+        parse_workers=args.parse_workers,
+        scan_bytes=args.scan_bytes,
+        rules=rules,
+        resume=args.resume,
+        feed_urls=args.feeds,
+        changed_only=args.changed_only,
+        budget=args.budget,
+        prioritize=not args.random_sample,
+        pids=args.pid,
+        use_http_cache=not args.no_http_cache,
+        incremental=args.incremental,
+        ttl_hours=args.ttl_hours,
+        flush_every=args.flush_every,
+    ))
@@ -0,0 +1,137 @@
+"""
+Компактное хранилище товаров прайса.
+Цены лежат в array('d'), URL — в одном байтовом буфере с таблицей смещений,
+категории и производители — в виде кодов словаря. Для поиска есть индексы
+по PID (параметр ?pid= в URL) и по id товара.
+"""
+import hashlib
+import random
+from array import array
+from urllib.parse import urlsplit, parse_qs
+
+from feed import Offer
+
+# Наличие товара (available из прайса) -> код в колонке array('b') и обратно
+AVAILABLE_CODES = {None: -1, "false": 0, "true": 1}
+AVAILABLE_VALUES = {code: value for value, code in AVAILABLE_CODES.items()}
+
+
+def extract_pid(url):
+    """Возвращает значение параметра pid из URL или None"""
+    values = parse_qs(urlsplit(url).query).get('pid')
+    return values[0] if values else None
+
+
+def shard_of(url, shard_count):
+    """
+    Детерминированно относит товар к одному из shard_count шардов
+    по хешу PID (или URL, если PID нет). Не зависит от запуска и машины.
+    """
+    key = extract_pid(url) or url
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+class _Dictionary:
+    """Кодирует повторяющиеся строки (категории, производители) целыми числами"""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+        self.column = array('i')
+
+    def append(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        self.column.append(code)
+
+    def __getitem__(self, row):
+        return self.values[self.column[row]]
+
+
+class OfferStore:
+    """
+    Колоночное хранилище товаров с индексами по PID и id.
+    indexed=False — без индексов (row_by_pid и row_by_offer_id не находят
+    ничего): хранилищу, где поиск не нужен, не нужны и словари на каждый товар.
+    """
+
+    def __init__(self, indexed=True):
+        self.indexed = indexed
+        self.prices = array('d')
+        self.url_data = bytearray()
+        self.url_offsets = array('Q', [0])
+        self.offer_ids = []
+        self.available = array('b')
+        self.categories = _Dictionary()
+        self.vendors = _Dictionary()
+        self.pid_index = {}
+        self.id_index = {}
+
+    @classmethod
+    def from_offers(cls, offers):
+        """Собирает хранилище из итератора Offer"""
+        store = cls()
+        for offer in offers:
+            store.append(offer)
+        return store
+
+    def append(self, offer):
+        """Добавляет товар и возвращает номер его строки"""
+        row = len(self.prices)
+        self.prices.append(offer.price)
+        self.url_data += offer.url.encode('utf-8')
+        self.url_offsets.append(len(self.url_data))
+        self.offer_ids.append(offer.offer_id)
+        self.available.append(AVAILABLE_CODES.get(offer.available, -1))
+        self.categories.append(offer.category_id)
+        self.vendors.append(offer.vendor)
+
+        if self.indexed:
+            pid = extract_pid(offer.url)
+            if pid is not None:
+                self.pid_index.setdefault(pid, row)
+            if offer.offer_id is not None:
+                self.id_index.setdefault(offer.offer_id, row)
+        return row
+
+    def __len__(self):
+        return len(self.prices)
+
+    def url(self, row):
+        """URL товара в строке row"""
+        return self.url_data[self.url_offsets[row]:self.url_offsets[row + 1]].decode('utf-8')
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return Offer(
+            price=self.prices[row],
+            url=self.url(row),
+            offer_id=self.offer_ids[row],
+            available=AVAILABLE_VALUES[self.available[row]],
+            category_id=self.categories[row],
+            vendor=self.vendors[row],
+        )
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def row_by_pid(self, pid):
+        """Номер строки товара с данным PID или None"""
+        return self.pid_index.get(pid)
+
+    def row_by_offer_id(self, offer_id):
+        """Номер строки товара с данным id или None"""
+        return self.id_index.get(offer_id)
+
+    def sample_rows(self, k, rng=random):
+        """Случайные k строк без повторов (все строки, если товаров меньше)"""
+        if len(self) <= k:
+            return list(range(len(self)))
+        return rng.sample(range(len(self)), k)
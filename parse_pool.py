@@ -0,0 +1,109 @@
+"""
+Разбор страниц товаров в пуле процессов.
+Потоки загрузки передают сырые байты страницы и сразу берутся за следующий
+запрос, а extract_price выполняется в отдельных процессах — разбор HTML не
+упирается в GIL и масштабируется по ядрам. Статистика селекторов ведётся
+в основном процессе: обработчик получает привычный селектор и возвращает
+сработавший способ. Если пул процессов сломался (обработчик упал),
+страницы разбираются в вызывающем потоке.
+"""
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from price_parser import extract_price, path_pattern
+
+
+def timed_extract(html, preferred=None, encoding=None):
+    """extract_price в процессе-обработчике; возвращает (цена, способ, секунды)"""
+    started = time.perf_counter()
+    price, tier = extract_price(html, preferred, encoding)
+    return price, tier, time.perf_counter() - started
+
+
+class PendingPrice:
+    """Цена, которая ещё разбирается в пуле; result() ждёт её и учитывает статистику"""
+
+    def __init__(self, future, pattern=None, preferred=None, stats=None, fallback=None):
+        self.future = future
+        self.pattern = pattern
+        self.preferred = preferred
+        self.stats = stats
+        self.fallback = fallback  # Разбор в текущем потоке, если пул сломался
+
+    def result(self):
+        """Возвращает (цена или None, время разбора в секундах)"""
+        try:
+            price, tier, seconds = self.future.result()
+        except BrokenProcessPool:
+            if self.fallback is None:
+                raise
+            price, tier, seconds = self.fallback()
+        self.fallback = None
+        if self.stats is not None and tier is not None:
+            self.stats.record(self.pattern, tier, self.preferred)
+        return price, seconds
+
+
+class ParsePool:
+    """
+    Пул из workers процессов (по умолчанию — по числу ядер). В очереди
+    не больше max_pending страниц: submit() блокирует поток загрузки,
+    пока обработчики не разгрузятся. broken — пул сломался, и страницы
+    разбираются в вызывающих потоках.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        # spawn: дочерние процессы не наследуют потоки и соединения родителя
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        self.slots = threading.BoundedSemaphore(max_pending or self.workers * 4)
+        self.broken = False
+
+    def submit(self, html, url=None, stats=None, encoding=None):
+        """
+        Ставит разбор страницы html (bytes в кодировке encoding из заголовка
+        ответа) в очередь и возвращает PendingPrice. С url и stats
+        (SelectorStats) первым пробуется привычный для шаблона селектор.
+        """
+        pattern = preferred = None
+        if url is not None and stats is not None:
+            pattern = path_pattern(url)
+            preferred = stats.preferred(pattern)
+        stats = stats if pattern is not None else None
+        fallback = functools.partial(self._extract_here, html, preferred, encoding)
+        if not self.broken:
+            self.slots.acquire()
+            try:
+                future = self.executor.submit(timed_extract, html, preferred, encoding)
+            except BrokenProcessPool:
+                self.slots.release()
+                self.broken = True
+            except BaseException:
+                self.slots.release()
+                raise
+            else:
+                future.add_done_callback(lambda _: self.slots.release())
+                return PendingPrice(future, pattern, preferred, stats, fallback)
+        future = Future()
+        future.set_result(fallback())
+        return PendingPrice(future, pattern, preferred, stats)
+
+    def _extract_here(self, html, preferred, encoding):
+        """timed_extract в вызывающем потоке — вместо сломавшегося пула"""
+        self.broken = True
+        return timed_extract(html, preferred, encoding)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,377 @@
+"""
+Извлечение цены со страницы товара.
+Уровни от быстрого к медленному:
+  1. Побайтовый поиск <meta itemprop="price" content="..."> регулярным выражением
+     (вне комментариев, <script> и <style> — как и при разборе DOM)
+  2. Разбор lxml.html и поиск по тем же селекторам через XPath
+  3. BeautifulSoup — только если lxml не смог разобрать страницу
+  4. Регулярное выражение по тексту страницы ("4500 руб")
+Байты страницы декодируются в кодировке из заголовка ответа, иначе
+из <meta charset> в начале страницы, иначе как UTF-8 (page_encoding).
+"""
+import codecs
+import json
+import os
+import re
+import threading
+import warnings
+from urllib.parse import urlsplit
+
+import lxml.etree
+import lxml.html
+from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+
+# Селекторы в порядке приоритета: (CSS для BeautifulSoup, XPath для lxml)
+PRICE_SELECTORS = [
+    ('meta[itemprop="price"]', '//meta[@itemprop="price"]'),
+    ('.price', "//*[contains(concat(' ', normalize-space(@class), ' '), ' price ')]"),
+    ('.current-price', "//*[contains(concat(' ', normalize-space(@class), ' '), ' current-price ')]"),
+    ('.product-price', "//*[contains(concat(' ', normalize-space(@class), ' '), ' product-price ')]"),
+    ('[itemprop="price"]', '//*[@itemprop="price"]'),
+    ('.price-value', "//*[contains(concat(' ', normalize-space(@class), ' '), ' price-value ')]"),
+]
+
+META_SELECTOR = PRICE_SELECTORS[0][0]
+REGEX_TIER = "regex"   # Цена найдена регулярным выражением по тексту
+MIN_HITS = 5           # Попаданий, после которых селектор считается привычным для шаблона
+
+SNIFF_BYTES = 2048     # Начало страницы, где ищется <meta charset>
+
+_XPATHS = [lxml.etree.XPath(xpath) for _, xpath in PRICE_SELECTORS]
+# Парсеры lxml по кодировке: без явной кодировки lxml читал бы байты как latin-1
+_HTML_PARSERS = {}
+# <meta charset="..."> и <meta http-equiv="Content-Type" content="...; charset=...">
+_DECLARED_CHARSET_RE = re.compile(rb'<meta\b[^>]*?\bcharset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+# Мета-тег с ценой или начало области, содержимое которой не разметка
+_META_OR_SKIP_RE = re.compile(
+    rb'(?P<meta><meta\b[^>]*?\bitemprop\s*=\s*["\']?price["\'\s/>][^>]*>)'
+    rb'|(?P<comment><!--)|(?P<script><script\b)|(?P<style><style\b)',
+    re.IGNORECASE)
+_SKIP_END_RES = {
+    "comment": re.compile(rb'-->'),
+    "script": re.compile(rb'</script\s*>', re.IGNORECASE),
+    "style": re.compile(rb'</style\s*>', re.IGNORECASE),
+}
+_SKIP_END_TAIL = 32    # Байт в конце буфера, где может начинаться незаконченный конец области
+_CONTENT_RE = re.compile(rb'\bcontent\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+_TEXT_PRICE_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:₽|руб|Руб)', re.IGNORECASE)
+
+
+def clean_price(price_text):
+    """Переводит текст цены ("3 500 ₽", "от 1,5 Руб.") в float или None"""
+    clean = (
+        price_text
+        .replace('₽', '')
+        .replace(' ', '')
+        .replace(',', '.')
+        .replace('\xa0', '')
+        .replace('Руб.', '')
+        .replace('Руб', '')
+        .replace('От', '')
+        .replace('от', '')
+        .strip()
+    )
+    try:
+        return float(clean)
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_bytes(html):
+    return html if isinstance(html, bytes) else html.encode('utf-8')
+
+
+def page_encoding(html, encoding=None):
+    """
+    Кодировка байтов страницы: encoding (charset из заголовка ответа),
+    иначе объявленная в <meta> в первых SNIFF_BYTES, иначе UTF-8.
+    Неизвестные Python названия пропускаются.
+    """
+    declared = _DECLARED_CHARSET_RE.search(html, 0, SNIFF_BYTES) if not encoding else None
+    for candidate in (encoding, declared and declared.group(1).decode('ascii')):
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                continue
+    return 'utf-8'
+
+
+def _to_text(html, encoding=None):
+    return html.decode(page_encoding(html, encoding), errors='replace') if isinstance(html, bytes) else html
+
+
+def _html_parser(encoding):
+    parser = _HTML_PARSERS.get(encoding)
+    if parser is None:
+        parser = _HTML_PARSERS.setdefault(encoding, lxml.html.HTMLParser(encoding=encoding))
+    return parser
+
+
+def _find_meta_tag(data, pos=0, skip_end=None):
+    """
+    Ищет <meta itemprop="price"> в data начиная с pos, пропуская комментарии,
+    <script> и <style>: тег в них lxml и BeautifulSoup не видят. skip_end —
+    регулярное выражение конца области, внутри которой остановился прошлый
+    поиск. Возвращает (тег или None, позиция для продолжения поиска,
+    конец незакрытой области или None).
+    """
+    while True:
+        if skip_end is not None:
+            end = skip_end.search(data, pos)
+            if end is None:
+                return None, max(pos, len(data) - _SKIP_END_TAIL), skip_end
+            pos = end.end()
+            skip_end = None
+        match = _META_OR_SKIP_RE.search(data, pos)
+        if match is None:
+            last_open = data.rfind(b'<', pos)
+            return None, last_open if last_open >= 0 else len(data), None
+        if match.lastgroup == "meta":
+            return match, match.end(), None
+        skip_end = _SKIP_END_RES[match.lastgroup]
+        pos = match.end()
+
+
+def extract_price_fast(html, encoding=None):
+    """
+    Уровень 1: ищет первый <meta itemprop="price"> в сырых байтах
+    и разбирает его content. None — если тега нет или цена не разобрана.
+    """
+    data = _to_bytes(html)
+    tag = _find_meta_tag(data)[0]
+    if tag is None:
+        return None
+    return _meta_tag_price(tag.group(0), page_encoding(data, encoding) if isinstance(html, bytes) else 'utf-8')
+
+
+def _meta_tag_price(tag, encoding='utf-8'):
+    """Цена из атрибута content найденного тега <meta itemprop="price">"""
+    content = _CONTENT_RE.search(tag)
+    if content is None:
+        return None
+    value = next(group for group in content.groups() if group is not None)
+    return clean_price(value.decode(encoding, errors='replace'))
+
+
+class MetaPriceScanner:
+    """
+    Поиск <meta itemprop="price"> в теле страницы, которое приходит кусками.
+    feed() дописывает кусок в buffer и возвращает True, как только найден
+    тот же тег, что найдёт extract_price_fast, и его content разобран как
+    цена (саму цену из buffer затем извлекает parse_price). Если content
+    не разобран, поиск прекращается: цену ищут остальные селекторы по всей
+    странице. Уже просмотренное начало буфера повторно не сканируется:
+    поиск продолжается с последнего незакрытого «<» или с конца незакрытого
+    комментария (<script>, <style>), поэтому тег на стыке кусков не теряется.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.found = False
+        self._pos = 0         # None — тег без цены, дальше не ищем
+        self._skip_end = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.found or self._pos is None:
+            return self.found
+        tag, self._pos, self._skip_end = _find_meta_tag(self.buffer, self._pos, self._skip_end)
+        if tag is not None:
+            if _meta_tag_price(bytes(tag.group(0))) is None:
+                self._pos = None
+                return False
+            self.found = True
+        return self.found
+
+
+def _selector_order(preferred):
+    """Индексы селекторов: сначала preferred (если это селектор), затем остальные по порядку"""
+    order = list(range(len(PRICE_SELECTORS)))
+    for index, (selector, _) in enumerate(PRICE_SELECTORS):
+        if selector == preferred:
+            order.remove(index)
+            order.insert(0, index)
+    return order
+
+
+def _select_price(first_match, preferred=None):
+    """
+    Проходит по селекторам так же, как исходный parse_price:
+    берётся первый подходящий элемент каждого селектора,
+    для meta читается атрибут content, для остальных — текст.
+    Возвращает (цена, селектор) или (None, None).
+    """
+    for index in _selector_order(preferred):
+        selector = PRICE_SELECTORS[index][0]
+        price_text = first_match(index, selector)
+        if price_text:
+            price = clean_price(price_text)
+            if price is not None:
+                return price, selector
+    return None, None
+
+
+def _lxml_match(html, preferred=None, encoding=None):
+    if isinstance(html, bytes):
+        tree = lxml.html.fromstring(html, parser=_html_parser(page_encoding(html, encoding)))
+    else:
+        tree = lxml.html.fromstring(html)
+
+    def first_match(index, selector):
+        found = _XPATHS[index](tree)
+        if not found:
+            return None
+        if selector.startswith('meta'):
+            return found[0].get('content', '')
+        return ''.join(text.strip() for text in found[0].itertext())
+
+    return _select_price(first_match, preferred)
+
+
+def _soup_match(html, preferred=None):
+    with warnings.catch_warnings():
+        # Сюда попадают как раз страницы с XML-декларацией, которые не разобрал lxml
+        warnings.simplefilter("ignore", XMLParsedAsHTMLWarning)
+        soup = BeautifulSoup(html, 'lxml')
+
+    def first_match(index, selector):
+        price_tag = soup.select_one(selector)
+        if price_tag is None:
+            return None
+        return price_tag.get('content', '') if selector.startswith('meta') else price_tag.get_text(strip=True)
+
+    return _select_price(first_match, preferred)
+
+
+def extract_price_lxml(html, encoding=None):
+    """Уровень 2: разбор lxml.html и поиск по селекторам через XPath"""
+    return _lxml_match(html, encoding=encoding)[0]
+
+
+def extract_price_soup(html):
+    """Уровень 3: BeautifulSoup с CSS-селекторами (медленно, но терпимо к мусору)"""
+    return _soup_match(html)[0]
+
+
+def extract_price_regex(html, encoding=None):
+    """Уровень 4: цена вида "4500 руб" в тексте страницы"""
+    match = _TEXT_PRICE_RE.search(_to_text(html, encoding))
+    if match is None:
+        return None
+    try:
+        return float(match.group(1).replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def extract_price(html, preferred=None, encoding=None):
+    """
+    Извлекает цену и сообщает, какой способ сработал.
+    preferred — селектор из PRICE_SELECTORS или REGEX_TIER, который
+    пробуется первым; encoding — charset из заголовка ответа (для bytes).
+    Возвращает (цена, способ) или (None, None).
+    """
+    if preferred == REGEX_TIER:
+        price = extract_price_regex(html, encoding)
+        if price is not None:
+            return price, REGEX_TIER
+
+    if preferred in (None, META_SELECTOR, REGEX_TIER):
+        price = extract_price_fast(html, encoding)
+        if price is not None:
+            return price, META_SELECTOR
+
+    if isinstance(html, bytes):
+        encoding = page_encoding(html, encoding)
+    try:
+        price, selector = _lxml_match(html, preferred, encoding)
+    except (lxml.etree.ParserError, ValueError):
+        price, selector = _soup_match(_to_text(html, encoding), preferred)
+    if price is not None:
+        return price, selector
+
+    if preferred != REGEX_TIER:
+        price = extract_price_regex(html, encoding)
+        if price is not None:
+            return price, REGEX_TIER
+    return None, None
+
+
+def path_pattern(url):
+    """
+    Шаблон пути страницы для статистики селекторов: первые два сегмента
+    пути, числа заменены на #. /catalog/turbo/123/ -> /catalog/turbo
+    """
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment][:2]
+    return '/' + '/'.join(re.sub(r'\d+', '#', segment) for segment in segments)
+
+
+class SelectorStats:
+    """
+    Статистика срабатывания селекторов цены по шаблонам URL.
+    Хранит накопленные попадания между запусками (JSON-файл) и попадания
+    текущего запуска; сообщает о смене селектора в шаблоне страниц.
+    """
+
+    def __init__(self, hits=None):
+        self.hits = hits or {}        # {шаблон: {способ: попаданий}} за всё время
+        self.run_hits = {}            # то же за текущий запуск
+        self.drifts = {}              # {(шаблон, ожидаемый, фактический): раз}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """Загружает статистику из JSON; пустая статистика, если файла нет"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path):
+        """Сохраняет накопленную статистику в JSON"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.lock:
+            data = json.dumps(self.hits, ensure_ascii=False, indent=1)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+    def preferred(self, pattern):
+        """Способ, чаще всего срабатывавший для шаблона (если набралось MIN_HITS)"""
+        with self.lock:
+            counts = self.hits.get(pattern)
+            if not counts:
+                return None
+            tier, hits = max(counts.items(), key=lambda item: item[1])
+        return tier if hits >= MIN_HITS else None
+
+    def record(self, pattern, tier, preferred=None):
+        """Учитывает сработавший способ; смену привычного селектора считает дрейфом"""
+        with self.lock:
+            counts = self.hits.setdefault(pattern, {})
+            counts[tier] = counts.get(tier, 0) + 1
+            run_counts = self.run_hits.setdefault(pattern, {})
+            run_counts[tier] = run_counts.get(tier, 0) + 1
+            if preferred is not None and tier != preferred:
+                key = (pattern, preferred, tier)
+                self.drifts[key] = self.drifts.get(key, 0) + 1
+
+
+def parse_price(html, url=None, stats=None, encoding=None):
+    """
+    Парсит цену со страницы сайта (html — str или bytes в кодировке
+    encoding из заголовка ответа; без неё — см. page_encoding).
+    Если переданы url и stats (SelectorStats), первым пробуется селектор,
+    который чаще всего срабатывал для страниц с таким же шаблоном URL.
+    """
+    if url is None or stats is None:
+        return extract_price(html, encoding=encoding)[0]
+
+    pattern = path_pattern(url)
+    preferred = stats.preferred(pattern)
+    price, tier = extract_price(html, preferred, encoding)
+    if tier is not None:
+        stats.record(pattern, tier, preferred)
+    return price
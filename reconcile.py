@@ -0,0 +1,159 @@
+"""
+Сверка sitemap-файлов с YML-прайсом.
+Все <loc> из sitemap-файлов и все <url> товаров прайса сводятся к 64-битным
+хешам нормализованного URL (хост, путь без завершающего / и
+отсортированные параметры; схема и #фрагмент не учитываются) в отсортированных array('Q') — около 8 байт на адрес,
+поэтому миллионы URL помещаются в десятки мегабайт.
+Отчёт: товары прайса, которых нет в sitemap, и страницы sitemap без товара.
+Из sitemap сверяются только карточки товаров (PRODUCT_PATTERN): категории
+и служебные страницы товаров в прайсе не имеют.
+Прайс читается дважды (второй раз обычно из HTTP-кеша, ответ 304).
+"""
+import argparse
+import os
+import re
+from array import array
+from datetime import datetime
+
+from feed import iter_offers
+from http_cache import HttpCache
+from http_client import default_client
+from settings import XML_URL, HEADERS, HTTP_CACHE_DIR
+from sitemaps import (
+    CHUNK_BYTES, MAX_WORKERS, SITEMAP_INDEX_URL, UrlKeySet, crawl_index, iter_sitemap_entries, url_key,
+)
+
+# URL карточки товара в sitemap: с параметром pid, как URL товаров в прайсе
+PRODUCT_PATTERN = r"[?&]pid=[^&#]+"
+
+
+def reconcile(feed_url=XML_URL, index_url=SITEMAP_INDEX_URL, product_pattern=PRODUCT_PATTERN,
+              workers=MAX_WORKERS, use_http_cache=True):
+    """
+    Сверяет прайс feed_url с sitemap-файлами индекса index_url.
+    product_pattern — регулярное выражение: в сверку попадают только такие
+    URL из sitemap (карточки товаров); пустое — все URL. Списки расхождений
+    пишутся в отчёт по мере обхода. Возвращает (имя отчёта, словарь со счётчиками).
+    """
+    http = HttpCache(HTTP_CACHE_DIR) if use_http_cache else default_client()
+    product_re = re.compile(product_pattern) if product_pattern else None
+
+    print("Загрузка прайса...")
+    feed_keys = UrlKeySet(url_key(offer.url) for offer in iter_offers(feed_url, headers=HEADERS, http=http))
+    print(f"Уникальных URL в прайсе: {len(feed_keys)}")
+
+    def scan_file(sitemap_url):
+        keys = array('Q')
+        orphans = []
+        children = []
+        try:
+            with http.get(sitemap_url, headers=HEADERS, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                for entry in iter_sitemap_entries(response.iter_content(CHUNK_BYTES)):
+                    if entry.kind == "sitemap":
+                        children.append(entry.loc)
+                        continue
+                    if not entry.loc or (product_re is not None and not product_re.search(entry.loc)):
+                        continue
+                    key = url_key(entry.loc)
+                    keys.append(key)
+                    if key not in feed_keys:
+                        orphans.append((key, entry.loc))
+        except Exception as e:
+            return keys, orphans, children, e
+        return keys, orphans, children, None
+
+    os.makedirs("reports", exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"reports/reconcile_{timestamp}.txt"
+
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("="*70 + "\n")
+        f.write("СВЕРКА SITEMAP И ПРАЙСА\n")
+        f.write("="*70 + "\n")
+        f.write(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
+        f.write(f"Прайс: {feed_url}\n")
+        f.write(f"Sitemap: {index_url}\n")
+        if product_pattern:
+            f.write(f"Фильтр URL: {product_pattern}\n")
+        f.write("="*70 + "\n\n")
+
+        print("Обход sitemap-файлов...")
+        f.write("СТРАНИЦЫ SITEMAP БЕЗ ТОВАРА В ПРАЙСЕ:\n")
+        # Ключи всех sitemap-файлов: страница без товара пишется в отчёт
+        # только при первом появлении, как и в счётчике уникальных URL
+        sitemap_keys = UrlKeySet()
+        orphan_count = 0
+        files = 0
+        failed_files = []
+        scanned = crawl_index([index_url], scan_file, lambda result: result[2], workers=workers)
+        for url, (keys, orphans, children, error) in scanned:
+            files += 1
+            if error is not None:
+                failed_files.append((url, error))
+                print(f"[FAIL] {url} -> {error}")
+            for key, orphan in orphans:
+                if sitemap_keys.add(key):
+                    orphan_count += 1
+                    f.write(f"{orphan}\n")
+            for key in keys:
+                sitemap_keys.add(key)
+        print(f"Sitemap-файлов: {files}, уникальных URL: {len(sitemap_keys)}")
+
+        print("Поиск товаров без страницы в sitemap...")
+        f.write("\nТОВАРЫ ПРАЙСА, ОТСУТСТВУЮЩИЕ В SITEMAP:\n")
+        # Повторы URL в прайсе отбрасываются по номеру ключа в feed_keys
+        reported = bytearray(len(feed_keys))
+        missing = 0
+        for offer in iter_offers(feed_url, headers=HEADERS, http=http):
+            key = url_key(offer.url)
+            if key in sitemap_keys:
+                continue
+            row = feed_keys.find(key)
+            if row >= 0:
+                if reported[row]:
+                    continue
+                reported[row] = 1
+            missing += 1
+            f.write(f"{offer.url}\n")
+
+        if failed_files:
+            f.write("\nНЕДОСТУПНЫЕ SITEMAP-ФАЙЛЫ:\n")
+            for url, error in failed_files:
+                f.write(f"{url} -> {error}\n")
+
+        stats = {
+            "feed_urls": len(feed_keys),
+            "sitemap_urls": len(sitemap_keys),
+            "sitemap_files": files,
+            "failed_files": len(failed_files),
+            "missing_in_sitemap": missing,
+            "orphans_in_sitemap": orphan_count,
+        }
+        f.write("\n" + "="*70 + "\n")
+        f.write("ИТОГИ СВЕРКИ\n")
+        f.write("="*70 + "\n")
+        f.write(f"URL в прайсе: {stats['feed_urls']}\n")
+        f.write(f"URL в sitemap: {stats['sitemap_urls']} (файлов: {files}, недоступно: {len(failed_files)})\n")
+        f.write(f"Товаров нет в sitemap: {stats['missing_in_sitemap']}\n")
+        f.write(f"Страниц sitemap без товара: {stats['orphans_in_sitemap']}\n")
+        f.write("="*70 + "\n")
+
+    print(f"Товаров нет в sitemap: {stats['missing_in_sitemap']}")
+    print(f"Страниц sitemap без товара: {stats['orphans_in_sitemap']}")
+    print(f"\nОтчёт сохранён: {filename}")
+    return filename, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сверка sitemap-файлов с YML-прайсом")
+    parser.add_argument("--feed", default=XML_URL, help="URL YML-прайса")
+    parser.add_argument("--sitemap", default=SITEMAP_INDEX_URL, help="URL индекса sitemap")
+    parser.add_argument("--product-pattern", default=PRODUCT_PATTERN,
+                        help="регулярное выражение для URL товаров в sitemap (пустая строка — все URL)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="параллельных загрузок sitemap-файлов")
+    parser.add_argument("--no-http-cache", action="store_true", help="не использовать HTTP-кеш")
+    args = parser.parse_args()
+
+    reconcile(args.feed, args.sitemap, args.product_pattern, args.workers, not args.no_http_cache)
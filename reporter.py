@@ -0,0 +1,178 @@
+"""
+Потоковая запись результатов проверки цен.
+Каждый проверенный товар сразу дописывается в JSONL (и CSV), файлы
+сбрасываются на диск каждые flush_every записей — при падении на середине
+прогона проверенное не теряется. Итоговые отчёты (текстовый и JUnit XML)
+строятся повторным чтением журнала, поэтому память не зависит от числа товаров.
+"""
+import csv
+import json
+import os
+from xml.sax.saxutils import quoteattr
+
+from http_client import is_transient
+
+FLUSH_EVERY = 100
+CSV_FIELDS = ("price_csv", "url", "price_site", "status")
+
+
+def read_results(path):
+    """
+    Читает журнал JSONL и отдаёт (price_csv, url, price_site, status).
+    Недописанная последняя строка (прогон прервался) пропускается.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            yield (record["price_csv"], record["url"], record["price_site"], record["status"])
+
+
+class _ErrorsView:
+    """Ошибки журнала в формате (url, price_csv, price_site, status) — для save_report"""
+
+    def __init__(self, log):
+        self.log = log
+
+    def __len__(self):
+        return self.log.error_count
+
+    def __iter__(self):
+        for price_csv, url, price_site, status in self.log:
+            if status != "OK" and not is_transient(status):
+                yield (url, price_csv, price_site, status)
+
+
+class ResultLog:
+    """
+    Журнал результатов: base_path.jsonl и base_path.csv.
+    Ведёт счётчики по статусам; len() и повторный обход читают журнал
+    с диска, как список offers_checked.
+    resume_from — размеры файлов из checkpoint(): журнал прерванного прогона
+    обрезается до них (записи после контрольной точки отбрасываются),
+    счётчики восстанавливаются, новые записи дописываются в конец.
+    """
+
+    def __init__(self, base_path, flush_every=FLUSH_EVERY, write_csv=True, resume_from=None):
+        self.path = base_path + ".jsonl"
+        self.csv_path = base_path + ".csv" if write_csv else None
+        self.flush_every = flush_every
+        self.count = 0
+        self.correct = 0
+        self.error_count = 0
+        self.transient_count = 0
+        self.closed = False
+        mode = "w"
+        if resume_from is not None:
+            mode = "a"
+            jsonl_size, csv_size = resume_from
+            os.truncate(self.path, jsonl_size)
+            if self.csv_path:
+                os.truncate(self.csv_path, csv_size)
+            for _, _, _, status in read_results(self.path):
+                self._count(status)
+        self._jsonl = open(self.path, mode, encoding="utf-8")
+        self._csv_file = None
+        if self.csv_path:
+            self._csv_file = open(self.csv_path, mode, encoding="utf-8", newline="")
+            self._csv = csv.writer(self._csv_file)
+            if resume_from is None:
+                self._csv.writerow(CSV_FIELDS)
+
+    @classmethod
+    def from_results(cls, base_path, results, **kwargs):
+        """Журнал из готовых результатов (например, при объединении шардов)"""
+        log = cls(base_path, **kwargs)
+        for result in results:
+            log.append(result)
+        log.close()
+        return log
+
+    def append(self, result):
+        """Дописывает результат (price_csv, url, price_site, status)"""
+        price_csv, url, price_site, status = result
+        self._jsonl.write(json.dumps(
+            {"price_csv": price_csv, "url": url, "price_site": price_site, "status": status},
+            ensure_ascii=False,
+        ) + "\n")
+        if self._csv_file is not None:
+            self._csv.writerow(result)
+        self._count(status)
+        if self.count % self.flush_every == 0:
+            self.flush()
+
+    def _count(self, status):
+        self.count += 1
+        if status == "OK":
+            self.correct += 1
+        elif is_transient(status):
+            self.transient_count += 1
+        else:
+            self.error_count += 1
+
+    def flush(self):
+        if self.closed:
+            return
+        self._jsonl.flush()
+        if self._csv_file is not None:
+            self._csv_file.flush()
+
+    def checkpoint(self):
+        """Сбрасывает журнал на диск и возвращает размеры файлов [JSONL, CSV] для resume_from"""
+        self.flush()
+        return [os.path.getsize(self.path), os.path.getsize(self.csv_path) if self.csv_path else 0]
+
+    def close(self):
+        if self.closed:
+            return
+        self._jsonl.close()
+        if self._csv_file is not None:
+            self._csv_file.close()
+        self.closed = True
+
+    @property
+    def errors(self):
+        return _ErrorsView(self)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.flush()
+        return read_results(self.path)
+
+
+def write_junit(results, path, total_time, suite_name="price_check"):
+    """
+    JUnit XML для GitLab: товар — testcase, расхождение или ошибка — failure,
+    временная ошибка — skipped. results обходится дважды (счётчики, затем записи).
+    """
+    total = failures = skipped = 0
+    for _, _, _, status in results:
+        total += 1
+        if status == "OK":
+            continue
+        if is_transient(status):
+            skipped += 1
+        else:
+            failures += 1
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(f'<testsuites><testsuite name={quoteattr(suite_name)} tests="{total}" '
+                f'failures="{failures}" errors="0" skipped="{skipped}" time="{total_time:.3f}">\n')
+        for price_csv, url, price_site, status in results:
+            f.write(f'  <testcase classname={quoteattr(suite_name)} name={quoteattr(url)}')
+            if status == "OK":
+                f.write('/>\n')
+                continue
+            site = f"{price_site:.0f}" if price_site is not None else "N/A"
+            message = quoteattr(f"{status}: прайс {price_csv:.0f} RUB, сайт {site} RUB")
+            if is_transient(status):
+                f.write(f'><skipped message={message}/></testcase>\n')
+            else:
+                f.write(f'><failure type={quoteattr(status)} message={message}/></testcase>\n')
+        f.write('</testsuite></testsuites>\n')
+    return path
@@ -0,0 +1,93 @@
+"""
+Хранилище результатов проверки цен между запусками (SQLite).
+Для каждого товара хранится последняя проверка: цена в прайсе, цена на
+сайте, статус и время. Инкрементальный прогон перепроверяет только товары,
+у которых изменилась цена в прайсе, прошлая проверка не была успешной
+или устарела (старше TTL).
+"""
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_TTL_HOURS = 72.0
+PRICE_EPSILON = 0.005   # Цены в прайсе сравниваются с точностью до копейки
+MAX_QUERY_PARAMS = 500  # Параметров в одном запросе (лимит SQLite — 999 в старых версиях)
+
+# Последняя проверка товара
+CheckRecord = namedtuple("CheckRecord", "url feed_price site_price status checked_at")
+
+
+class ResultStore:
+    """
+    Последние результаты проверки по URL товара.
+    Потокобезопасен: соединение SQLite под общей блокировкой.
+    """
+
+    def __init__(self, path, ttl_hours=DEFAULT_TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " url TEXT PRIMARY KEY, feed_price REAL, site_price REAL,"
+            " status TEXT, checked_at REAL)"
+        )
+        self.db.commit()
+
+    def get(self, url):
+        """Последняя проверка товара (CheckRecord) или None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT url, feed_price, site_price, status, checked_at FROM results WHERE url = ?",
+                (url,),
+            ).fetchone()
+        return CheckRecord(*row) if row else None
+
+    def get_many(self, urls):
+        """Последние проверки товаров urls: словарь {url: CheckRecord}, непроверенных в нём нет"""
+        urls = list(urls)
+        records = {}
+        with self.lock:
+            for start in range(0, len(urls), MAX_QUERY_PARAMS):
+                batch = urls[start:start + MAX_QUERY_PARAMS]
+                rows = self.db.execute(
+                    "SELECT url, feed_price, site_price, status, checked_at FROM results"
+                    f" WHERE url IN ({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for row in rows:
+                    records[row[0]] = CheckRecord(*row)
+        return records
+
+    def needs_check(self, url, feed_price, now=None):
+        """
+        Нужно ли проверять товар: его ещё не проверяли, цена в прайсе
+        изменилась, прошлый статус не OK или проверка старше TTL.
+        """
+        record = self.get(url)
+        if record is None or record.status != "OK":
+            return True
+        if abs(record.feed_price - feed_price) > PRICE_EPSILON:
+            return True
+        now = time.time() if now is None else now
+        return now - record.checked_at > self.ttl
+
+    def record_many(self, results, now=None):
+        """Сохраняет результаты [(price_csv, url, price_site, status)] одной транзакцией"""
+        now = time.time() if now is None else now
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                ((url, price_csv, price_site, status, now) for price_csv, url, price_site, status in results),
+            )
+            self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,81 @@
+"""
+Разбор robots.txt: задержка между запросами (Crawl-delay).
+urllib.robotparser принимает только целые значения, а на сайтах
+встречается и «Crawl-delay: 0.5», поэтому директива разбирается здесь.
+"""
+from urllib.parse import urlsplit
+
+from http_client import default_client
+
+
+def parse_crawl_delay(text, user_agent="*"):
+    """
+    Crawl-delay в секундах из группы, подходящей user_agent
+    (имя агента в группе — подстрока названия нашего клиента),
+    иначе из группы «*». None, если директивы нет.
+    """
+    token = user_agent.split("/")[0].strip().lower()
+    specific = None
+    default = None
+    agents = []
+    in_rules = False
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = (part.strip() for part in line.split(":", 1))
+        field = field.lower()
+        if field == "user-agent":
+            if in_rules:
+                agents = []
+                in_rules = False
+            agents.append(value.lower())
+            continue
+        in_rules = True
+        if field != "crawl-delay":
+            continue
+        try:
+            delay = float(value)
+        except ValueError:
+            continue
+        if delay < 0:
+            continue
+        for agent in agents:
+            if agent == "*":
+                if default is None:
+                    default = delay
+            elif token and agent in token and specific is None:
+                specific = delay
+    return specific if specific is not None else default
+
+
+def fetch_crawl_delay(site_url, user_agent="*", http=None, timeout=10):
+    """
+    Загружает robots.txt сайта site_url и возвращает Crawl-delay
+    (см. parse_crawl_delay). Если файл недоступен — None.
+    """
+    parts = urlsplit(site_url)
+    http = http or default_client()
+    try:
+        with http.get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=timeout) as response:
+            if response.status_code != 200:
+                return None
+            return parse_crawl_delay(response.text, user_agent)
+    except Exception:
+        return None
+
+
+def crawl_delay_callback(user_agent="*", http=None, max_rate=None):
+    """
+    Функция url -> Crawl-delay хоста url для fetcher.HostRateLimiter:
+    robots.txt загружается при первом запросе к хосту, найденная задержка
+    печатается вместе с итоговым лимитом (не больше max_rate запросов/сек).
+    """
+    def crawl_delay(url):
+        delay = fetch_crawl_delay(url, user_agent, http)
+        if delay:
+            rate = 1.0 / delay if max_rate is None else min(max_rate, 1.0 / delay)
+            print(f"robots.txt {urlsplit(url).netloc}: Crawl-delay {delay:g} сек, "
+                  f"не больше {rate:.2f} запросов/сек")
+        return delay
+    return crawl_delay
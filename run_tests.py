@@ -5,10 +5,13 @@
 import sys
 import subprocess
 
-def run_tests():
-    """Запускает все тесты через pytest"""
+def run_tests(unit=False):
+    """
+    Запускает тесты через pytest: интеграционные или, с unit,
+    быстрые без сети (юнит-тесты и проверки на кассетах)
+    """
     print("="*70)
-    print("Запуск интеграционных тестов GT-Shop")
+    print(f"Запуск {'быстрых' if unit else 'интеграционных'} тестов GT-Shop")
     print("="*70)
     print()
     
@@ -17,12 +20,12 @@ def run_tests():
         sys.executable, "-m", "pytest",
         "tests/",
         "-v",
-        "-m", "integration",
+        "-m", "not integration" if unit else "integration",
         "--tb=short"
     ])
     
     return result.returncode
 
 if __name__ == "__main__":
-    exit_code = run_tests()
+    exit_code = run_tests(unit="--unit" in sys.argv[1:])
     sys.exit(exit_code)
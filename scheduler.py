@@ -0,0 +1,93 @@
+"""
+Приоритет товаров для выборочной проверки.
+Вместо равновероятной выборки каждому товару назначается вес: порядок
+цены (дорогой турбокомпрессор важнее болта), изменение цены в прайсе с
+прошлой проверки, статус прошлой проверки (расхождение, цена не найдена,
+ошибка) и её давность. Проверяются budget товаров с наибольшим весом:
+они отбираются кучей размера budget за один проход, O(n log budget),
+поэтому прайс любого размера не сортируется целиком.
+"""
+import heapq
+import itertools
+import math
+import random
+import time
+
+from http_client import is_transient
+
+PRICE_WEIGHT = 1.0           # За порядок цены: log10, 50 RUB ~ 1.7, 300 000 RUB ~ 5.5
+CHANGE_WEIGHT = 4.0          # За изменение цены в прайсе (доля от прошлой цены, не больше 1)
+AGE_WEIGHT = 2.0             # За давность проверки; полный вес — через stale_hours
+NEVER_CHECKED_WEIGHT = 2.0   # Товар ещё не проверялся
+# Статус прошлой проверки -> вес
+STATUS_WEIGHTS = {"DIFF": 4.0, "PRICE_NOT_FOUND": 3.0, "ERROR": 1.5, "RETRY": 1.0, "OK": 0.0}
+JITTER = 0.5                 # Случайная добавка: при равных весах выборка меняется от запуска к запуску
+DEFAULT_STALE_HOURS = 72.0
+LOOKUP_BATCH = 500           # URL в одном запросе к ResultStore
+
+
+def status_group(status):
+    """Группа статуса проверки для STATUS_WEIGHTS"""
+    if status == "OK" or status == "PRICE_NOT_FOUND":
+        return status
+    if status.startswith("DIFF_"):
+        return "DIFF"
+    if is_transient(status):
+        return "RETRY"
+    return "ERROR"
+
+
+class CheckScheduler:
+    """
+    Отбор товаров по весу. results_store (result_store.ResultStore) —
+    история проверок; без неё учитываются только цены. jitter и rng задают
+    случайную добавку к весу (0 — отбор детерминирован).
+    """
+
+    def __init__(self, results_store=None, stale_hours=DEFAULT_STALE_HOURS, jitter=JITTER, rng=random, now=None):
+        self.results_store = results_store
+        self.stale = stale_hours * 3600
+        self.jitter = jitter
+        self.rng = rng
+        self.now = now
+
+    def score(self, offer, record, now):
+        """Вес товара offer по прошлой проверке record (CheckRecord или None)"""
+        score = PRICE_WEIGHT * math.log10(max(offer.price, 1.0))
+        if record is None:
+            score += NEVER_CHECKED_WEIGHT + AGE_WEIGHT
+        else:
+            if record.feed_price is not None:
+                change = abs(offer.price - record.feed_price) / max(record.feed_price, 1.0)
+                score += CHANGE_WEIGHT * min(change, 1.0)
+            score += STATUS_WEIGHTS[status_group(record.status)]
+            score += AGE_WEIGHT * min(max(now - record.checked_at, 0.0) / self.stale, 1.0)
+        if self.jitter:
+            score += self.jitter * self.rng.random()
+        return score
+
+    def scored(self, offers):
+        """(вес, товар) для каждого товара; история запрашивается порциями по LOOKUP_BATCH"""
+        now = time.time() if self.now is None else self.now
+        offers = iter(offers)
+        while True:
+            batch = list(itertools.islice(offers, LOOKUP_BATCH))
+            if not batch:
+                return
+            records = self.results_store.get_many([offer.url for offer in batch]) if self.results_store is not None else {}
+            for offer in batch:
+                yield self.score(offer, records.get(offer.url), now), offer
+
+    def select(self, offers, budget):
+        """budget товаров с наибольшим весом, по убыванию веса"""
+        if budget <= 0:
+            return []
+        heap = []
+        # Номер товара разрешает равенство весов без сравнения самих Offer
+        for n, (score, offer) in enumerate(self.scored(offers)):
+            item = (score, -n, offer)
+            if len(heap) < budget:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        return [offer for _, _, offer in sorted(heap, reverse=True)]
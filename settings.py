@@ -0,0 +1,16 @@
+"""
+Общие настройки сайта: адрес прайса, заголовки запросов и каталог
+состояния между запусками. Вынесены из main.py, чтобы reconcile.py,
+link_health.py и cassette.py не импортировали весь main.
+"""
+import os
+
+XML_URL = "https://parts.gt-shop.ru/yml/gtun.4.xml"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept-Language": "ru-RU,ru;q=0.9",
+}
+
+STATE_DIR = os.path.join(".cache", "gt-shop")  # Состояние между запусками
+HTTP_CACHE_DIR = os.path.join(STATE_DIR, "http")
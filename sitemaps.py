@@ -0,0 +1,184 @@
+"""
+Потоковый разбор sitemap-файлов.
+Общий для tests/sitemap/check_sitemaps.py, reconcile.py и link_health.py:
+элементы <url> и <sitemap> отдаются по мере разбора и сразу удаляются из
+дерева; crawl_index обходит вложенные индексы. URL сравниваются по 64-битному ключу нормализованного адреса;
+множества ключей — отсортированные array('Q') (UrlKeySet).
+"""
+import bisect
+import hashlib
+import xml.etree.ElementTree as ET
+from array import array
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+from fetcher import fetch_all
+
+SITEMAP_INDEX_URL = "https://parts.gt-shop.ru/sitemap.xml"
+NAMESPACE = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+CHUNK_BYTES = 64 * 1024
+KEY_BUFFER = 65536   # Новых ключей UrlKeySet.add() в множестве до слияния в массив
+MAX_WORKERS = 8      # Параллельных загрузок sitemap-файлов
+MAX_INDEX_DEPTH = 3  # Глубина раскрытия вложенных индексов
+
+# Запись sitemap: kind — "url" (страница) или "sitemap" (вложенный файл индекса)
+SitemapEntry = namedtuple("SitemapEntry", "kind loc lastmod")
+
+
+def normalize_url(url):
+    """
+    Хост в нижнем регистре, путь без завершающего / и параметры,
+    отсортированные по имени (товары различаются по ?pid=).
+    """
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return parts.netloc.lower() + path + ('?' + query if query else '')
+
+
+def url_key(url):
+    """64-битный ключ нормализованного URL"""
+    digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class UrlKeySet:
+    """
+    Множество 64-битных ключей (url_key, feeds.offer_key): отсортированный
+    array('Q') уникальных ключей, около 8 байт на ключ; проверка вхождения —
+    бинарный поиск. Ключи сортируются в NumPy без промежуточного списка.
+    add() копит новые ключи в множестве и сливает их в массив каждые
+    buffer_size ключей.
+    """
+
+    def __init__(self, keys=(), buffer_size=KEY_BUFFER):
+        if not isinstance(keys, array):
+            keys = array('Q', keys)
+        unique = np.unique(np.frombuffer(keys, dtype=np.uint64))
+        self.keys = array('Q')
+        self.keys.frombytes(unique.tobytes())
+        self.buffer = set()
+        self.buffer_size = buffer_size
+
+    def __len__(self):
+        return len(self.keys) + len(self.buffer)
+
+    def find(self, key):
+        """Номер ключа key в keys или -1 (ключи из буфера add() не учитываются)"""
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return -1
+
+    def __contains__(self, key):
+        return key in self.buffer or self.find(key) >= 0
+
+    def add(self, key):
+        """Добавляет key; False, если он уже был"""
+        if key in self:
+            return False
+        self.buffer.add(key)
+        if len(self.buffer) >= self.buffer_size:
+            # Ключей буфера в массиве нет: слияние — вставка по позициям, O(n)
+            keys = np.frombuffer(self.keys, dtype=np.uint64)
+            new = np.sort(np.fromiter(self.buffer, dtype=np.uint64, count=len(self.buffer)))
+            merged = np.insert(keys, np.searchsorted(keys, new), new)
+            self.keys = array('Q')
+            self.keys.frombytes(merged.tobytes())
+            self.buffer.clear()
+        return True
+
+
+def parse_lastmod(text):
+    """
+    Разбирает дату <lastmod> (W3C Datetime, допускается суффикс Z).
+    Возвращает datetime с часовым поясом или None.
+    """
+    try:
+        dt_str = text.strip()
+        if dt_str.endswith('Z'):
+            dt = datetime.fromisoformat(dt_str[:-1] + '+00:00')
+        else:
+            dt = datetime.fromisoformat(dt_str)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def iter_sitemap_entries(chunks):
+    """
+    Потоково разбирает sitemap или индекс sitemap из итератора байтовых
+    кусков и отдаёт SitemapEntry для каждого <url> и <sitemap>.
+    Ошибки XML (ET.ParseError) пробрасываются.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == f"{NAMESPACE}url":
+                kind = "url"
+            elif elem.tag == f"{NAMESPACE}sitemap":
+                kind = "sitemap"
+            else:
+                continue
+            loc = (elem.findtext(f"{NAMESPACE}loc") or "").strip()
+            lastmod_text = elem.findtext(f"{NAMESPACE}lastmod")
+            lastmod = parse_lastmod(lastmod_text) if lastmod_text else None
+            elem.clear()
+            if elem in root:
+                root.remove(elem)
+            yield SitemapEntry(kind, loc, lastmod)
+    parser.close()
+
+
+def scan_sitemap_stream(chunks):
+    """
+    За один проход находит самую свежую дату <url><lastmod>, считает <url>
+    и собирает <sitemap><loc>, если это вложенный индекс.
+    Возвращает (lastmod или None, число url, список вложенных sitemap).
+    """
+    lastmod = None
+    url_count = 0
+    children = []
+    for entry in iter_sitemap_entries(chunks):
+        if entry.kind == "url":
+            url_count += 1
+            if entry.lastmod is not None and (lastmod is None or entry.lastmod > lastmod):
+                lastmod = entry.lastmod
+        elif entry.loc:
+            children.append(entry.loc)
+    return lastmod, url_count, children
+
+
+def crawl_index(urls, scan, children, workers=MAX_WORKERS, max_depth=MAX_INDEX_DEPTH):
+    """
+    Обходит sitemap-файлы urls по уровням: scan(url) выполняется в пуле из
+    workers потоков, генератор отдаёт (url, результат scan) по порядку.
+    Вложенные файлы берутся из children(результат) уже после того, как
+    вызывающий обработал результат, и раскрываются не глубже max_depth
+    уровней. Каждый URL обходится один раз.
+    """
+    level = list(dict.fromkeys(urls))
+    seen = set(level)
+    depth = 0
+    while level:
+        next_level = []
+        for url, result in zip(level, fetch_all(level, scan, concurrency=workers)):
+            yield url, result
+            if depth < max_depth:
+                for child in children(result):
+                    if child not in seen:
+                        seen.add(child)
+                        next_level.append(child)
+        level = next_level
+        depth += 1
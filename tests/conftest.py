@@ -0,0 +1,25 @@
+"""
+Общие фикстуры тестов: локальный HTTP-сервер
+"""
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def server(request):
+    """
+    URL локального HTTP-сервера с обработчиком Handler из модуля теста
+    (подкласс BaseHTTPRequestHandler); запросы в stderr не пишутся.
+    """
+    class QuietHandler(request.module.Handler):
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
@@ -3,13 +3,38 @@
 # Проверяет:
 #   - Доступность файлов (HTTP 200)
 #   - Наличие и актуальность даты <lastmod> (не старше 14 дней)
+#   - Количество <url> в каждом файле
+# Каждый дочерний sitemap скачивается один раз и разбирается потоково;
+# файлы проверяются параллельно, вложенные индексы раскрываются рекурсивно.
+# Время ответа и загрузки каждого файла собирается в гистограммы (p50/p95/p99).
+# Crawl-delay из robots.txt ограничивает частоту запросов к sitemap-файлам.
+# С --links дополнительно проверяются страницы из sitemap (link_health.py):
+# HEAD/GET, редиректы, выборка по разделам.
 # Весь вывод сохраняется в файл sitemap_check_report.txt
 
-import urllib.request
+import os
+import time
 from xml.etree import ElementTree as ET
 from datetime import datetime, timezone, timedelta
+from collections import namedtuple
+import argparse
 import sys
 
+# Корень репозитория — для импорта общих модулей
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import http_client
+from http_cache import HttpCache
+from fetcher import HostRateLimiter
+from robots import parse_crawl_delay
+from timing import Timings
+import link_health
+from settings import HTTP_CACHE_DIR
+from sitemaps import (
+    NAMESPACE, CHUNK_BYTES, MAX_INDEX_DEPTH, MAX_WORKERS, SITEMAP_INDEX_URL,
+    crawl_index, parse_lastmod, scan_sitemap_stream,
+)
+
 # Настройка логирования в файл
 # Открываем файл для записи отчёта
 log_file = open("sitemap_check_report.txt", "w", encoding="utf-8")
@@ -24,10 +49,30 @@ def log_print(*args, **kwargs):
 
 #Константы 
 BASE_URL = "https://parts.gt-shop.ru"
-SITEMAP_INDEX_URL = f"{BASE_URL}/sitemap.xml"
 ROBOTS_URL = f"{BASE_URL}/robots.txt"
 MAX_DAYS_OLD = 14  # Максимально допустимый возраст данных в днях
 
+# Результат одного прохода по sitemap-файлу
+SitemapScan = namedtuple("SitemapScan", "status_code lastmod url_count children")
+
+# Замеры загрузки sitemap-файлов: ответ (до заголовков) и тело с потоковым разбором
+TIMING_PHASES = ("ответ", "тело и разбор", "всего")
+timings = Timings()
+
+# Дисковый HTTP-кеш; включается в main(), при импорте модуля запросы идут напрямую
+http_cache = None
+
+
+def http_get(url, stream=False):
+    """
+    GET-запрос через общий HTTP-клиент (пул соединений, повторы при 429/5xx)
+    с таймаутом 10 секунд. Если включён http_cache, неизменившиеся файлы
+    (ответ 304) берутся с диска.
+    """
+    if http_cache is not None:
+        return http_cache.get(url, timeout=10)
+    return http_client.get(url, timeout=10, stream=stream)
+
 
 def fetch_xml(url):
     """
@@ -35,11 +80,11 @@ def fetch_xml(url):
     Возвращает None в случае ошибки.
     """
     try:
-        with urllib.request.urlopen(url, timeout=10) as response:
-            if response.getcode() != 200:
-                log_print(f"Ошибка: {url} вернул статус {response.getcode()}")
+        with http_get(url) as response:
+            if response.status_code != 200:
+                log_print(f"Ошибка: {url} вернул статус {response.status_code}")
                 return None
-            return ET.fromstring(response.read())
+            return ET.fromstring(response.content)
     except Exception as e:
         log_print(f"Не удалось загрузить {url}: {e}")
         return None
@@ -48,16 +93,22 @@ def fetch_xml(url):
 def check_robots_txt():
     """
     Проверяет доступность файла robots.txt.
+    Возвращает Crawl-delay в секундах или None.
     """
     log_print("Проверка robots.txt...")
     try:
-        with urllib.request.urlopen(ROBOTS_URL, timeout=10) as resp:
-            if resp.getcode() == 200:
+        with http_get(ROBOTS_URL) as resp:
+            if resp.status_code == 200:
                 log_print("robots.txt доступен")
+                crawl_delay = parse_crawl_delay(resp.text)
+                if crawl_delay:
+                    log_print(f"Crawl-delay: {crawl_delay:g} сек")
+                return crawl_delay
             else:
-                log_print(f"robots.txt недоступен (статус {resp.getcode()})")
+                log_print(f"robots.txt недоступен (статус {resp.status_code})")
     except Exception as e:
         log_print(f"Ошибка при проверке robots.txt: {e}")
+    return None
 
 
 def parse_sitemap_index(root):
@@ -65,9 +116,8 @@ def parse_sitemap_index(root):
     Извлекает список URL дочерних sitemap-файлов из основного индекса.
     """
     urls = []
-    namespace = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
-    for sitemap in root.findall(f".//{namespace}sitemap"):
-        loc_elem = sitemap.find(f"{namespace}loc")
+    for sitemap in root.findall(f".//{NAMESPACE}sitemap"):
+        loc_elem = sitemap.find(f"{NAMESPACE}loc")
         if loc_elem is not None and loc_elem.text:
             urls.append(loc_elem.text.strip())
     return urls
@@ -79,74 +129,144 @@ def get_lastmod_from_sitemap(root):
     Возвращает объект datetime или None, если даты не найдены.
     """
     lastmods = []
-    namespace = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
-    for url_entry in root.findall(f".//{namespace}url"):
-        lastmod_elem = url_entry.find(f"{namespace}lastmod")
+    for url_entry in root.findall(f".//{NAMESPACE}url"):
+        lastmod_elem = url_entry.find(f"{NAMESPACE}lastmod")
         if lastmod_elem is not None and lastmod_elem.text:
-            try:
-                dt_str = lastmod_elem.text.strip()
-                if dt_str.endswith('Z'):
-                    dt = datetime.fromisoformat(dt_str[:-1] + '+00:00')
-                else:
-                    dt = datetime.fromisoformat(dt_str)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
+            dt = parse_lastmod(lastmod_elem.text)
+            if dt is not None:
                 lastmods.append(dt)
-            except ValueError:
-                continue
     return max(lastmods) if lastmods else None
 
 
-def check_sitemap_freshness(sitemap_url):
+def scan_sitemap(sitemap_url):
     """
-    Проверяет один sitemap-файл:
-    - Доступен ли (HTTP 200)
-    - Есть ли в нём дата <lastmod>
-    - Не старше ли дата MAX_DAYS_OLD дней
-    Возвращает True, если файл считается валидным.
+    Скачивает sitemap-файл один раз: проверяет статус и потоково
+    разбирает тело. Ошибки сети и XML пробрасываются.
+    Длительности успешных загрузок записываются в timings.
+    """
+    started = time.perf_counter()
+    with http_get(sitemap_url, stream=True) as resp:
+        headers_at = time.perf_counter()
+        if resp.status_code != 200:
+            return SitemapScan(resp.status_code, None, 0, [])
+        lastmod, url_count, children = scan_sitemap_stream(resp.iter_content(CHUNK_BYTES))
+    finished = time.perf_counter()
+    for phase, seconds in zip(TIMING_PHASES, (headers_at - started, finished - headers_at, finished - started)):
+        timings.record(phase, seconds)
+    return SitemapScan(resp.status_code, lastmod, url_count, children)
+
+
+def evaluate_sitemap(sitemap_url):
+    """
+    Проверяет один sitemap-файл за одну загрузку, ничего не выводя.
+    Возвращает (валиден ли файл, строка для отчёта, вложенные sitemap-файлы).
     """
-    # Проверка доступности
     try:
-        with urllib.request.urlopen(sitemap_url, timeout=10) as resp:
-            if resp.getcode() != 200:
-                log_print(f"[FAIL] {sitemap_url} -> статус {resp.getcode()}")
-                return False
+        scan = scan_sitemap(sitemap_url)
+    except ET.ParseError as e:
+        return False, f"Не удалось загрузить {sitemap_url}: {e}", []
     except Exception as e:
-        log_print(f"[FAIL] {sitemap_url} -> ошибка доступа: {e}")
-        return False
+        return False, f"[FAIL] {sitemap_url} -> ошибка доступа: {e}", []
 
-    # Загрузка XML
-    root = fetch_xml(sitemap_url)
-    if root is None:
-        return False
+    if scan.status_code != 200:
+        return False, f"[FAIL] {sitemap_url} -> статус {scan.status_code}", []
+
+    if scan.children:
+        return True, f"[OK] {sitemap_url} -> вложенный индекс, sitemap-файлов: {len(scan.children)}", scan.children
 
-    # Поиск последней даты обновления
-    lastmod = get_lastmod_from_sitemap(root)
-    if lastmod is None:
-        log_print(f"[INFO] {sitemap_url} -> нет данных lastmod (файл считается допустимым)")
-        return True
+    if scan.lastmod is None:
+        return True, f"[INFO] {sitemap_url} -> нет данных lastmod (файл считается допустимым), URL: {scan.url_count}", []
 
     # Проверка актуальности
     now = datetime.now(timezone.utc)
-    days_old = (now - lastmod).days
+    days_old = (now - scan.lastmod).days
     if days_old <= MAX_DAYS_OLD:
-        log_print(f"[OK] {sitemap_url} -> обновлено {days_old} дней назад")
-        return True
+        return True, f"[OK] {sitemap_url} -> обновлено {days_old} дней назад, URL: {scan.url_count}", []
     else:
-        log_print(f"[WARN] {sitemap_url} -> устарело ({days_old} дней, лимит: {MAX_DAYS_OLD})")
-        return False
+        return False, f"[WARN] {sitemap_url} -> устарело ({days_old} дней, лимит: {MAX_DAYS_OLD}), URL: {scan.url_count}", []
+
+
+def check_sitemap_freshness(sitemap_url):
+    """
+    Проверяет один sitemap-файл за одну загрузку:
+    - Доступен ли (HTTP 200)
+    - Есть ли в нём дата <lastmod>
+    - Не старше ли дата MAX_DAYS_OLD дней
+    Возвращает True, если файл считается валидным.
+    """
+    ok, message, _ = evaluate_sitemap(sitemap_url)
+    log_print(message)
+    return ok
 
 
-def main():
+def crawl_sitemaps(sitemap_urls, workers=MAX_WORKERS, max_depth=MAX_INDEX_DEPTH, crawl_delay=None):
+    """
+    Проверяет sitemap-файлы в пуле из workers потоков, раскрывая вложенные
+    индексы не глубже max_depth уровней. Каждый URL проверяется один раз.
+    crawl_delay (сек) — не чаще одного запроса за это время к каждому хосту.
+    Возвращает [(url, ok, message)] в порядке обхода: файлы индекса по
+    порядку, за вложенным индексом — его файлы.
+    """
+    worker = evaluate_sitemap
+    if crawl_delay:
+        limiter = HostRateLimiter(1.0 / crawl_delay, burst=1)
+
+        def worker(url):
+            limiter.acquire(url)
+            return evaluate_sitemap(url)
+
+    results = dict(crawl_index(sitemap_urls, worker, lambda result: result[2],
+                               workers=workers, max_depth=max_depth))
+
+    ordered = []
+    emitted = set()
+
+    def visit(url):
+        emitted.add(url)
+        ok, message, children = results[url]
+        ordered.append((url, ok, message))
+        for child in children:
+            if child in results and child not in emitted:
+                visit(child)
+
+    for url in dict.fromkeys(sitemap_urls):
+        if url not in emitted:
+            visit(url)
+    return ordered
+
+
+def check_links(workers=MAX_WORKERS, sample_rate=1.0, per_section=None):
+    """
+    Проверяет доступность страниц из sitemap (см. link_health.py)
+    и выводит распределения кодов ответов и цепочек редиректов.
+    """
+    log_print("\nПроверка страниц из sitemap...")
+    stats, sampler, link_timings, errors = link_health.check_links(
+        SITEMAP_INDEX_URL, sample_rate, per_section, concurrency=workers)
+    log_print(f"Страниц в sitemap: {sum(sampler.seen.values())}, "
+              f"выбрано для проверки: {sum(sampler.selected.values())}, повторов: {sampler.duplicates}")
+    for line in stats.summary_lines():
+        log_print(line)
+    for line in link_timings.summary_lines():
+        log_print(f"  {line}")
+    return stats
+
+
+def main(workers=MAX_WORKERS, links=False, sample_rate=1.0, per_section=None):
     """
     Основная логика скрипта:
     1. Проверяет robots.txt
     2. Загружает основной sitemap.xml
-    3. Проверяет все дочерние sitemap-файлы
+    3. Параллельно проверяет все дочерние sitemap-файлы,
+       включая вложенные индексы
+    4. С links=True — проверяет страницы из sitemap
     """
+    global http_cache
+    http_cache = HttpCache(HTTP_CACHE_DIR)
+
     log_print("Запуск проверки robots.txt и sitemap...")
 
-    check_robots_txt()
+    crawl_delay = check_robots_txt()
     log_print()
 
     log_print("Загрузка sitemap.xml...")
@@ -164,20 +284,41 @@ def main():
         log_file.close()
         return
 
+    results = crawl_sitemaps(sitemap_urls, workers=workers, crawl_delay=crawl_delay)
+
     failed = 0
-    for i, url in enumerate(sitemap_urls, 1):
-        log_print(f"[{i}/{len(sitemap_urls)}]", end=" ")
-        if not check_sitemap_freshness(url):
+    for i, (url, ok, message) in enumerate(results, 1):
+        log_print(f"[{i}/{len(results)}]", message)
+        if not ok:
             failed += 1
 
     log_print("\n" + "="*50)
     if failed == 0:
         log_print("Все sitemap-файлы доступны и актуальны.")
     else:
-        log_print(f"{failed} из {len(sitemap_urls)} файлов имеют проблемы.")
+        log_print(f"{failed} из {len(results)} файлов имеют проблемы.")
+
+    timing_lines = timings.summary_lines(TIMING_PHASES)
+    if timing_lines:
+        log_print("\nВремя загрузки sitemap-файлов, мс:")
+        for line in timing_lines:
+            log_print(f"  {line}")
+
+    if links:
+        check_links(workers, sample_rate, per_section)
 
     log_file.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Проверка robots.txt и sitemap-файлов")
+    arg_parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                            help="число параллельных загрузок sitemap-файлов")
+    arg_parser.add_argument("--links", action="store_true",
+                            help="проверить доступность страниц из sitemap")
+    arg_parser.add_argument("--sample-rate", type=float, default=1.0,
+                            help="доля страниц каждого раздела для --links (0..1)")
+    arg_parser.add_argument("--per-section", type=int, default=None,
+                            help="не больше N страниц из раздела для --links")
+    args = arg_parser.parse_args()
+    main(workers=args.workers, links=args.links, sample_rate=args.sample_rate, per_section=args.per_section)
@@ -0,0 +1,95 @@
+"""
+Юнит-тесты для cassette.py
+Проверяет урезание XML, сохранение и воспроизведение ответов и запись с stand-in
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import requests
+
+import http_client
+from cassette import Cassette, record_site, trim_xml, use_cassette
+from feed import parse_offers
+from http_client import HttpClient
+from standin import StandInShop
+
+
+class TestTrimXml:
+    """Урезание прайса и sitemap"""
+
+    def test_trim_feed(self):
+        """Остаются первые limit товаров, документ закрыт и разбирается"""
+        offers = "".join(f"<offer id='{n}'><url>https://shop.ru/p?pid={n}</url><price>{n}</price></offer>"
+                         for n in range(10))
+        body = f"<yml_catalog><shop><offers>{offers}</offers></shop></yml_catalog>".encode("utf-8")
+        trimmed = trim_xml(body, "offer", 3, "</offers></shop></yml_catalog>")
+        assert [offer.offer_id for offer in parse_offers([trimmed])] == ["0", "1", "2"]
+
+    def test_short_document_unchanged(self):
+        """Если элементов не больше limit, тело не меняется"""
+        body = b"<urlset><url><loc>a</loc></url><url><loc>b</loc></url></urlset>"
+        assert trim_xml(body, "url", 2, "</urlset>") is body
+        assert trim_xml(body, "url", 5, "</urlset>") is body
+
+
+class TestCassette:
+    """Сохранение и воспроизведение"""
+
+    def test_save_load_replay(self, tmp_path):
+        """Текстовые и двоичные тела и заголовки переживают сохранение; лишние заголовки отбрасываются"""
+        cassette = Cassette({"feed_url": "https://shop.ru/feed.xml"})
+        cassette.add("GET", "https://shop.ru/page", 200,
+                     {"Content-Type": "text/html; charset=utf-8", "Set-Cookie": "x=1"}, "Цена".encode("utf-8"), "utf-8")
+        cassette.add("GET", "https://shop.ru/logo.png", 200, {}, b"\x89PNG\xff")
+        cassette.add("HEAD", "https://shop.ru/old", 301, {"Location": "/new"}, b"")
+        path = str(tmp_path / "c.jsonl.gz")
+        cassette.save(path)
+
+        replay = Cassette.load(path)
+        assert replay.meta == {"feed_url": "https://shop.ru/feed.xml"}
+        with replay.get("https://shop.ru/page", stream=True) as response:
+            assert response.status_code == 200
+            assert response.text == "Цена"
+            assert response.headers["content-length"] == str(len("Цена".encode("utf-8")))
+            assert "Set-Cookie" not in response.headers
+        assert replay.get("https://shop.ru/logo.png").content == b"\x89PNG\xff"
+        assert replay.head("https://shop.ru/old").headers["Location"] == "/new"
+
+    def test_miss(self):
+        """Запрос не из кассеты — ошибка соединения, и он попадает в misses"""
+        cassette = Cassette()
+        with pytest.raises(requests.ConnectionError):
+            cassette.get("https://shop.ru/unknown")
+        assert cassette.misses == [("GET", "https://shop.ru/unknown")]
+
+    def test_use_cassette(self, tmp_path):
+        """use_cassette подменяет общий клиент и восстанавливает его"""
+        path = str(tmp_path / "c.jsonl.gz")
+        cassette = Cassette()
+        cassette.add("GET", "https://shop.ru/robots.txt", 200, {}, b"User-agent: *\n")
+        cassette.save(path)
+        previous = http_client.default_client()
+        with use_cassette(path):
+            assert http_client.get("https://shop.ru/robots.txt").text == "User-agent: *\n"
+        assert http_client.default_client() is previous
+
+    def test_record_standin(self, tmp_path):
+        """Запись с stand-in: прайс урезан, страницы товаров и sitemap-файлы сохранены"""
+        path = str(tmp_path / "c.jsonl.gz")
+        with StandInShop(offers=20, sitemap_files=2) as shop:
+            record_site(path, shop.feed_url, shop.sitemap_url, max_offers=4, max_urls=3,
+                        http=HttpClient(max_retries=0))
+        cassette = Cassette.load(path)
+        urls = [url for _, url in cassette.entries]
+        assert len(cassette) == 1 + 1 + 4 + 1 + 2
+        assert len(list(parse_offers([cassette.get(shop.feed_url).content]))) == 4
+        assert cassette.get(f"{shop.url}/sitemaps/1.xml").content.count(b"</url>") == 3
+        assert f"{shop.url}/robots.txt" in urls
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
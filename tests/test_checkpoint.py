@@ -0,0 +1,52 @@
+"""
+Юнит-тесты для checkpoint.py
+Проверяет сохранение контрольной точки и хеш прайса
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from checkpoint import Checkpoint, FeedHash
+from feed import Offer
+
+def _offer(pid, price):
+    return Offer(price, f"https://example.com/p?pid={pid}", str(pid), "true", None, None)
+
+
+class TestCheckpoint:
+    """Тесты Checkpoint и FeedHash"""
+
+    def test_save_load_remove(self, tmp_path):
+        """Состояние сохраняется и читается; после remove() его нет"""
+        checkpoint = Checkpoint(str(tmp_path / "state" / "checkpoint.json"))
+        assert checkpoint.load() is None
+        checkpoint.save(position=10, feed_hash="abc", log_sizes=[1, 2])
+        assert checkpoint.load() == {"position": 10, "feed_hash": "abc", "log_sizes": [1, 2]}
+        checkpoint.remove()
+        assert checkpoint.load() is None
+        checkpoint.remove()
+
+    def test_corrupted_file(self, tmp_path):
+        """Повреждённый файл — как отсутствие контрольной точки"""
+        path = tmp_path / "checkpoint.json"
+        path.write_text('{"position": 1', encoding="utf-8")
+        assert Checkpoint(str(path)).load() is None
+
+    def test_feed_hash(self):
+        """Хеш зависит от URL, цены и порядка товаров"""
+        def digest(offers):
+            feed_hash = FeedHash()
+            for offer in offers:
+                feed_hash.update(offer)
+            return feed_hash.hexdigest()
+
+        base = digest([_offer(1, 100.0), _offer(2, 200.0)])
+        assert base == digest([_offer(1, 100.0), _offer(2, 200.0)])
+        assert base != digest([_offer(1, 100.0), _offer(2, 201.0)])
+        assert base != digest([_offer(2, 200.0), _offer(1, 100.0)])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
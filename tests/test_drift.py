@@ -0,0 +1,97 @@
+"""
+Юнит-тесты для drift.py
+Проверяет правила допуска и векторную статистику расхождений цен
+"""
+import pytest
+import sys
+import os
+import json
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from drift import DriftRules, PricePairs, analyze
+from feed import Offer
+
+
+def _pairs(rows):
+    """PricePairs из [(цена прайса, цена сайта, категория, производитель)]"""
+    pairs = PricePairs()
+    for pid, (feed, site, category, vendor) in enumerate(rows, 1):
+        pairs.append(Offer(feed, f"https://example.com/p?pid={pid}", str(pid), "true", category, vendor), site)
+    return pairs
+
+
+RULES = DriftRules(10, 1, categories={"2": {"pct": 5}}, vendors={"Garrett": {"abs": 100}})
+
+
+class TestDriftRules:
+    """Тесты DriftRules"""
+
+    def test_scalar_tolerance(self):
+        """Берётся больший из допусков; производитель важнее категории"""
+        assert RULES.tolerance(500.0) == 10.0
+        assert RULES.tolerance(5000.0) == 50.0
+        assert RULES.tolerance(5000.0, "2") == 250.0
+        assert RULES.tolerance(5000.0, "2", "Garrett") == 250.0
+        assert RULES.tolerance(500.0, "1", "Garrett") == 100.0
+
+    def test_vector_matches_scalar(self):
+        """Векторные допуски совпадают с поштучными"""
+        rng = np.random.default_rng(1)
+        rows = [(float(rng.integers(100, 100_000)), 0.0, rng.choice(["1", "2", None]),
+                 rng.choice(["Garrett", "BorgWarner", None])) for _ in range(500)]
+        pairs = _pairs(rows)
+        vector = RULES.tolerances(pairs.offers)
+        scalar = [RULES.tolerance(feed, category, vendor) for feed, _, category, vendor in rows]
+        assert np.allclose(vector, scalar)
+
+    def test_load(self, tmp_path):
+        """Правила из JSON; общие допуски по умолчанию — из аргументов"""
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps({"pct": 2, "vendors": {"Garrett": {"abs": 100}}}), encoding="utf-8")
+        rules = DriftRules.load(str(path), abs_tolerance=20)
+        assert (rules.abs_tolerance, rules.pct_tolerance) == (20.0, 2.0)
+        assert rules.tolerance(1000.0, None, "Garrett") == 100.0
+
+
+class TestAnalyze:
+    """Тесты analyze"""
+
+    def test_counts_and_groups(self):
+        """Расхождения считаются по правилам, группы сортируются по числу расхождений"""
+        pairs = _pairs([
+            (1000.0, 1000.0, "1", "Garrett"),
+            (1000.0, 1050.0, "1", "Garrett"),     # в допуске производителя
+            (1000.0, 1050.0, "1", "BorgWarner"),  # +5% вне допуска
+            (2000.0, 1000.0, "2", None),          # -50% вне допуска категории
+            (4000.0, 4100.0, "2", None),          # +2.5% в допуске категории
+        ])
+        report = analyze(pairs, RULES)
+        assert (report.count, report.mismatches, report.higher, report.lower) == (5, 2, 3, 1)
+        assert [(group.name, group.count, group.mismatches) for group in report.categories] == [
+            ("1", 3, 1), ("2", 2, 1),
+        ]
+        assert [group.name for group in report.vendors] == ["—", "BorgWarner", "Garrett"]
+        assert report.vendors[2].count == 2 and report.vendors[2].mismatches == 0
+        assert report.outliers[0].url.endswith("pid=4") and report.outliers[0].pct == -50.0
+        assert sum(n for _, n in report.buckets) == 5
+        assert dict(report.buckets)["-50..-20"] == 1
+
+    def test_outliers_are_top_n(self):
+        """В выбросах top товаров с наибольшим |расхождением| в процентах по убыванию"""
+        rows = [(1000.0, 1000.0 + pid, None, None) for pid in range(100)]
+        report = analyze(_pairs(rows), top=3)
+        assert [round(outlier.pct, 1) for outlier in report.outliers] == [9.9, 9.8, 9.7]
+
+    def test_summary_lines(self):
+        """Сводка строится и для пустой статистики групп"""
+        report = analyze(_pairs([(1000.0, 1200.0, None, None)]))
+        lines = report.summary_lines()
+        assert lines[0] == "Пар цен: 1, вне допуска: 1 (100.0%)"
+        assert any("+20.0%" in line for line in lines)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,84 @@
+"""
+Юнит-тесты для feed.py
+Проверяет потоковый разбор YML-прайса
+"""
+import pytest
+import sys
+import os
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from feed import Offer, parse_offers
+
+YML = """<?xml version="1.0" encoding="UTF-8"?>
+<yml_catalog date="2026-01-01 00:00">
+  <shop>
+    <categories><category id="7">Турбины</category></categories>
+    <offers>
+      <offer id="a1" available="true">
+        <url>https://example.com/p?pid=1</url>
+        <price>1500.50</price>
+        <categoryId>7</categoryId>
+        <vendor>Garrett</vendor>
+      </offer>
+      <offer id="a2" available="false">
+        <url>https://example.com/p?pid=2</url>
+        <price>не число</price>
+      </offer>
+      <offer id="a3">
+        <price>100</price>
+      </offer>
+      <offer id="a4" available="true">
+        <url> https://example.com/p?pid=4 </url>
+        <price>200</price>
+      </offer>
+    </offers>
+  </shop>
+</yml_catalog>
+""".encode("utf-8")
+
+
+def chunked(data, size):
+    """Режет байты на куски фиксированного размера"""
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class TestParseOffers:
+    """Тесты для parse_offers"""
+
+    def test_parse_offers_records(self):
+        """Из прайса извлекаются только товары с url и числовой ценой"""
+        offers = list(parse_offers([YML]))
+        assert offers == [
+            Offer(1500.50, "https://example.com/p?pid=1", "a1", "true", "7", "Garrett"),
+            Offer(200.0, "https://example.com/p?pid=4", "a4", "true", None, None),
+        ]
+
+    @pytest.mark.parametrize("size", [1, 7, 64, 4096])
+    def test_parse_offers_chunk_boundaries(self, size):
+        """Результат не зависит от того, как поток разбит на куски"""
+        assert list(parse_offers(chunked(YML, size))) == list(parse_offers([YML]))
+
+    def test_parse_offers_is_lazy(self):
+        """Первый товар отдаётся до того, как прочитан весь поток"""
+        consumed = []
+
+        def chunks():
+            for chunk in chunked(YML, 32):
+                consumed.append(len(chunk))
+                yield chunk
+
+        first = next(parse_offers(chunks()))
+        assert first.offer_id == "a1"
+        assert sum(consumed) < len(YML)
+
+    def test_parse_offers_invalid_xml(self):
+        """Битый XML приводит к исключению ParseError"""
+        with pytest.raises(ET.ParseError):
+            list(parse_offers([b"<offers><offer>"]))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+"""
+Юнит-тесты для feed_diff.py
+Проверяет отпечатки товаров, индекс на диске и поток изменений прайса
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from feed import Offer
+from feeds import offer_key
+from feed_diff import FeedChange, FeedDiff, FingerprintIndex, diff_offers, offer_fingerprint
+
+
+def make_offer(pid, price=100.0, available="true", url=None):
+    return Offer(price, url or f"https://shop.ru/p?pid={pid}", str(pid), available, None, None)
+
+
+def run(offers, previous=None):
+    diff = FeedDiff(previous)
+    changes = list(diff_offers(offers, diff))
+    return changes, diff
+
+
+class TestFingerprint:
+    """Отпечаток товара"""
+
+    def test_fingerprint_fields(self):
+        """Отпечаток зависит от URL, цены и наличия, но не от категории"""
+        offer = make_offer(1)
+        assert offer_fingerprint(offer) == offer_fingerprint(offer._replace(category_id="5"))
+        assert offer_fingerprint(offer) != offer_fingerprint(offer._replace(price=101.0))
+        assert offer_fingerprint(offer) != offer_fingerprint(offer._replace(available="false"))
+        assert offer_fingerprint(offer) != offer_fingerprint(offer._replace(url="https://shop.ru/x?pid=1"))
+
+
+class TestFingerprintIndex:
+    """Индекс отпечатков на диске"""
+
+    def test_save_and_load(self, tmp_path):
+        """Индекс сохраняется и читается без потерь, строки отсортированы по ключу"""
+        offers = [make_offer(pid, price=pid * 10.0, available=[None, "true", "false"][pid % 3]) for pid in range(1, 30)]
+        _, diff = run(offers)
+        path = str(tmp_path / "state" / "index.bin")
+        diff.index().save(path)
+
+        index = FingerprintIndex.load(path)
+        assert len(index) == 29
+        assert list(index.keys) == sorted(index.keys)
+        row = index.find(offer_key(offers[4].url))
+        assert index.url(row) == offers[4].url
+        assert index.prices[row] == offers[4].price
+        assert index.find(1) == -1
+
+    def test_missing_or_corrupted(self, tmp_path):
+        """Нет файла или он обрезан — индекса нет"""
+        path = str(tmp_path / "index.bin")
+        assert FingerprintIndex.load(path) is None
+        _, diff = run([make_offer(1), make_offer(2)])
+        diff.index().save(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:-3])
+        assert FingerprintIndex.load(path) is None
+
+
+class TestFeedDiff:
+    """Изменения прайса между прогонами"""
+
+    def test_first_run(self):
+        """Без прошлого индекса все товары добавлены, повторы отбрасываются"""
+        changes, diff = run([make_offer(1), make_offer(2), make_offer(1)])
+        assert [change.kind for change in changes] == ["added", "added"]
+        assert (diff.added, diff.changed, diff.removed_count, diff.unchanged) == (2, 0, 0, 0)
+        assert len(diff.index()) == 2
+
+    def test_changes(self):
+        """Добавленные и изменившиеся — по ходу прайса, удалённые — в конце"""
+        _, first = run([make_offer(1), make_offer(2), make_offer(3), make_offer(4)])
+        offers = [make_offer(4), make_offer(2, price=90.0), make_offer(5), make_offer(3, available="false"),
+                  make_offer(2, price=80.0)]
+        changes, diff = run(offers, first.index())
+        assert changes == [
+            FeedChange("changed", offers[1].url, 90.0, "true", 100.0, "true"),
+            FeedChange("added", offers[2].url, 100.0, "true", None, None),
+            FeedChange("changed", offers[3].url, 100.0, "false", 100.0, "true"),
+            FeedChange("removed", make_offer(1).url, None, None, 100.0, "true"),
+        ]
+        assert diff.summary_line() == "добавлено 1, изменилось 2, удалено 1, без изменений 1"
+
+        changes, _ = run(offers, diff.index())
+        assert changes == []
+
+    def test_added_keys_merged(self):
+        """Повторы отбрасываются и после слияния ключей в отсортированный массив"""
+        diff = FeedDiff(added_buffer=4)
+        offers = [make_offer(pid) for pid in range(10)]
+        changes = list(diff_offers(offers + offers[::-1], diff))
+        assert len(changes) == 10
+        assert len(diff.added_keys.keys) == 8
+        assert len(diff.index()) == 10
+
+    def test_discard(self):
+        """Отброшенная строка: у изменившегося товара остаётся прошлая, добавленный в индекс не попадает"""
+        _, first = run([make_offer(1), make_offer(2)])
+        diff = FeedDiff(first.index())
+        for offer in [make_offer(1, price=50.0), make_offer(2, price=60.0), make_offer(3)]:
+            diff.update(offer)
+        diff.discard(0)
+        diff.discard(2)
+        index = diff.index()
+        assert len(index) == 2
+        assert index.prices[index.find(offer_key(make_offer(1).url))] == 100.0
+        assert index.prices[index.find(offer_key(make_offer(2).url))] == 60.0
+
+        changes, _ = run([make_offer(1, price=50.0), make_offer(2, price=60.0), make_offer(3)], index)
+        assert [(change.kind, change.url) for change in changes] == [
+            ("changed", make_offer(1).url), ("added", make_offer(3).url)]
+
+    def test_same_pid_new_url(self):
+        """Товар с тем же PID и новым URL — изменение, а не удаление и добавление"""
+        _, first = run([make_offer(7)])
+        changes, _ = run([make_offer(7, url="https://shop.ru/new/item?pid=7")], first.index())
+        assert [change.kind for change in changes] == ["changed"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,137 @@
+"""
+Юнит-тесты для feeds.py
+Проверяет объединение нескольких прайсов: порядок, повторы, ошибки
+"""
+import pytest
+import sys
+import os
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from feed import Offer
+from feeds import MAX_FEEDS, FeedMerger, read_feed_list, offer_key
+
+
+def _offer(url, price=100.0):
+    return Offer(price, url, None, "true", None, None)
+
+
+FEEDS = {
+    "a.xml": [_offer("https://shop/p?pid=1"), _offer("https://shop/p?pid=2"), _offer("https://shop/p?pid=3")],
+    "b.xml": [_offer("https://shop/other?pid=2"), _offer("https://shop/p?pid=4", 50.0),
+              _offer("https://shop/x?pid=3", 120.0)],
+    "c.xml": [_offer("https://shop/no-pid")],
+}
+
+
+def _fake_iter_offers(delay=0.0):
+    def iter_offers(url, **kwargs):
+        for offer in FEEDS[url]:
+            if delay:
+                time.sleep(delay)
+            yield offer
+    return iter_offers
+
+
+class TestFeedMerger:
+    """Тесты FeedMerger"""
+
+    @patch('feeds.iter_offers', side_effect=_fake_iter_offers())
+    def test_round_robin_and_dedupe(self, mock_iter):
+        """Товары чередуются по прайсам, общий товар (тот же PID) отдаётся один раз"""
+        merger = FeedMerger(["a.xml", "b.xml", "c.xml"])
+        urls = [offer.url for offer in merger]
+        assert urls == ["https://shop/p?pid=1", "https://shop/other?pid=2", "https://shop/no-pid",
+                        "https://shop/p?pid=4", "https://shop/p?pid=3"]
+        assert merger.read == [3, 3, 1]
+        assert merger.duplicates == [1, 1, 0]
+        assert merger.feeds_of("https://shop/other?pid=2") == [0, 1]
+        assert merger.feeds_of("https://shop/p?pid=4") == [1]
+        assert merger.conflict_count == 1
+        assert merger.conflicts[0] == ("https://shop/x?pid=3", 0, 100.0, 1, 120.0)
+
+    @patch('feeds.iter_offers', side_effect=_fake_iter_offers())
+    def test_summary_lines(self, mock_iter):
+        """Общий товар учитывается в итогах каждого прайса"""
+        merger = FeedMerger(["a.xml", "b.xml"])
+        list(merger)
+        lines = merger.summary_lines([
+            (100.0, "https://shop/other?pid=2", 100.0, "OK"),
+            (50.0, "https://shop/p?pid=4", 80.0, "DIFF_30"),
+            (100.0, "https://shop/p?pid=1", None, "TIMEOUT"),
+        ])
+        assert lines[0].startswith("a.xml: товаров 3 (повторов 1), проверено 2: OK 1, расхождений 0")
+        assert "перепроверить 1" in lines[0]
+        assert lines[1].startswith("b.xml: товаров 3 (повторов 1), проверено 2: OK 1, расхождений 1")
+        assert lines[2] == "Цена товара различается в прайсах: 1"
+
+    def test_feed_error_is_raised(self):
+        """Ошибка одного прайса прерывает объединённый поток"""
+        def iter_offers(url, **kwargs):
+            if url == "b.xml":
+                raise ConnectionError("boom")
+            yield from FEEDS[url]
+
+        with patch('feeds.iter_offers', side_effect=iter_offers):
+            with pytest.raises(ConnectionError):
+                list(FeedMerger(["a.xml", "b.xml"]))
+
+    def test_feeds_are_read_concurrently(self):
+        """Прайсы читаются параллельно: время — как у самого долгого, а не сумма"""
+        with patch('feeds.iter_offers', side_effect=_fake_iter_offers(delay=0.1)):
+            started = time.perf_counter()
+            assert len(list(FeedMerger(["a.xml", "b.xml"]))) == 4
+            elapsed = time.perf_counter() - started
+        assert elapsed < 0.5
+
+    def test_fast_feed_not_throttled(self):
+        """Быстрый прайс загружается целиком, не дожидаясь медленного"""
+        finished = {}
+
+        def iter_offers(url, **kwargs):
+            if url == "a.xml":
+                yield from (_offer(f"https://shop/p?pid={pid}") for pid in range(2000))
+            else:
+                for pid in range(5):
+                    time.sleep(0.05)
+                    yield _offer(f"https://shop/slow?pid=s{pid}")
+            finished[url] = time.perf_counter()
+
+        with patch('feeds.iter_offers', side_effect=iter_offers):
+            started = time.perf_counter()
+            merger = iter(FeedMerger(["a.xml", "b.xml"]))
+            urls = [next(merger).url for _ in range(4)]
+            assert "a.xml" in finished and "b.xml" not in finished
+            assert finished["a.xml"] - started < 0.2
+            assert urls == ["https://shop/p?pid=0", "https://shop/slow?pid=s0",
+                            "https://shop/p?pid=1", "https://shop/slow?pid=s1"]
+            assert len(list(merger)) == 2001
+
+    def test_early_close_stops_threads(self, tmp_path, monkeypatch):
+        """Незавершённый обход останавливает потоки загрузки и удаляет временные файлы"""
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        with patch('feeds.iter_offers', side_effect=_fake_iter_offers()):
+            merger = iter(FeedMerger(["a.xml", "b.xml"]))
+            next(merger)
+            merger.close()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_feed_limit(self):
+        """Больше MAX_FEEDS прайсов не принимается: маска прайсов товара — 64 бита"""
+        FeedMerger([f"{index}.xml" for index in range(MAX_FEEDS)])
+        with pytest.raises(ValueError):
+            FeedMerger([f"{index}.xml" for index in range(MAX_FEEDS + 1)])
+
+    def test_offer_key_and_feed_list(self, tmp_path):
+        """Ключ по PID не зависит от пути; список прайсов из файла"""
+        assert offer_key("https://shop/a?pid=7") == offer_key("https://shop/b?x=1&pid=7")
+        assert offer_key("https://shop/a") != offer_key("https://shop/b")
+        path = tmp_path / "feeds.txt"
+        path.write_text("# партнёры\nhttps://a/feed.xml\n\nhttps://b/feed.xml  # бренд\n", encoding="utf-8")
+        assert read_feed_list(str(path)) == ["https://a/feed.xml", "https://b/feed.xml"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,164 @@
+"""
+Юнит-тесты для fetcher.py
+Проверяет ограничение частоты запросов и порядок результатов пула
+"""
+import pytest
+import sys
+import os
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fetcher import TokenBucket, HostRateLimiter, AdaptiveConcurrency, fetch_all
+
+
+class TestTokenBucket:
+    """Тесты для TokenBucket"""
+
+    def test_burst_is_immediate(self):
+        """Первые burst токенов выдаются без ожидания"""
+        bucket = TokenBucket(rate=1.0, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.1
+
+    def test_rate_is_limited(self):
+        """После исчерпания запаса токены выдаются со скоростью rate"""
+        bucket = TokenBucket(rate=20.0, burst=1)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        # 1 токен сразу + 4 по 50 мс
+        assert time.monotonic() - start >= 0.18
+
+    def test_invalid_rate(self):
+        """Нулевая скорость недопустима"""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestHostRateLimiter:
+    """Тесты для HostRateLimiter"""
+
+    def test_hosts_are_independent(self):
+        """Каждый хост получает своё ведро токенов"""
+        limiter = HostRateLimiter(rate=1.0, burst=1)
+        start = time.monotonic()
+        limiter.acquire("https://a.example.com/1")
+        limiter.acquire("https://b.example.com/1")
+        assert time.monotonic() - start < 0.1
+        assert set(limiter.buckets) == {"a.example.com", "b.example.com"}
+
+    def test_crawl_delay_per_host(self):
+        """Crawl-delay хоста: запросы не чаще задержки и без всплеска; задержка запрашивается один раз"""
+        delays = {"slow.example.com": 0.05}
+        asked = []
+
+        def crawl_delay(url):
+            host = url.split("/")[2]
+            asked.append(host)
+            return delays.get(host)
+
+        limiter = HostRateLimiter(rate=1000.0, burst=2, crawl_delay=crawl_delay)
+        start = time.monotonic()
+        times = []
+        for _ in range(4):
+            limiter.acquire("https://slow.example.com/p")
+            times.append(time.monotonic() - start)
+        limiter.acquire("https://fast.example.com/p")
+        limiter.acquire("https://fast.example.com/p")
+        assert times[1] >= 0.04
+        assert times[3] >= 0.14
+        assert limiter.buckets["slow.example.com"].capacity == 1.0
+        assert limiter.buckets["fast.example.com"].capacity == 2.0
+        assert asked == ["slow.example.com", "fast.example.com"]
+
+
+class TestAdaptiveConcurrency:
+    """Тесты для AdaptiveConcurrency (AIMD)"""
+
+    def _complete(self, controller, n, latency, overloaded=False):
+        for _ in range(n):
+            controller.acquire()
+            controller.release(latency, overloaded)
+
+    def test_grows_while_server_is_fast(self):
+        """Быстрые ответы без ошибок увеличивают параллельность до потолка"""
+        controller = AdaptiveConcurrency(maximum=6, initial=2)
+        self._complete(controller, 100, 0.1)
+        assert controller.limit == 6
+        assert controller.peak == 6
+        assert controller.decreases == 0
+
+    def test_halves_on_overload(self):
+        """Ответы 429/5xx уменьшают параллельность вдвое, но не ниже минимума"""
+        controller = AdaptiveConcurrency(maximum=16, initial=16)
+        self._complete(controller, 16, 0.1, overloaded=True)
+        assert controller.limit == 8
+        self._complete(controller, 100, 0.1, overloaded=True)
+        assert controller.limit == 1
+
+    def test_halves_on_slow_p95(self):
+        """p95 времени выше порога — снижение"""
+        controller = AdaptiveConcurrency(maximum=8, initial=8, latency_target=1.0)
+        self._complete(controller, 8, 5.0)
+        assert controller.limit == 4
+
+    def test_acquire_blocks_at_limit(self):
+        """Запросов одновременно не больше limit"""
+        controller = AdaptiveConcurrency(maximum=4, initial=1)
+        controller.acquire()
+        entered = threading.Event()
+
+        def second():
+            controller.acquire()
+            entered.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not entered.wait(0.1)
+        controller.release(0.1)
+        assert entered.wait(1.0)
+        thread.join()
+
+
+class TestFetchAll:
+    """Тесты для fetch_all"""
+
+    def test_results_keep_input_order(self):
+        """Результаты возвращаются в порядке входных элементов"""
+        def worker(n):
+            time.sleep(0.01 * (5 - n % 5))
+            return n * 2
+
+        assert list(fetch_all(range(20), worker, concurrency=4)) == [n * 2 for n in range(20)]
+
+    def test_concurrency_is_bounded(self):
+        """Одновременно выполняется не больше concurrency задач"""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def worker(n):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            return n
+
+        list(fetch_all(range(30), worker, concurrency=3))
+        assert 1 < peak <= 3
+
+    def test_accepts_generator(self):
+        """На вход можно подать генератор"""
+        items = (n for n in range(5))
+        assert list(fetch_all(items, lambda n: n + 1, concurrency=2)) == [1, 2, 3, 4, 5]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Юнит-тесты для http_cache.py
+Поднимает локальный HTTP-сервер с ETag/Last-Modified и проверяет условные запросы
+"""
+import pytest
+import sys
+import os
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+from http_cache import HttpCache
+
+BODIES = {
+    "/etag": b"<offers>" + b"x" * 1000 + b"</offers>",
+    "/lm": "Цена: 100 ₽".encode("utf-8"),
+    "/plain": b"no validators",
+    "/big": b"y" * 5000,
+}
+LAST_MODIFIED = "Wed, 01 Jan 2026 00:00:00 GMT"
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Отдаёт BODIES; для /etag и /big — ETag, для /lm — Last-Modified"""
+
+    hits = []
+
+    def do_GET(self):
+        Handler.hits.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        body = BODIES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{self.path}-v1"' if self.path in ("/etag", "/big") else None
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.path == "/lm" and self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if self.path == "/lm":
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(autouse=True)
+def clear_hits():
+    Handler.hits = []
+
+
+class TestHttpCache:
+    """Тесты для HttpCache"""
+
+    def test_etag_revalidation(self, server, tmp_path):
+        """Второй запрос отправляет If-None-Match и берёт тело из кеша"""
+        cache = HttpCache(str(tmp_path))
+        first = cache.get(server + "/etag")
+        assert first.content == BODIES["/etag"]
+        assert not first.from_cache
+
+        second = cache.get(server + "/etag")
+        assert second.from_cache
+        assert second.status_code == 200
+        assert second.content == BODIES["/etag"]
+        assert Handler.hits[-1][1] == '"/etag-v1"'
+
+    def test_last_modified_revalidation(self, server, tmp_path):
+        """Last-Modified превращается в If-Modified-Since, кодировка сохраняется"""
+        cache = HttpCache(str(tmp_path))
+        assert cache.get(server + "/lm").text == "Цена: 100 ₽"
+        cached = cache.get(server + "/lm")
+        assert cached.from_cache
+        assert cached.text == "Цена: 100 ₽"
+        assert Handler.hits[-1][2] == LAST_MODIFIED
+
+    def test_streaming_fills_cache(self, server, tmp_path):
+        """Тело, прочитанное через iter_content, тоже попадает в кеш"""
+        cache = HttpCache(str(tmp_path))
+        with cache.get(server + "/etag") as response:
+            assert b"".join(response.iter_content(100)) == BODIES["/etag"]
+        with cache.get(server + "/etag") as response:
+            assert response.from_cache
+            assert b"".join(response.iter_content(100)) == BODIES["/etag"]
+
+    def test_no_validators_not_cached(self, server, tmp_path):
+        """Ответы без ETag/Last-Modified не кешируются"""
+        cache = HttpCache(str(tmp_path))
+        cache.get(server + "/plain").content
+        assert not cache.get(server + "/plain").from_cache
+        assert cache.total_bytes() == 0
+
+    def test_errors_pass_through(self, server, tmp_path):
+        """Статус 404 доступен вызывающему коду"""
+        cache = HttpCache(str(tmp_path))
+        response = cache.get(server + "/missing")
+        assert response.status_code == 404
+        with pytest.raises(requests.HTTPError):
+            response.raise_for_status()
+
+    def test_lru_eviction(self, server, tmp_path):
+        """При превышении лимита вытесняется давно не использованная запись"""
+        cache = HttpCache(str(tmp_path), max_bytes=6020)
+        cache.get(server + "/etag").content
+        cache.get(server + "/lm").content
+        cache.get(server + "/etag").content  # /etag становится свежее /lm
+        cache.get(server + "/big").content
+
+        assert cache.total_bytes() <= 6020
+        assert cache.get(server + "/etag").from_cache
+        assert not cache.get(server + "/lm").from_cache
+
+    def test_oversized_body_not_cached(self, server, tmp_path):
+        """Тело больше лимита не сохраняется, но отдаётся целиком"""
+        cache = HttpCache(str(tmp_path), max_bytes=100)
+        assert cache.get(server + "/big").content == BODIES["/big"]
+        assert cache.total_bytes() == 0
+        assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+    def test_reopen_after_flush(self, server, tmp_path):
+        """После flush() новый экземпляр видит записи и их суммарный размер"""
+        cache = HttpCache(str(tmp_path))
+        cache.get(server + "/etag").content
+        cache.get(server + "/lm").content
+        cache.flush()
+
+        reopened = HttpCache(str(tmp_path))
+        assert reopened.total_bytes() == cache.total_bytes() > 0
+        assert reopened.get(server + "/etag").from_cache
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
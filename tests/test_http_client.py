@@ -0,0 +1,136 @@
+"""
+Юнит-тесты для http_client.py
+Проверяет повторы при 429/5xx, Retry-After и классификацию ошибок
+"""
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+from http_client import (
+    HttpClient, backoff_delay, retry_after_delay, classify_error, is_transient, response_charset,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    /flaky/N — первые N запросов отвечают 503, затем 200.
+    /limited — 429 с Retry-After: 3, затем 200. /down — всегда 500.
+    """
+
+    counters = {}
+
+    def do_GET(self):
+        count = Handler.counters.get(self.path, 0)
+        Handler.counters[self.path] = count + 1
+        if self.path.startswith("/flaky/") and count < int(self.path.rsplit("/", 1)[1]):
+            self.send_response(503)
+        elif self.path == "/limited" and count == 0:
+            self.send_response(429)
+            self.send_header("Retry-After", "3")
+        elif self.path == "/down":
+            self.send_response(500)
+        else:
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def client():
+    """Клиент, который не спит, а записывает задержки"""
+    Handler.counters = {}
+    delays = []
+    client = HttpClient(max_retries=3, sleep=delays.append)
+    client.delays = delays
+    yield client
+    client.close()
+
+
+class TestRetries:
+    """Тесты повторов HttpClient.get"""
+
+    def test_retries_until_success(self, server, client):
+        """503 повторяется, пока сервер не ответит 200"""
+        response = client.get(server + "/flaky/2")
+        assert response.status_code == 200
+        assert response.text == "ok"
+        assert client.retries == 2
+        assert len(client.delays) == 2
+        assert response.retry_wait > 0
+
+    def test_retry_wait_without_retries(self, server, client):
+        """Без повторов retry_wait ответа равен нулю"""
+        assert client.get(server + "/flaky/0").retry_wait == 0.0
+
+    def test_retry_after_is_respected(self, server, client):
+        """Задержка берётся из Retry-After"""
+        assert client.get(server + "/limited").status_code == 200
+        assert client.delays == [3.0]
+
+    def test_gives_up_after_max_retries(self, server, client):
+        """После исчерпания повторов возвращается последний ответ"""
+        response = client.get(server + "/down")
+        assert response.status_code == 500
+        assert Handler.counters["/down"] == 4
+
+    def test_connection_error_is_raised(self, client):
+        """Сетевая ошибка пробрасывается после повторов"""
+        with pytest.raises(requests.ConnectionError):
+            client.get("http://127.0.0.1:9/", timeout=1)
+        assert len(client.delays) == 3
+
+
+class TestHelpers:
+    """Тесты вспомогательных функций"""
+
+    def test_response_charset(self):
+        """charset только из Content-Type; без заголовков — сохранённая кодировка ответа из кеша"""
+        assert response_charset(MagicMock(headers={"Content-Type": "text/html; charset=windows-1251"})) \
+            == "windows-1251"
+        assert response_charset(MagicMock(headers={"Content-Type": "text/html"}, encoding="ISO-8859-1")) is None
+        assert response_charset(MagicMock(headers={}, encoding="cp1251")) == "cp1251"
+
+    def test_backoff_delay_bounds(self):
+        """Задержка в пределах [0, base * 2^attempt] и не выше потолка"""
+        for attempt in range(10):
+            assert 0 <= backoff_delay(attempt, base=0.5, cap=4.0) <= min(4.0, 0.5 * 2 ** attempt)
+
+    def test_retry_after_http_date(self):
+        """Retry-After в виде HTTP-даты"""
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        response = MagicMock(headers={"Retry-After": format_datetime(when, usegmt=True)})
+        assert 25 <= retry_after_delay(response) <= 30
+        assert retry_after_delay(MagicMock(headers={})) is None
+        assert retry_after_delay(MagicMock(headers={"Retry-After": "9999"})) == 120.0
+
+    def test_classify_error(self):
+        """Исключения requests переводятся в статусы проверки"""
+        assert classify_error(requests.HTTPError(response=MagicMock(status_code=404))) == "HTTP_404"
+        assert classify_error(requests.ReadTimeout()) == "TIMEOUT"
+        assert classify_error(requests.ConnectionError()) == "CONNECTION_ERROR"
+        assert classify_error(ValueError()) == "REQUEST_ERROR"
+
+    def test_is_transient(self):
+        """Временными считаются таймауты, сетевые сбои, 429 и 5xx"""
+        assert is_transient("TIMEOUT")
+        assert is_transient("HTTP_503")
+        assert is_transient("HTTP_429")
+        assert not is_transient("HTTP_404")
+        assert not is_transient("DIFF_100")
+        assert not is_transient("PRICE_NOT_FOUND")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
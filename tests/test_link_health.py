@@ -0,0 +1,200 @@
+"""
+Юнит-тесты для link_health.py
+Проверяет HEAD с откатом на GET, цепочки редиректов, выборку по разделам
+и обход sitemap на локальном сервере и stand-in
+"""
+import pytest
+import sys
+import os
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from http_client import HttpClient
+from link_health import Probe, LinkStats, SectionSampler, probe, iter_sitemap_urls, check_links, url_section
+from standin import StandInShop
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    /ok — 200; /gone — 404; /old/N — редирект на /old/N-1, /old/0 — на /ok;
+    /loop — редирект сам на себя; /nohead/... — HEAD запрещён (405);
+    остальные пути — тела из pages или 404
+    """
+
+    protocol_version = "HTTP/1.1"
+    pages = {}
+    requests = []
+
+    def _route(self):
+        Handler.requests.append((self.command, self.path))
+        if self.path.startswith("/nohead/"):
+            if self.command == "HEAD":
+                return 405, None, b""
+            return 200, None, b"page"
+        if self.path == "/ok":
+            return 200, None, b"ok"
+        if self.path == "/loop":
+            return 301, "/loop", b""
+        if self.path.startswith("/old/"):
+            n = int(self.path[len("/old/"):])
+            return 302, "/ok" if n == 0 else f"/old/{n - 1}", b""
+        body = Handler.pages.get(self.path)
+        if body is None:
+            return 404, None, b"not found"
+        return 200, None, body
+
+    def _reply(self, send_body):
+        status, location, body = self._route()
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+
+@pytest.fixture
+def http():
+    client = HttpClient(max_retries=0)
+    yield client
+    client.close()
+
+
+class TestProbe:
+    """Проверка одного URL"""
+
+    def test_ok_with_head(self, server, http):
+        """Доступная страница проверяется одним HEAD"""
+        Handler.requests.clear()
+        assert probe(f"{server}/ok", http) == Probe(f"{server}/ok", 200, (200,), "HEAD")
+        assert Handler.requests == [("HEAD", "/ok")]
+
+    def test_redirect_chain(self, server, http):
+        """Редиректы проходятся вручную, цепочка кодов сохраняется"""
+        result = probe(f"{server}/old/1", http)
+        assert result.status == 200
+        assert result.chain == (302, 302, 200)
+
+    def test_too_many_redirects(self, server, http):
+        """Зацикленный редирект обрывается"""
+        result = probe(f"{server}/loop", http)
+        assert result.status == "TOO_MANY_REDIRECTS"
+        assert len(result.chain) == 6
+
+    def test_get_fallback(self, server, http):
+        """На 405 в ответ на HEAD запрос повторяется GET"""
+        Handler.requests.clear()
+        result = probe(f"{server}/nohead/1", http)
+        assert result == Probe(f"{server}/nohead/1", 200, (200,), "GET")
+        assert Handler.requests == [("HEAD", "/nohead/1"), ("GET", "/nohead/1")]
+
+    def test_connection_error(self, http):
+        """Недоступный хост — статус ошибки вместо исключения"""
+        result = probe("http://127.0.0.1:1/x", http, timeout=2)
+        assert result.status == "CONNECTION_ERROR"
+        assert result.chain == ()
+
+
+class TestSampling:
+    """Выборка по разделам и статистика"""
+
+    def test_section(self):
+        """Раздел — первый сегмент пути"""
+        assert url_section("https://shop.ru/turbo/item?pid=1") == "turbo"
+        assert url_section("https://shop.ru/") == "/"
+
+    def test_dedupe_and_per_section(self):
+        """Повторы отбрасываются, из раздела берётся не больше per_section"""
+        sampler = SectionSampler(per_section=2)
+        urls = [f"https://shop.ru/a/{i}" for i in range(5)] + ["https://shop.ru/b/1", "https://SHOP.ru/b/1/"]
+        accepted = [url for url in urls if sampler.accept(url)]
+        assert accepted == ["https://shop.ru/a/0", "https://shop.ru/a/1", "https://shop.ru/b/1"]
+        assert sampler.seen == {"a": 5, "b": 2}
+        assert sampler.duplicates == 1
+
+    def test_sample_rate(self):
+        """Доля выборки соблюдается и детерминирована"""
+        urls = [f"https://shop.ru/a/{i}" for i in range(2000)]
+        first = [url for url in urls if SectionSampler(0.25).accept(url)]
+        second = [url for url in urls if SectionSampler(0.25).accept(url)]
+        assert first == second
+        assert 400 < len(first) < 600
+        with pytest.raises(ValueError):
+            SectionSampler(0)
+
+    def test_stats(self):
+        """Распределения кодов, редиректов и цепочек; примеры ошибок ограничены"""
+        stats = LinkStats(examples_per_status=1)
+        stats.add(Probe("https://shop.ru/a/1", 200, (200,), "HEAD"))
+        stats.add(Probe("https://shop.ru/a/2", 200, (301, 200), "HEAD"))
+        stats.add(Probe("https://shop.ru/b/1", 404, (404,), "GET"))
+        stats.add(Probe("https://shop.ru/b/2", 404, (404,), "GET"))
+        stats.add(Probe("https://shop.ru/c/1", "TIMEOUT", (), "HEAD"))
+        assert stats.statuses == {200: 2, 404: 2, "TIMEOUT": 1}
+        assert stats.hops == {0: 4, 1: 1}
+        assert stats.chains == {"301 → 200": 1, "— → TIMEOUT": 1}
+        assert stats.bad_sections == {"b": 2, "c": 1}
+        assert stats.examples == {404: ["https://shop.ru/b/1"], "TIMEOUT": ["https://shop.ru/c/1"]}
+        lines = stats.summary_lines()
+        assert lines[0] == "Проверено страниц: 5, с ошибками: 3"
+
+
+class TestCrawl:
+    """Обход sitemap и проверка страниц"""
+
+    def test_nested_index(self, server, http):
+        """URL отдаются из всех файлов, включая вложенный индекс; битый файл пропускается"""
+        Handler.pages = {
+            "/sitemap.xml": f'<sitemapindex {NS}><sitemap><loc>{server}/s1.xml</loc></sitemap>'
+                            f'<sitemap><loc>{server}/nested.xml</loc></sitemap>'
+                            f'<sitemap><loc>{server}/missing.xml</loc></sitemap></sitemapindex>'.encode(),
+            "/nested.xml": f'<sitemapindex {NS}><sitemap><loc>{server}/s2.xml</loc></sitemap></sitemapindex>'.encode(),
+            "/s1.xml": f'<urlset {NS}><url><loc>{server}/ok</loc></url><url><loc>{server}/gone</loc></url></urlset>'.encode(),
+            "/s2.xml": f'<urlset {NS}><url><loc>{server}/old/0</loc></url></urlset>'.encode(),
+        }
+        errors = []
+        urls = list(iter_sitemap_urls(f"{server}/sitemap.xml", http, errors=errors))
+        assert urls == [f"{server}/ok", f"{server}/gone", f"{server}/old/0"]
+        assert [url for url, _ in errors] == [f"{server}/missing.xml"]
+
+        stats, sampler, _, _ = check_links(f"{server}/sitemap.xml", concurrency=2, rate_per_host=1e6, http=http)
+        assert stats.statuses == {200: 2, 404: 1}
+        assert stats.chains == {"302 → 200": 1}
+
+    def test_crawl_delay_per_host(self, http):
+        """Crawl-delay берётся из robots.txt хоста каждой страницы"""
+        with patch("robots.fetch_crawl_delay", return_value=0.5) as mock_delay, \
+                patch("link_health.HostRateLimiter") as mock_limiter, \
+                patch("link_health.iter_sitemap_urls", return_value=iter([])):
+            check_links("https://shop.ru/sitemap.xml", http=http)
+            crawl_delay = mock_limiter.call_args.kwargs["crawl_delay"]
+            assert crawl_delay("https://cdn.shop.ru/p/1") == 0.5
+            assert mock_delay.call_args.args[0] == "https://cdn.shop.ru/p/1"
+
+    def test_standin_shop(self, http):
+        """stand-in не поддерживает HEAD (501) — все страницы проверены через GET"""
+        with StandInShop(offers=60, sitemap_files=2) as shop:
+            stats, sampler, timings, errors = check_links(shop.sitemap_url, per_section=5, concurrency=4,
+                                                          rate_per_host=1e6, http=http)
+        assert not errors
+        assert sum(sampler.seen.values()) == 60
+        assert sampler.selected == {"turbo": 5, "parts": 5, "misc": 5}
+        assert stats.statuses == {200: 15}
+        assert stats.methods == {"GET": 15}
+        assert timings.histograms["страница"].count == 15
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -6,12 +6,29 @@ import pytest
 import sys
 import os
 from unittest.mock import patch, MagicMock
+from concurrent.futures.process import BrokenProcessPool
 import xml.etree.ElementTree as ET
 
+import requests
+
 # Добавляем корневую директорию в путь для импорта main.py
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from main import check_prices, parse_price, save_report, XML_URL, HEADERS
+from main import (
+    CheckOptions, ChangedOffers, select_offers, check_prices, check_offer, parse_price, save_report, XML_URL, HEADERS,
+    merge_shard_results, parse_args, TIMING_PHASES, read_page, DRAIN_BYTES, feed_diff_report,
+)
+import main
+from cassette import use_cassette
+from feed import Offer, parse_offers
+from offer_store import OfferStore, shard_of
+from price_parser import SelectorStats
+from reporter import ResultLog, read_results
+from timing import Timings
+import http_client
+
+# Записанные ответы прайса, страниц товаров и sitemap (cassette.record_site)
+CASSETTE_PATH = os.path.join(os.path.dirname(__file__), "cassettes", "shop.jsonl.gz")
 
 
 class TestParsePrice:
@@ -43,14 +60,497 @@ class TestParsePrice:
         assert parse_price(html) is None
 
 
+class TestCheckOffer:
+    """Тесты для функции check_offer"""
+
+    def _response(self, body, headers=None):
+        """Ответ с телом body; served — сколько кусков тела отдано"""
+        response = MagicMock()
+        response.content = body
+        response.headers = headers or {}
+        response.served = 0
+        response.retry_wait = 0.0
+        response.encoding = None
+        
+        def iter_content(chunk_size):
+            for i in range(0, len(body), chunk_size):
+                response.served += 1
+                yield body[i:i + chunk_size]
+        
+        response.iter_content.side_effect = iter_content
+        return response
+
+    def _http(self, html='', error=None):
+        response = self._response(html.encode("utf-8"))
+        response.__enter__.return_value = response
+        http = MagicMock()
+        if error is not None:
+            http.get.side_effect = error
+        else:
+            http.get.return_value = response
+        return http
+
+    def test_check_offer_ok(self):
+        """Цена в пределах допуска +/-10 RUB"""
+        http = self._http('<meta itemprop="price" content="1005">')
+        result = check_offer(1000.0, "https://example.com/p?pid=1", http=http)
+        assert result[2:4] == (1005.0, "OK")
+
+    def test_check_offer_diff(self):
+        """Расхождение больше допуска"""
+        http = self._http('<meta itemprop="price" content="1200">')
+        result = check_offer(1000.0, "https://example.com/p?pid=1", http=http)
+        assert result[3] == "DIFF_200"
+
+    def test_check_offer_timings(self):
+        """Успешная загрузка записывает все фазы замеров"""
+        http = self._http('<meta itemprop="price" content="1000">')
+        timings = Timings()
+        check_offer(1000.0, "https://example.com/p?pid=1", http=http, timings=timings)
+        assert sorted(timings.histograms) == sorted(TIMING_PHASES[:4])
+        assert all(h.count == 1 for h in timings.histograms.values())
+
+    def test_check_offer_retry_wait(self):
+        """Повторы HttpClient — отдельная фаза, в «ответ» входит только последняя попытка"""
+        http = self._http('<meta itemprop="price" content="1000">')
+        http.get.return_value.retry_wait = 5.0
+        timings = Timings()
+        check_offer(1000.0, "https://example.com/p?pid=1", http=http, timings=timings)
+        assert timings.histograms[TIMING_PHASES[4]].max_ms == 5000.0
+        assert timings.histograms[TIMING_PHASES[0]].max_ms < 1000.0
+
+    def test_check_offer_cp1251(self):
+        """Страница в кодировке из Content-Type ответа"""
+        http = self._http()
+        response = self._response('<div class="price">1 000 Руб.</div>'.encode('cp1251'),
+                                  {"Content-Type": "text/html; charset=windows-1251"})
+        response.__enter__.return_value = response
+        http.get.return_value = response
+        result = check_offer(1000.0, "https://example.com/p?pid=1", http=http)
+        assert result[2:4] == (1000.0, "OK")
+
+    def test_check_offer_request_error(self):
+        """Ошибка запроса не пробрасывается наружу и классифицируется"""
+        http = self._http(error=requests.ConnectionError("boom"))
+        result = check_offer(1000.0, "https://example.com/p?pid=1", http=http)
+        assert result[3] == "CONNECTION_ERROR"
+        assert isinstance(result[4], requests.ConnectionError)
+
+    def test_read_page_stops_after_meta(self):
+        """Найдя <meta itemprop="price">, загрузка не дочитывает страницу"""
+        page = b'<head><meta itemprop="price" content="1000"></head>' + b'<li>x</li>' * 20000
+        response = self._response(page)
+        body = read_page(response)
+        assert body.startswith(page[:60]) and len(body) < len(page)
+        assert response.served == 1
+        assert parse_price(body) == 1000.0
+
+    def test_read_page_empty_meta(self):
+        """Мета-тег без цены не обрезает страницу: цена из .price в конце"""
+        page = b'<head><meta itemprop="price" content=""></head>' + b'<li>x</li>' * 20000
+        page += b'<div class="price">700</div>'
+        body = read_page(self._response(page))
+        assert body == page
+        assert parse_price(body) == 700.0
+
+    def test_read_page_drains_short_tail(self):
+        """Короткий остаток известной длины дочитывается ради keep-alive"""
+        page = b'<meta itemprop="price" content="1000">' + b' ' * (DRAIN_BYTES + 100)
+        response = self._response(page, {"Content-Length": str(len(page))})
+        read_page(response)
+        assert response.served == 2
+
+    def test_read_page_full_fallback(self):
+        """Без мета-тега в первых scan_bytes страница загружается целиком"""
+        page = b'<li>x</li>' * 20000 + b'<div class="price">700</div>'
+        assert read_page(self._response(page), scan_bytes=1024) == page
+        late_meta = b' ' * 20000 + b'<meta itemprop="price" content="1">' + b' ' * 50000
+        assert read_page(self._response(late_meta), scan_bytes=1024) == late_meta
+        assert read_page(self._response(page), scan_bytes=0) == page
+
+    def test_check_offer_http_error(self):
+        """HTTP-ошибка даёт статус с кодом ответа"""
+        http = self._http('')
+        error_response = MagicMock(status_code=404)
+        http.get.return_value.raise_for_status.side_effect = requests.HTTPError(response=error_response)
+        result = check_offer(1000.0, "https://example.com/p?pid=1", http=http)
+        assert result[3] == "HTTP_404"
+
+
+class TestSharding:
+    """Тесты для полной проверки каталога по шардам"""
+
+    def test_merge_shard_results(self, tmp_path):
+        """Журналы шардов объединяются в один отчёт"""
+        os.chdir(tmp_path)
+        first = ResultLog.from_results(
+            str(tmp_path / "shard_0of2"), [(1000.0, "https://example.com/p?pid=1", 1000.0, "OK")])
+        second = ResultLog.from_results(
+            str(tmp_path / "shard_1of2"), [(2000.0, "https://example.com/p?pid=2", 2500.0, "DIFF_500")])
+
+        filename = merge_shard_results([first.path, second.path])
+        with open(filename, 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert "Проверено товаров: 2" in content
+        assert "Корректных: 1/2" in content
+        assert "DIFF_500" in content
+
+    def test_parse_args_shard(self):
+        """Разбор аргумента --shard"""
+        args = parse_args(["--full", "--shard", "2/8"])
+        assert args.full
+        assert (args.shard_index, args.shard_count) == (2, 8)
+        with pytest.raises(SystemExit):
+            parse_args(["--shard", "8/8"])
+
+    @pytest.mark.parametrize("value", ["0", "-5"])
+    def test_parse_args_chunk_size(self, value):
+        """--chunk-size меньше 1 отклоняется"""
+        assert parse_args(["--chunk-size", "1"]).chunk_size == 1
+        with pytest.raises(SystemExit):
+            parse_args(["--full", "--chunk-size", value])
+
+    @pytest.mark.parametrize("value", ["0", "-1"])
+    def test_parse_args_budget(self, value):
+        """--budget меньше 1 отклоняется"""
+        assert parse_args(["--budget", "1"]).budget == 1
+        with pytest.raises(SystemExit):
+            parse_args(["--budget", value])
+
+
+class TestCheckPricesOffline:
+    """Тесты check_prices без обращения к сети"""
+
+    OFFERS = [
+        Offer(float(n * 100), f"https://example.com/p?pid={n}", str(n), "true", None, None)
+        for n in range(1, 51)
+    ]
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_full_shard(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """Полная проверка шарда обходит ровно товары этого шарда"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        mock_check.side_effect = lambda price, url, *args: (price, url, price, "OK", None)
+
+        check_prices(full=True, shard_index=1, shard_count=3, chunk_size=7, rate_per_host=1000, parse_workers=0)
+
+        checked = sorted(call.args[1] for call in mock_check.call_args_list)
+        expected = sorted(o.url for o in self.OFFERS if shard_of(o.url, 3) == 1)
+        assert checked == expected
+        # текстовый отчёт + журнал шарда (JSONL, CSV) + JUnit XML
+        assert sorted(name.rsplit(".", 1)[-1] for name in os.listdir("reports")) == ["csv", "jsonl", "txt", "xml"]
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_sample(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """Выборочная проверка берёт SAMPLE_SIZE разных товаров"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        mock_check.side_effect = lambda price, url, *args: (price, url, price, "OK", None)
+
+        check_prices(rate_per_host=1000)
+
+        checked = [call.args[1] for call in mock_check.call_args_list]
+        assert len(checked) == 20
+        assert len(set(checked)) == 20
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_prioritized(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """Выборка по приоритету: первым проверяется товар с прошлым расхождением, хоть он и дешёвый"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        cheap = self.OFFERS[0].url
+        mock_check.side_effect = lambda price, url, *args: (
+            (price, url, price + 500, "DIFF_500", None) if url == cheap else (price, url, price, "OK", None)
+        )
+        check_prices(full=True, rate_per_host=1000, parse_workers=0)
+
+        mock_check.reset_mock()
+        check_prices(rate_per_host=1000, budget=5)
+        checked = [call.args[1] for call in mock_check.call_args_list]
+        assert len(checked) == 5
+        assert cheap in checked
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_pids(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """С pids проверяются только товары с этими PID или id, без повторов"""
+        os.chdir(tmp_path)
+        offers = list(self.OFFERS)
+        offers[9] = offers[9]._replace(url="https://example.com/p/10", offer_id="a10")
+        mock_iter.side_effect = lambda *args, **kwargs: iter(offers)
+        mock_check.side_effect = lambda price, url, *args: (price, url, price, "OK", None)
+
+        check_prices(rate_per_host=1000, pids=["3", "a10", "3", "404"])
+
+        checked = sorted(call.args[1] for call in mock_check.call_args_list)
+        assert checked == sorted([offers[2].url, offers[9].url])
+        with pytest.raises(SystemExit):
+            parse_args(["--full", "--pid", "3"])
+
+    @patch('main.HostRateLimiter')
+    @patch('robots.fetch_crawl_delay', return_value=0.5)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_obeys_crawl_delay(self, mock_iter, mock_check, mock_delay, mock_limiter, tmp_path):
+        """Crawl-delay из robots.txt хоста страницы ограничивает частоту запросов к нему"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        mock_check.side_effect = lambda price, url, *args: (price, url, price, "OK", None)
+
+        check_prices(rate_per_host=1000)
+
+        mock_limiter.assert_called_once()
+        crawl_delay = mock_limiter.call_args.kwargs["crawl_delay"]
+        assert crawl_delay("https://partner.example.org/p?pid=1") == 0.5
+        assert mock_delay.call_args.args[0] == "https://partner.example.org/p?pid=1"
+
+    @patch('main.AdaptiveConcurrency')
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_adaptive_latency(self, mock_iter, mock_check, mock_delay, mock_controller, tmp_path):
+        """AIMD получает только сетевую часть запроса, без разбора страницы"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS[:3])
+
+        def check(price, url, stats, http, timings, *args):
+            timings.record(TIMING_PHASES[0], 0.2)
+            timings.record(TIMING_PHASES[1], 0.1)
+            timings.record(TIMING_PHASES[2], 5.0)
+            return (price, url, price, "OK", None)
+
+        mock_check.side_effect = check
+        check_prices(full=True, rate_per_host=1000, parse_workers=0)
+
+        latencies = [call.args[0] for call in mock_controller.return_value.release.call_args_list]
+        assert latencies == [pytest.approx(0.3)] * 3
+
+    @patch('main.AdaptiveConcurrency')
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer', side_effect=RuntimeError("сбой"))
+    @patch('feeds.iter_offers')
+    def test_check_prices_releases_slot_on_error(self, mock_iter, mock_check, mock_delay, mock_controller, tmp_path):
+        """Слот AIMD освобождается (как ошибка), даже если проверка выбросила исключение"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS[:1])
+        with pytest.raises(RuntimeError):
+            check_prices(full=True, rate_per_host=1000, parse_workers=0)
+        mock_controller.return_value.release.assert_called_once()
+        assert mock_controller.return_value.release.call_args.args[1] is True
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_incremental(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """Повторный инкрементальный прогон проверяет только изменившиеся и неуспешные товары"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        failing = self.OFFERS[0].url
+        mock_check.side_effect = lambda price, url, *args: (
+            (price, url, None, "TIMEOUT", None) if url == failing else (price, url, price, "OK", None)
+        )
+        check_prices(full=True, rate_per_host=1000, incremental=True, parse_workers=0)
+        assert mock_check.call_count == len(self.OFFERS)
+
+        changed = self.OFFERS[5]._replace(price=1.0)
+        offers = list(self.OFFERS)
+        offers[5] = changed
+        mock_iter.side_effect = lambda *args, **kwargs: iter(offers)
+        mock_check.reset_mock()
+        check_prices(full=True, rate_per_host=1000, incremental=True, parse_workers=0)
+
+        checked = sorted(call.args[1] for call in mock_check.call_args_list)
+        assert checked == sorted([failing, changed.url])
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_changed_only(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """С changed_only повторный прогон проверяет только добавленные и изменившиеся в прайсе товары"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        mock_check.side_effect = lambda price, url, *args: (price, url, price, "OK", None)
+        check_prices(full=True, rate_per_host=1000, changed_only=True, parse_workers=0)
+        assert mock_check.call_count == len(self.OFFERS)
+
+        offers = list(self.OFFERS[1:])
+        offers[3] = offers[3]._replace(available="false")
+        added = Offer(1.0, "https://example.com/p?pid=99", "99", "true", None, None)
+        offers.append(added)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(offers)
+        mock_check.reset_mock()
+        check_prices(full=True, rate_per_host=1000, changed_only=True, parse_workers=0)
+
+        checked = sorted(call.args[1] for call in mock_check.call_args_list)
+        assert checked == sorted([offers[3].url, added.url])
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_changed_only_rechecks_failures(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """С changed_only товар без OK проверяется снова, пока проверка не пройдёт"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        timeout, diff, changed = self.OFFERS[0].url, self.OFFERS[1].url, self.OFFERS[2]
+        mock_check.side_effect = lambda price, url, *args: (
+            (price, url, None, "TIMEOUT", None) if url == timeout else
+            (price, url, price + 500, "DIFF_500", None) if url in (diff, changed.url) else
+            (price, url, price, "OK", None)
+        )
+        check_prices(full=True, rate_per_host=1000, changed_only=True, parse_workers=0)
+        assert mock_check.call_count == len(self.OFFERS)
+
+        mock_check.reset_mock()
+        check_prices(full=True, rate_per_host=1000, changed_only=True, parse_workers=0)
+        checked = sorted(call.args[1] for call in mock_check.call_args_list)
+        assert checked == sorted([timeout, diff, changed.url])
+
+        offers = list(self.OFFERS)
+        offers[2] = changed._replace(price=1.0)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(offers)
+        mock_check.side_effect = lambda price, url, *args: (price, url, price, "OK", None)
+        mock_check.reset_mock()
+        check_prices(full=True, rate_per_host=1000, changed_only=True, parse_workers=0)
+        checked = sorted(call.args[1] for call in mock_check.call_args_list)
+        assert checked == sorted([timeout, diff, changed.url])
+
+        mock_check.reset_mock()
+        check_prices(full=True, rate_per_host=1000, changed_only=True, parse_workers=0)
+        assert mock_check.call_count == 0
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('parse_pool.ProcessPoolExecutor')
+    @patch('main.fetch_page')
+    @patch('feeds.iter_offers')
+    def test_check_prices_broken_parse_pool(self, mock_iter, mock_fetch, mock_executor, mock_delay, tmp_path, capsys):
+        """Сломавшийся пул разбора не прерывает проверку: страницы разбираются в потоках"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS[:5])
+        mock_fetch.side_effect = lambda url, *args: (
+            f'<meta itemprop="price" content="{url.rsplit("=", 1)[1]}00">'.encode("utf-8"), None, None, None)
+        mock_executor.return_value.submit.side_effect = BrokenProcessPool("обработчик упал")
+
+        check_prices(full=True, rate_per_host=1000, parse_workers=2)
+
+        out = capsys.readouterr().out
+        assert "Корректных цен: 5/5" in out
+        assert "пул процессов разбора остановился" in out
+
+    @patch('feeds.iter_offers')
+    def test_feed_diff_report(self, mock_iter, tmp_path):
+        """Отчёт об изменениях прайса: первый вызов сохраняет отпечатки, второй выводит изменения"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS[:3])
+        _, diff = feed_diff_report(use_http_cache=False)
+        assert diff.added == 3
+
+        offers = [self.OFFERS[0]._replace(price=150.0), self.OFFERS[2], self.OFFERS[3]]
+        mock_iter.side_effect = lambda *args, **kwargs: iter(offers)
+        filename, diff = feed_diff_report(use_http_cache=False)
+        with open(filename, encoding="utf-8") as f:
+            report = f.read()
+        assert f"~ {self.OFFERS[0].url}: 100 -> 150 RUB" in report
+        assert f"+ {self.OFFERS[3].url}: 400 RUB" in report
+        assert f"- {self.OFFERS[1].url}: было 200 RUB" in report
+        assert "Итого: добавлено 1, изменилось 1, удалено 1, без изменений 1" in report
+
+
+class TestCheckHelpers:
+    """Тесты вспомогательных частей check_prices"""
+
+    OFFERS = TestCheckPricesOffline.OFFERS
+
+    def test_changed_offers_filters(self):
+        """ChangedOffers берёт товары шарда и считает отброшенные incremental"""
+        store = MagicMock()
+        store.needs_check.side_effect = lambda url, price: price > 1000
+        changes = ChangedOffers(0, 2, results_store=store)
+        selected = list(changes(self.OFFERS))
+        in_shard = [o for o in self.OFFERS if shard_of(o.url, 2) == 0]
+        assert selected == [o for o in in_shard if o.price > 1000]
+        assert changes.skipped == len(in_shard) - len(selected)
+
+    def test_select_offers_pids(self, capsys):
+        """select_offers с pids берёт товары по PID и id без повторов"""
+        store = OfferStore.from_offers(self.OFFERS)
+        offers, kind = select_offers(store, None, CheckOptions(pids=["3", "3", "404"]))
+        assert [o.url for o in offers] == [self.OFFERS[2].url]
+        assert kind == "заданных"
+        assert "Товар 404 не найден" in capsys.readouterr().out
+
+    @patch('robots.fetch_crawl_delay', return_value=None)
+    @patch('main.check_offer')
+    @patch('feeds.iter_offers')
+    def test_check_prices_options(self, mock_iter, mock_check, mock_delay, tmp_path):
+        """Именованные аргументы check_prices заменяют поля CheckOptions"""
+        os.chdir(tmp_path)
+        mock_iter.side_effect = lambda *args, **kwargs: iter(self.OFFERS)
+        mock_check.side_effect = lambda price, url, *args: (price, url, price, "OK", None)
+
+        check_prices(CheckOptions(budget=3, rate_per_host=1000), budget=4)
+        assert mock_check.call_count == 4
+
+
+class TestCheckPricesReplay:
+    """Быстрые аналоги интеграционных тестов на записанных ответах (без сети)"""
+
+    @pytest.fixture
+    def cassette(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with use_cassette(CASSETTE_PATH) as cassette:
+            monkeypatch.setattr(main, "XML_URL", cassette.meta["feed_url"])
+            yield cassette
+
+    def feed_offers(self, cassette):
+        with http_client.get(cassette.meta["feed_url"], headers=HEADERS) as response:
+            assert response.status_code == 200
+            return list(parse_offers([response.content]))
+
+    def test_feed_structure(self, cassette):
+        """В прайсе есть товары, у каждого URL с параметром pid и цена"""
+        offers = self.feed_offers(cassette)
+        assert offers
+        assert all("pid=" in offer.url and offer.price > 0 for offer in offers)
+
+    def test_parse_price_pages(self, cassette):
+        """Цена со страницы товара совпадает с прайсом с допуском +/-10 RUB (не меньше 90% товаров)"""
+        offers = self.feed_offers(cassette)
+        matched = 0
+        for offer in offers:
+            with http_client.get(offer.url, headers=HEADERS) as response:
+                price_site = parse_price(response.text)
+            if price_site is not None and abs(price_site - offer.price) <= 10:
+                matched += 1
+        assert matched >= 0.9 * len(offers)
+        assert not cassette.misses
+
+    def test_check_prices_runs(self, cassette):
+        """check_prices проверяет все товары кассеты без обращения к сети"""
+        offers = self.feed_offers(cassette)
+        check_prices(use_http_cache=False, rate_per_host=1e6, budget=len(offers))
+
+        (log_path,) = [os.path.join("reports", name) for name in os.listdir("reports") if name.endswith(".jsonl")]
+        results = list(read_results(log_path))
+        assert sorted(url for _, url, _, _ in results) == sorted(offer.url for offer in offers)
+        assert not any(http_client.is_transient(status) for _, _, _, status in results)
+        assert not cassette.misses
+
+
 class TestCheckPricesIntegration:
     """Интеграционные тесты для check_prices"""
     
     @pytest.mark.integration
     def test_xml_url_accessible(self):
         """Проверка доступности XML URL (gtun.4.xml)"""
-        import requests
-        response = requests.get(XML_URL, headers=HEADERS, timeout=30)
+        response = http_client.get(XML_URL, headers=HEADERS, timeout=30)
         assert response.status_code == 200
         assert 'xml' in response.headers.get('content-type', '').lower()
         # Проверяем что используется правильный XML для GTUN
@@ -59,8 +559,7 @@ class TestCheckPricesIntegration:
     @pytest.mark.integration
     def test_xml_structure_valid(self):
         """Проверка валидности структуры XML и наличия URL с PID"""
-        import requests
-        response = requests.get(XML_URL, headers=HEADERS, timeout=30)
+        response = http_client.get(XML_URL, headers=HEADERS, timeout=30)
         root = ET.fromstring(response.content)
         
         # Проверяем наличие offers
@@ -86,8 +585,7 @@ class TestCheckPricesIntegration:
     @pytest.mark.integration
     def test_xml_urls_contain_pid(self):
         """Проверка что все URL в XML содержат параметр pid"""
-        import requests
-        response = requests.get(XML_URL, headers=HEADERS, timeout=30)
+        response = http_client.get(XML_URL, headers=HEADERS, timeout=30)
         root = ET.fromstring(response.content)
         
         offers = root.findall('.//offer')
@@ -105,10 +603,8 @@ class TestCheckPricesIntegration:
     @pytest.mark.integration
     def test_price_check_logic(self):
         """Проверка логики сравнения цен: цена с PID должна совпадать с допуском +/-10 RUB"""
-        import requests
-        
         # Получаем один товар из XML для проверки
-        response = requests.get(XML_URL, headers=HEADERS, timeout=30)
+        response = http_client.get(XML_URL, headers=HEADERS, timeout=30)
         root = ET.fromstring(response.content)
         
         offers = root.findall('.//offer')
@@ -136,7 +632,7 @@ class TestCheckPricesIntegration:
         assert 'pid=' in url_with_pid, f"URL должен содержать pid: {url_with_pid}"
         
         # Получаем цену со страницы
-        response = requests.get(url_with_pid, headers=HEADERS, timeout=15)
+        response = http_client.get(url_with_pid, headers=HEADERS, timeout=15)
         response.raise_for_status()
         price_site = parse_price(response.text)
         
@@ -152,9 +648,7 @@ class TestCheckPricesIntegration:
     @pytest.mark.integration
     def test_random_selection_20_items(self):
         """Проверка что выбирается 20 случайных товаров (требование)"""
-        import requests
-        
-        response = requests.get(XML_URL, headers=HEADERS, timeout=30)
+        response = http_client.get(XML_URL, headers=HEADERS, timeout=30)
         root = ET.fromstring(response.content)
         
         all_offers = []
@@ -221,6 +715,34 @@ class TestSaveReport:
             assert "https://example.com/product1" in content
             assert "Корректных: 2/2" in content
 
+    def test_save_report_transient_errors(self, tmp_path):
+        """Временные ошибки выводятся отдельно от расхождений"""
+        os.chdir(tmp_path)
+        offers_checked = [
+            (1000.0, "https://example.com/p1", None, "TIMEOUT"),
+            (2000.0, "https://example.com/p2", None, "HTTP_404"),
+        ]
+        errors = [("https://example.com/p2", 2000.0, None, "HTTP_404")]
+
+        filename = save_report(offers_checked, errors, 0, 1.0)
+        with open(filename, 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert "Ошибок: 1" in content
+        assert "Не проверено (временные ошибки): 1" in content
+        assert "https://example.com/p1 | TIMEOUT" in content
+
+    def test_save_report_selector_stats(self, tmp_path):
+        """Статистика селекторов попадает в отчёт"""
+        os.chdir(tmp_path)
+        stats = SelectorStats()
+        stats.record("/catalog/turbo", ".price", ".price-value")
+
+        filename = save_report([(1000.0, "https://example.com/p1", 1000.0, "OK")], [], 1, 1.0, stats)
+        with open(filename, 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert "/catalog/turbo -> .price: 1" in content
+        assert "через .price вместо .price-value" in content
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
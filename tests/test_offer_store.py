@@ -0,0 +1,92 @@
+"""
+Юнит-тесты для offer_store.py
+Проверяет колоночное хранилище товаров и шардирование
+"""
+import pytest
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from feed import Offer
+from offer_store import OfferStore, extract_pid, shard_of
+
+
+def make_offers(n):
+    """Синтетические товары с PID, категориями и производителями"""
+    return [
+        Offer(float(i * 10), f"https://example.com/p/{i}?pid={i}", f"id{i}",
+              "true" if i % 2 else "false", str(i % 3), "Garrett" if i % 2 else None)
+        for i in range(n)
+    ]
+
+
+class TestShardHelpers:
+    """Тесты для extract_pid и shard_of"""
+
+    def test_extract_pid(self):
+        """PID извлекается из параметров URL"""
+        assert extract_pid("https://example.com/p?pid=123") == "123"
+        assert extract_pid("https://example.com/p?a=1&pid=77") == "77"
+        assert extract_pid("https://example.com/p") is None
+
+    def test_shard_of_is_stable_and_disjoint(self):
+        """Каждый товар попадает ровно в один шард, всегда один и тот же"""
+        urls = [f"https://example.com/p?pid={n}" for n in range(1000)]
+        shards = [shard_of(url, 4) for url in urls]
+        assert shards == [shard_of(url, 4) for url in urls]
+        assert set(shards) == {0, 1, 2, 3}
+        # Распределение примерно равномерное
+        assert min(shards.count(k) for k in range(4)) > 150
+
+    def test_shard_of_uses_pid(self):
+        """Шард определяется по PID, а не по остальной части URL"""
+        assert shard_of("https://a.example.com/x?pid=5", 8) == shard_of("https://b.example.com/y?pid=5", 8)
+
+
+class TestOfferStore:
+    """Тесты для OfferStore"""
+
+    def test_round_trip(self):
+        """Товары читаются из хранилища без потерь"""
+        offers = make_offers(10) + [Offer(5.0, "https://example.com/ю", None, None, None, None)]
+        store = OfferStore.from_offers(offers)
+        assert len(store) == len(offers)
+        assert list(store) == offers
+        assert store[-1] == offers[-1]
+        with pytest.raises(IndexError):
+            store[len(offers)]
+
+    def test_indexes(self):
+        """Поиск строки по PID и по id товара"""
+        store = OfferStore.from_offers(make_offers(100))
+        assert store.row_by_pid("42") == 42
+        assert store.row_by_offer_id("id7") == 7
+        assert store.row_by_pid("nope") is None
+
+    def test_without_indexes(self):
+        """indexed=False: товары хранятся, индексы не заполняются"""
+        store = OfferStore(indexed=False)
+        for offer in make_offers(10):
+            store.append(offer)
+        assert store[3] == make_offers(10)[3]
+        assert store.pid_index == {} and store.id_index == {}
+        assert store.row_by_pid("3") is None
+
+    def test_dictionary_columns_are_shared(self):
+        """Повторяющиеся категории хранятся один раз"""
+        store = OfferStore.from_offers(make_offers(300))
+        assert len(store.categories.values) == 4  # None + три категории
+        assert store[5].category_id == "2"
+
+    def test_sample_rows(self):
+        """Выборка без повторов заданного размера"""
+        store = OfferStore.from_offers(make_offers(50))
+        rows = store.sample_rows(20, random.Random(1))
+        assert len(set(rows)) == 20
+        assert OfferStore.from_offers(make_offers(5)).sample_rows(20) == [0, 1, 2, 3, 4]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,176 @@
+"""
+Сквозные тесты без сети: проверка цен и обход sitemap
+на локальном заменителе магазина (benchmarks/standin.py)
+"""
+import pytest
+import sys
+import os
+import glob
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'sitemap'))
+
+import main
+from drift import DriftRules
+from reporter import read_results
+from standin import StandInShop, offer_price
+
+OFFERS = 100
+CHUNK = 20       # Порция прогонов с прерыванием: несколько порций на прайс
+
+
+@pytest.fixture(scope="module")
+def shop():
+    with StandInShop(offers=OFFERS, mismatch_rate=0.1, sitemap_files=3) as shop:
+        yield shop
+
+
+class TestOfflineEndToEnd:
+    """Полный цикл проверки на stand-in"""
+
+    @pytest.mark.parametrize("parse_workers", [0, 2])
+    def test_full_check_prices(self, shop, tmp_path, monkeypatch, parse_workers):
+        """Все товары проверены, расхождения stand-in найдены точно (с пулом разбора и без)"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(main, "XML_URL", shop.feed_url)
+
+        main.check_prices(full=True, concurrency=16, rate_per_host=1e6, use_http_cache=False,
+                          parse_workers=parse_workers)
+
+        (log_path,) = glob.glob("reports/check_*.jsonl")
+        results = list(read_results(log_path))
+        statuses = Counter(status for _, _, _, status in results)
+        expected_diffs = sum(1 for pid in range(1, OFFERS + 1) if shop.site_price(pid) != offer_price(pid))
+        assert len(results) == OFFERS
+        assert statuses["DIFF_500"] == expected_diffs > 0
+        assert statuses["OK"] == OFFERS - expected_diffs
+        (report_path,) = glob.glob("reports/check_*.txt")
+        with open(report_path, encoding="utf-8") as f:
+            report = f.read()
+        assert f"{main.TIMING_PHASES[3]}: {OFFERS} запросов" in report
+
+    def test_drift_rules(self, shop, tmp_path, monkeypatch):
+        """Правило производителя пропускает его расхождения; в отчёте есть статистика"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(main, "XML_URL", shop.feed_url)
+        rules = DriftRules(vendors={"Vendor7": {"abs": 600}})
+
+        main.check_prices(full=True, concurrency=16, rate_per_host=1e6, use_http_cache=False,
+                          parse_workers=0, rules=rules)
+
+        (log_path,) = glob.glob("reports/check_*.jsonl")
+        statuses = Counter(status for _, _, _, status in read_results(log_path))
+        expected_diffs = sum(1 for pid in range(1, OFFERS + 1)
+                             if shop.site_price(pid) != offer_price(pid) and pid % 50 != 7)
+        assert statuses["DIFF_500"] == expected_diffs
+        (report_path,) = glob.glob("reports/check_*.txt")
+        with open(report_path, encoding="utf-8") as f:
+            report = f.read()
+        assert "РАСХОЖДЕНИЯ ЦЕН" in report
+        assert f"Пар цен: {OFFERS}, вне допуска: {expected_diffs} " in report
+
+    def _interrupt_after(self, monkeypatch, chunks):
+        """fetch_all, который прерывает прогон на порции номер chunks + 1"""
+        calls = []
+        real_fetch_all = main.fetch_all
+
+        def fetch_all(items, worker, concurrency):
+            calls.append(len(items))
+            if len(calls) > chunks:
+                raise KeyboardInterrupt
+            return real_fetch_all(items, worker, concurrency)
+
+        monkeypatch.setattr(main, "fetch_all", fetch_all)
+
+    def test_resume_after_interrupt(self, shop, tmp_path, monkeypatch):
+        """Прерванный прогон продолжается с контрольной точки без повторных запросов"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(main, "XML_URL", shop.feed_url)
+        options = dict(full=True, chunk_size=CHUNK, concurrency=8, rate_per_host=1e6,
+                       use_http_cache=False, parse_workers=0)
+        with monkeypatch.context() as patched:
+            self._interrupt_after(patched, 2)
+            with pytest.raises(KeyboardInterrupt):
+                main.check_prices(**options)
+        assert os.path.exists(main.CHECKPOINT_PATH.format(shard="0of1"))
+
+        requests_before = shop.requests
+        main.check_prices(resume=True, **options)
+
+        (log_path,) = glob.glob("reports/check_*.jsonl")
+        urls = [url for _, url, _, _ in read_results(log_path)]
+        assert len(urls) == len(set(urls)) == OFFERS
+        assert shop.requests - requests_before == OFFERS - 2 * CHUNK
+        assert not os.path.exists(main.CHECKPOINT_PATH.format(shard="0of1"))
+        (report_path,) = glob.glob("reports/check_*.txt")
+        with open(report_path, encoding="utf-8") as f:
+            assert f"Пар цен: {OFFERS}," in f.read()
+
+    def test_resume_with_changed_feed(self, shop, tmp_path, monkeypatch):
+        """Если прайс изменился, прогон начинается заново в новом журнале"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(main, "XML_URL", shop.feed_url)
+        options = dict(full=True, chunk_size=CHUNK, concurrency=8, rate_per_host=1e6,
+                       use_http_cache=False, parse_workers=0)
+        with monkeypatch.context() as patched:
+            self._interrupt_after(patched, 1)
+            with pytest.raises(KeyboardInterrupt):
+                main.check_prices(**options)
+
+        # Другой экземпляр stand-in: URL товаров (порт) другие
+        with StandInShop(offers=OFFERS) as other:
+            monkeypatch.setattr(main, "XML_URL", other.feed_url)
+            main.check_prices(resume=True, **options)
+            assert other.requests == OFFERS
+
+        new_log = max(glob.glob("reports/check_*.jsonl"), key=os.path.getmtime)
+        urls = [url for _, url, _, _ in read_results(new_log)]
+        assert len(urls) == OFFERS and all(url.startswith(other.url) for url in urls)
+
+    def test_resume_changed_only(self, shop, tmp_path, monkeypatch):
+        """После продолжения прогона с changed_only следующий проверяет только товары без OK"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(main, "XML_URL", shop.feed_url)
+        options = dict(full=True, chunk_size=CHUNK, concurrency=8, rate_per_host=1e6,
+                       use_http_cache=False, parse_workers=0, changed_only=True)
+        with monkeypatch.context() as patched:
+            self._interrupt_after(patched, 2)
+            with pytest.raises(KeyboardInterrupt):
+                main.check_prices(**options)
+        main.check_prices(resume=True, **options)
+
+        requests_before = shop.requests
+        main.check_prices(**options)
+        expected_diffs = sum(1 for pid in range(1, OFFERS + 1) if shop.site_price(pid) != offer_price(pid))
+        assert shop.requests - requests_before == expected_diffs > 0
+
+    def test_multiple_feeds(self, shop, tmp_path, monkeypatch):
+        """Товар из нескольких прайсов проверяется один раз, в отчёте — итоги по прайсам"""
+        monkeypatch.chdir(tmp_path)
+        with StandInShop(offers=OFFERS // 2) as partner:
+            requests_before = shop.requests
+            main.check_prices(full=True, concurrency=16, rate_per_host=1e6, use_http_cache=False,
+                              parse_workers=0, feed_urls=[shop.feed_url, partner.feed_url])
+            assert partner.requests == 0
+
+        assert shop.requests - requests_before == OFFERS
+        (log_path,) = glob.glob("reports/check_*.jsonl")
+        assert len(list(read_results(log_path))) == OFFERS
+        (report_path,) = glob.glob("reports/check_*.txt")
+        with open(report_path, encoding="utf-8") as f:
+            report = f.read()
+        assert (f"{partner.feed_url}: товаров {OFFERS // 2} (повторов {OFFERS // 2}), "
+                f"проверено {OFFERS // 2}") in report
+
+    def test_sitemap_crawl(self, shop):
+        """Индекс и все дочерние sitemap-файлы проходят проверку"""
+        import check_sitemaps
+        results = check_sitemaps.crawl_sitemaps([shop.sitemap_url], workers=4)
+        assert len(results) == 4
+        assert all(ok for _, ok, _ in results)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,96 @@
+"""
+Юнит-тесты для parse_pool.py
+Проверяет разбор страниц в пуле процессов и учёт статистики селекторов
+"""
+import pytest
+import sys
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from parse_pool import ParsePool, timed_extract
+from price_parser import SelectorStats, META_SELECTOR
+
+PAGE = '<html><head><meta itemprop="price" content="{price}"></head><body></body></html>'
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ParsePool(workers=2, max_pending=2) as pool:
+        yield pool
+
+
+class TestParsePool:
+    """Тесты ParsePool"""
+
+    def test_timed_extract(self):
+        """Обработчик возвращает цену, способ и время разбора"""
+        price, tier, seconds = timed_extract(PAGE.format(price=1500).encode("utf-8"))
+        assert (price, tier) == (1500.0, META_SELECTOR)
+        assert seconds >= 0
+
+    def test_results_and_stats(self, pool):
+        """Цены разбираются в процессах, статистика копится в основном процессе"""
+        stats = SelectorStats()
+        pending = [
+            pool.submit(PAGE.format(price=1000 + i).encode("utf-8"), f"https://example.com/turbo/item?pid={i}", stats)
+            for i in range(10)
+        ]
+        prices = [p.result()[0] for p in pending]
+        assert prices == [1000.0 + i for i in range(10)]
+        assert stats.run_hits == {"/turbo/item": {META_SELECTOR: 10}}
+
+    def test_price_not_found(self, pool):
+        """Страница без цены даёт None и не попадает в статистику"""
+        stats = SelectorStats()
+        price, _ = pool.submit(b"<html><body>-</body></html>", "https://example.com/x", stats).result()
+        assert price is None
+        assert stats.run_hits == {}
+
+    def test_encoding(self, pool):
+        """Кодировка из заголовка ответа доходит до процесса-обработчика"""
+        html = '<div class="price">1 500 Руб.</div>'.encode('cp1251')
+        assert pool.submit(html, encoding="windows-1251").result()[0] == 1500.0
+
+
+class TestBrokenPool:
+    """Разбор продолжается в вызывающем потоке, если пул процессов сломался"""
+
+    def broken_pool(self, submit):
+        pool = ParsePool(workers=1)
+        pool.executor.shutdown()
+        pool.executor = MagicMock()
+        pool.executor.submit.side_effect = submit
+        return pool
+
+    def test_submit_broken(self):
+        """submit() на сломанном пуле разбирает страницу сам и не держит слот"""
+        def submit(*args):
+            raise BrokenProcessPool("обработчик упал")
+        pool = self.broken_pool(submit)
+        stats = SelectorStats()
+        for i in range(10):  # Больше, чем слотов max_pending
+            pending = pool.submit(PAGE.format(price=100 + i).encode("utf-8"), "https://example.com/item?pid=1", stats)
+            assert pending.result()[0] == 100.0 + i
+        assert pool.broken
+        assert pool.executor.submit.call_count == 1
+        assert stats.run_hits == {"/item": {META_SELECTOR: 10}}
+
+    def test_result_broken(self):
+        """Если пул сломался, пока страница ждала разбора, result() разбирает её сам"""
+        def submit(*args):
+            future = Future()
+            future.set_exception(BrokenProcessPool("обработчик упал"))
+            return future
+        pool = self.broken_pool(submit)
+        pending = pool.submit(PAGE.format(price=700).encode("utf-8"))
+        assert not pool.broken
+        assert pending.result()[0] == 700.0
+        assert pool.broken
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
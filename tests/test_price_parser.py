@@ -0,0 +1,204 @@
+"""
+Юнит-тесты для price_parser.py
+Проверяет, что быстрые уровни извлечения цены совпадают с BeautifulSoup
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from price_parser import (
+    parse_price, extract_price_fast, extract_price_lxml, extract_price_soup,
+    extract_price_regex, extract_price, path_pattern, SelectorStats, MIN_HITS,
+    REGEX_TIER, MetaPriceScanner, page_encoding,
+)
+
+PAGES = [
+    '<meta itemprop="price" content="1500.50">',
+    '<html><head><meta content="990" itemprop="price"/></head><body></body></html>',
+    "<html><head><meta itemprop='price' content='12 345,5'></head></html>",
+    '<meta itemprop="price" content=""><div class="price">700</div>',
+    '<meta itemprop="price" content="по запросу"><span class="current-price">от 800 Руб.</span>',
+    '<div class="price">2000</div>',
+    '<div class="price">3 500 ₽</div>',
+    '<div class="card price big"><span>4</span> <span>200</span>&nbsp;₽</div>',
+    '<div class="prices">1</div><div class="product-price">555</div>',
+    '<span itemprop="price">321</span>',
+    '<div class="price-value">77,70</div>',
+    '<div class="price">нет</div><div class="price-value">15</div>',
+    '<div>Товар без цены</div>',
+    '<!-- <meta itemprop="price" content="1"> --><meta itemprop="price" content="500">',
+    '<script>var tpl = \'<meta itemprop="price" content="7">\';</script><meta itemprop="price" content="500">',
+    '<STYLE>/* <meta itemprop="price" content="3"> */</STYLE><div class="price">500</div>',
+    '<div class="price">500</div><!-- <meta itemprop="price" content="1">',
+]
+
+# Мета-тег с ценой внутри комментария, <script> и <style>, за ним — настоящая цена
+HIDDEN_META_PAGE = (
+    b'<html><head><!-- <meta itemprop="price" content="1"> -->'
+    b'<script>var tpl = \'<meta itemprop="price" content="7">\';</script>'
+    b'<style>/* <meta itemprop="price" content="3"> */</style>'
+    b'<meta itemprop="price" content="500"></head>' + b'<p>' * 50
+)
+
+
+class TestPriceTiers:
+    """Все уровни дают тот же результат, что и BeautifulSoup"""
+
+    @pytest.mark.parametrize("html", PAGES)
+    def test_lxml_matches_soup(self, html):
+        """XPath-селекторы lxml эквивалентны CSS-селекторам BeautifulSoup"""
+        assert extract_price_lxml(html) == extract_price_soup(html)
+
+    @pytest.mark.parametrize("html", PAGES)
+    def test_fast_path_agrees(self, html):
+        """Быстрый путь либо молчит, либо совпадает с BeautifulSoup"""
+        fast = extract_price_fast(html)
+        assert fast is None or fast == extract_price_soup(html)
+
+    @pytest.mark.parametrize("html", PAGES)
+    def test_bytes_and_str(self, html):
+        """parse_price принимает и str, и bytes"""
+        assert parse_price(html) == parse_price(html.encode('utf-8'))
+
+    def test_fast_path_hits_meta(self):
+        """Мета-тег с ценой находится без разбора DOM"""
+        assert extract_price_fast(b'<meta name="x"><meta itemprop="price" content="42.5">') == 42.5
+        assert extract_price_fast(b'<meta itemprop="pricecurrency" content="RUB">') is None
+
+    def test_fast_path_skips_hidden_meta(self):
+        """Тег в комментарии, <script> и <style> не разметка — как для BeautifulSoup"""
+        assert extract_price_fast(HIDDEN_META_PAGE) == 500.0
+        assert extract_price_fast(b'<!-- <meta itemprop="price" content="1">') is None
+        assert extract_price_fast(b'<script><meta itemprop="price" content="7">') is None
+
+    def test_cp1251_page(self):
+        """Страница в windows-1251: кодировка из заголовка ответа или из <meta charset>"""
+        html = '<div class="price">1 500 Руб.</div>'.encode('cp1251')
+        assert parse_price(html, encoding='windows-1251') == 1500.0
+        assert parse_price(b'<meta charset="windows-1251">' + html) == 1500.0
+        text = 'Цена 4500 руб'.encode('cp1251')
+        assert parse_price(text, encoding='cp1251') == 4500.0
+        declared = b'<meta http-equiv="Content-Type" content="text/html; charset=windows-1251">' + text
+        assert parse_price(declared) == 4500.0
+
+    def test_page_encoding(self):
+        """Заголовок важнее <meta charset>; неизвестная кодировка — UTF-8"""
+        page = b'<meta charset="koi8-r"><p>x</p>'
+        assert page_encoding(page, 'windows-1251') == 'cp1251'
+        assert page_encoding(page) == 'koi8-r'
+        assert page_encoding(b'<p>x</p>') == 'utf-8'
+        assert page_encoding(b'<p>x</p>', 'no-such-charset') == 'utf-8'
+
+    def test_regex_fallback(self):
+        """Цена в тексте страницы"""
+        assert extract_price_regex('Цена товара: 4 500 руб') == 500.0
+        assert extract_price_regex(b'\xd0\xa6\xd0\xb5\xd0\xbd\xd0\xb0: 4500 \xe2\x82\xbd') == 4500.0
+
+    def test_unparseable_document(self):
+        """Пустой документ не роняет разбор"""
+        assert parse_price('') is None
+        assert parse_price('<?xml version="1.0" encoding="utf-8"?><div class="price">10</div>') == 10.0
+
+
+class TestMetaPriceScanner:
+    """Поиск мета-тега с ценой в теле, приходящем кусками"""
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 64])
+    def test_tag_split_across_chunks(self, size):
+        """Тег находится при любом разбиении на куски"""
+        page = b'<html><head><meta name="x"><meta itemprop="price" content="1500.50"></head>' + b'<p>' * 50
+        scanner = MetaPriceScanner()
+        found = False
+        for i in range(0, len(page), size):
+            found = scanner.feed(page[i:i + size])
+            if found:
+                break
+        assert found
+        assert bytes(scanner.buffer) == page[:len(scanner.buffer)]
+        assert extract_price_fast(bytes(scanner.buffer)) == 1500.50
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 64])
+    def test_hidden_meta_split_across_chunks(self, size):
+        """Тег в комментарии, <script> и <style> пропускается при любом разбиении"""
+        scanner = MetaPriceScanner()
+        found = False
+        for i in range(0, len(HIDDEN_META_PAGE), size):
+            found = scanner.feed(HIDDEN_META_PAGE[i:i + size])
+            if found:
+                break
+        assert found
+        assert extract_price_fast(bytes(scanner.buffer)) == 500.0
+        assert parse_price(bytes(scanner.buffer)) == 500.0
+
+    def test_no_tag(self):
+        """Без тега feed() возвращает False, тело копится в buffer"""
+        scanner = MetaPriceScanner()
+        assert not scanner.feed(b'<div class="price">')
+        assert not scanner.feed(b'700</div>')
+        assert bytes(scanner.buffer) == b'<div class="price">700</div>'
+
+    @pytest.mark.parametrize("content", ['""', '"по запросу"'])
+    def test_unparsed_content(self, content):
+        """Тег с пустым или нечисловым content не останавливает чтение: цена ниже по странице"""
+        scanner = MetaPriceScanner()
+        assert not scanner.feed(f'<meta itemprop="price" content={content}>'.encode('utf-8'))
+        assert not scanner.feed(b'<meta itemprop="price" content="100">')
+        assert not scanner.feed(b'<div class="price">700</div>')
+        assert parse_price(bytes(scanner.buffer)) == 700.0
+
+
+class TestSelectorStats:
+    """Тесты обучаемого порядка селекторов"""
+
+    URL = "https://example.com/catalog/turbo/123/?pid=5"
+
+    def test_path_pattern(self):
+        """Числа в пути заменяются, берутся два первых сегмента"""
+        assert path_pattern(self.URL) == "/catalog/turbo"
+        assert path_pattern("https://example.com/p/98765?pid=1") == "/p/#"
+        assert path_pattern("https://example.com/") == "/"
+
+    def test_extract_price_reports_tier(self):
+        """extract_price сообщает сработавший способ"""
+        assert extract_price('<meta itemprop="price" content="10">') == (10.0, 'meta[itemprop="price"]')
+        assert extract_price('<div class="product-price">20</div>') == (20.0, '.product-price')
+        assert extract_price('Цена: 30 руб') == (30.0, REGEX_TIER)
+        assert extract_price('<div>нет</div>') == (None, None)
+
+    def test_preferred_selector_is_tried_first(self):
+        """После MIN_HITS попаданий привычный селектор пробуется первым"""
+        html = '<div class="price">100</div><div class="price-value">200</div>'
+        stats = SelectorStats({"/catalog/turbo": {".price-value": MIN_HITS}})
+        assert parse_price(html) == 100.0
+        assert parse_price(html, self.URL, stats) == 200.0
+        assert stats.run_hits == {"/catalog/turbo": {".price-value": 1}}
+
+    def test_preferred_needs_min_hits(self):
+        """Редкие попадания ещё не меняют порядок"""
+        stats = SelectorStats({"/catalog/turbo": {".price-value": MIN_HITS - 1}})
+        assert stats.preferred("/catalog/turbo") is None
+
+    def test_drift_is_recorded(self):
+        """Смена селектора на шаблоне фиксируется как дрейф"""
+        stats = SelectorStats({"/catalog/turbo": {".price-value": MIN_HITS}})
+        parse_price('<div class="price">100</div>', self.URL, stats)
+        assert stats.drifts == {("/catalog/turbo", ".price-value", ".price"): 1}
+
+    def test_save_and_load(self, tmp_path):
+        """Статистика сохраняется между запусками"""
+        path = str(tmp_path / "state" / "stats.json")
+        stats = SelectorStats()
+        for _ in range(MIN_HITS):
+            parse_price('Цена: 30 руб', self.URL, stats)
+        stats.save(path)
+
+        loaded = SelectorStats.load(path)
+        assert loaded.preferred("/catalog/turbo") == REGEX_TIER
+        assert loaded.run_hits == {}
+        assert SelectorStats.load(str(tmp_path / "missing.json")).hits == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,132 @@
+"""
+Юнит-тесты для reconcile.py
+Проверяет нормализацию URL, множество ключей и сверку на локальном сервере
+"""
+import pytest
+import sys
+import os
+import re
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from reconcile import PRODUCT_PATTERN, reconcile
+from sitemaps import UrlKeySet, normalize_url, url_key
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def make_feed(urls):
+    offers = "".join(
+        f'<offer id="{i}"><url>{url}</url><price>100</price></offer>' for i, url in enumerate(urls)
+    )
+    return f'<yml_catalog><shop><offers>{offers}</offers></shop></yml_catalog>'.encode("utf-8")
+
+
+def make_urlset(urls):
+    body = "".join(f"<url><loc>{url}</loc></url>" for url in urls)
+    return f'<urlset {NS}>{body}</urlset>'.encode("utf-8")
+
+
+def make_index(urls):
+    body = "".join(f"<sitemap><loc>{url}</loc></sitemap>" for url in urls)
+    return f'<sitemapindex {NS}>{body}</sitemapindex>'.encode("utf-8")
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Отдаёт заранее заданные тела по пути; неизвестный путь — 404"""
+
+    pages = {}
+
+    def do_GET(self):
+        body = Handler.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestUrlKeys:
+    """Тесты нормализации и множества ключей"""
+
+    def test_normalize_url(self):
+        """Схема, фрагмент, регистр хоста, порядок параметров и завершающий / не влияют на ключ"""
+        assert normalize_url("https://Shop.RU/p/1/#top") == "shop.ru/p/1"
+        assert normalize_url("https://shop.ru/p?pid=5&b=2") == "shop.ru/p?b=2&pid=5"
+        assert url_key("https://shop.ru/p?pid=1") != url_key("https://shop.ru/p?pid=2")
+        assert url_key("http://shop.ru/p/1") == url_key("https://SHOP.ru/p/1/")
+        assert url_key("https://shop.ru/p/1") != url_key("https://shop.ru/p/2")
+        assert normalize_url("https://shop.ru") == "shop.ru/"
+
+    def test_key_set(self):
+        """Ключи сортируются, дубликаты отбрасываются"""
+        keys = UrlKeySet([5, 3, 5, 1, 3])
+        assert list(keys.keys) == [1, 3, 5]
+        assert len(keys) == 3
+        assert 3 in keys
+        assert 4 not in keys
+        assert 6 not in keys
+        assert 0 not in UrlKeySet()
+        assert keys.find(5) == 2 and keys.find(4) == -1
+
+    def test_key_set_add(self):
+        """Добавленные ключи сливаются в отсортированный массив без повторов"""
+        keys = UrlKeySet([10, 20], buffer_size=3)
+        assert [keys.add(key) for key in (15, 10, 5, 15, 25, 30)] == [True, False, True, False, True, True]
+        assert list(keys.keys) == [5, 10, 15, 20, 25]
+        assert 30 in keys and len(keys) == 6
+
+    def test_product_pattern(self):
+        """По умолчанию сверяются только карточки товаров с PID"""
+        assert re.search(PRODUCT_PATTERN, "https://shop.ru/turbo/item?pid=7")
+        assert re.search(PRODUCT_PATTERN, "https://shop.ru/item?a=1&pid=7")
+        assert not re.search(PRODUCT_PATTERN, "https://shop.ru/turbo/")
+        assert not re.search(PRODUCT_PATTERN, "https://shop.ru/news/1?rapid=2")
+
+
+class TestReconcile:
+    """Сверка прайса с sitemap через локальный HTTP-сервер"""
+
+    def test_reports_both_directions(self, server, tmp_path, monkeypatch):
+        """Находит товары без sitemap и страницы sitemap без товара (каждую один раз)"""
+        monkeypatch.chdir(tmp_path)
+        Handler.pages = {
+            "/feed.xml": make_feed([
+                "https://shop.ru/p/1", "https://shop.ru/p/2/", "https://shop.ru/p/3", "https://shop.ru/p/3",
+                "https://shop.ru/item?pid=7",
+            ]),
+            "/sitemap.xml": make_index([server + "/nested.xml", server + "/missing.xml"]),
+            "/nested.xml": make_index([server + "/products.xml", server + "/more.xml"]),
+            "/products.xml": make_urlset([
+                "https://shop.ru/p/1", "https://shop.ru/p/2", "https://shop.ru/p/9", "https://shop.ru/news/1",
+                "https://shop.ru/item?pid=7", "https://shop.ru/item?pid=8", "https://shop.ru/p/9/",
+            ]),
+            "/more.xml": make_urlset(["https://shop.ru/p/9", "https://shop.ru/item?pid=8", "https://shop.ru/p/1"]),
+        }
+
+        filename, stats = reconcile(server + "/feed.xml", server + "/sitemap.xml",
+                                    product_pattern=r"/p/\d+|pid=", workers=2, use_http_cache=False)
+
+        assert stats["feed_urls"] == 4
+        assert stats["sitemap_urls"] == 5
+        assert stats["sitemap_files"] == 5
+        assert stats["failed_files"] == 1
+        assert stats["missing_in_sitemap"] == 1
+        assert stats["orphans_in_sitemap"] == 2
+        with open(filename, encoding="utf-8") as f:
+            report = f.read()
+        assert report.count("https://shop.ru/p/9") == 1
+        assert report.count("pid=8") == 1
+        assert "pid=7" not in report
+        assert report.count("https://shop.ru/p/3") == 1
+        assert "news" not in report
+        assert "missing.xml" in report
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
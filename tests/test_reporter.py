@@ -0,0 +1,95 @@
+"""
+Юнит-тесты для reporter.py
+Проверяет потоковый журнал результатов и JUnit XML
+"""
+import pytest
+import sys
+import os
+import csv
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from reporter import ResultLog, read_results, write_junit
+
+RESULTS = [
+    (1000.0, "https://example.com/p?pid=1", 1000.0, "OK"),
+    (2000.0, "https://example.com/p?pid=2&a=<b>", 2500.0, "DIFF_500"),
+    (3000.0, "https://example.com/p?pid=3", None, "TIMEOUT"),
+    (4000.0, "https://example.com/p?pid=4", None, "HTTP_404"),
+]
+
+
+class TestResultLog:
+    """Тесты ResultLog"""
+
+    def test_counters_and_reread(self, tmp_path):
+        """Счётчики по статусам; журнал перечитывается с диска"""
+        log = ResultLog.from_results(str(tmp_path / "run"), RESULTS)
+        assert (len(log), log.correct, log.error_count, log.transient_count) == (4, 1, 2, 1)
+        assert list(log) == RESULTS
+        assert list(log) == RESULTS
+        assert list(log.errors) == [
+            ("https://example.com/p?pid=2&a=<b>", 2000.0, 2500.0, "DIFF_500"),
+            ("https://example.com/p?pid=4", 4000.0, None, "HTTP_404"),
+        ]
+        with open(log.csv_path, encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["price_csv", "url", "price_site", "status"]
+        assert len(rows) == 5
+
+    def test_flush_every(self, tmp_path):
+        """Записи сбрасываются на диск каждые flush_every товаров, до закрытия"""
+        log = ResultLog(str(tmp_path / "run"), flush_every=2)
+        for result in RESULTS[:3]:
+            log.append(result)
+        with open(log.path, encoding="utf-8") as f:
+            assert len(f.readlines()) == 2
+        log.close()
+
+    def test_truncated_last_line_is_skipped(self, tmp_path):
+        """Журнал прерванного прогона читается без недописанной строки"""
+        log = ResultLog.from_results(str(tmp_path / "run"), RESULTS[:2])
+        with open(log.path, "a", encoding="utf-8") as f:
+            f.write('{"price_csv": 1.0, "url": "https://exa')
+        assert len(list(read_results(log.path))) == 2
+
+    def test_resume_truncates_and_appends(self, tmp_path):
+        """Записи после контрольной точки отбрасываются, счётчики восстанавливаются"""
+        base = str(tmp_path / "run")
+        log = ResultLog(base)
+        log.append(RESULTS[0])
+        sizes = log.checkpoint()
+        log.append(RESULTS[1])
+        log.close()
+
+        log = ResultLog(base, resume_from=sizes)
+        assert (len(log), log.correct, log.error_count) == (1, 1, 0)
+        log.append(RESULTS[3])
+        log.close()
+        assert list(log) == [RESULTS[0], RESULTS[3]]
+        with open(log.csv_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert lines[0] == "price_csv,url,price_site,status"
+        assert len(lines) == 3 and "pid=2" not in "".join(lines)
+
+
+class TestJunit:
+    """Тесты write_junit"""
+
+    def test_junit_structure(self, tmp_path):
+        """Расхождения — failure, временные ошибки — skipped"""
+        path = write_junit(RESULTS, str(tmp_path / "run.junit.xml"), 12.5)
+        suite = ET.parse(path).getroot().find("testsuite")
+        assert suite.get("tests") == "4"
+        assert suite.get("failures") == "2"
+        assert suite.get("skipped") == "1"
+        cases = suite.findall("testcase")
+        assert cases[1].get("name") == "https://example.com/p?pid=2&a=<b>"
+        assert cases[1].find("failure").get("type") == "DIFF_500"
+        assert cases[2].find("skipped") is not None
+        assert cases[0].find("failure") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,66 @@
+"""
+Юнит-тесты для result_store.py
+Проверяет сохранение результатов и выбор товаров для инкрементальной проверки
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from result_store import ResultStore, CheckRecord
+
+URL = "https://example.com/p?pid=1"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"), ttl_hours=1)
+    yield store
+    store.close()
+
+
+class TestResultStore:
+    """Тесты ResultStore"""
+
+    def test_record_and_get(self, store):
+        """Последний результат перезаписывает предыдущий"""
+        store.record_many([(100.0, URL, 90.0, "DIFF_10")], now=1000.0)
+        store.record_many([(100.0, URL, 100.0, "OK")], now=2000.0)
+        assert store.get(URL) == CheckRecord(URL, 100.0, 100.0, "OK", 2000.0)
+        assert store.get("https://example.com/p?pid=2") is None
+        assert len(store) == 1
+
+    def test_needs_check(self, store):
+        """Перепроверяются новые, изменившиеся, неуспешные и устаревшие товары"""
+        assert store.needs_check(URL, 100.0)
+        store.record_many([(100.0, URL, 100.0, "OK")], now=1000.0)
+        assert not store.needs_check(URL, 100.0, now=1000.0 + 1800)
+        assert store.needs_check(URL, 150.0, now=1000.0 + 1800)
+        assert store.needs_check(URL, 100.0, now=1000.0 + 3601)
+        store.record_many([(100.0, URL, None, "TIMEOUT")], now=1000.0)
+        assert store.needs_check(URL, 100.0, now=1000.0)
+
+    def test_get_many(self, store):
+        """Пакетный запрос возвращает только проверенные товары, в том числе больше одной порции"""
+        urls = [f"https://example.com/p?pid={n}" for n in range(1200)]
+        store.record_many([(1.0, url, 1.0, "OK") for url in urls[::2]], now=1000.0)
+        records = store.get_many(urls)
+        assert len(records) == 600
+        assert records[urls[10]] == CheckRecord(urls[10], 1.0, 1.0, "OK", 1000.0)
+        assert urls[11] not in records
+        assert store.get_many([]) == {}
+
+    def test_persists_between_instances(self, tmp_path):
+        """Данные переживают переоткрытие базы"""
+        path = str(tmp_path / "results.sqlite3")
+        first = ResultStore(path)
+        first.record_many([(100.0, URL, 100.0, "OK")])
+        first.close()
+        second = ResultStore(path)
+        assert not second.needs_check(URL, 100.0)
+        second.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,66 @@
+"""
+Юнит-тесты для robots.py
+Проверяет разбор Crawl-delay из robots.txt
+"""
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from robots import crawl_delay_callback, parse_crawl_delay
+
+ROBOTS = """
+# Комментарий
+User-agent: Yandex
+Crawl-delay: 0.5
+Disallow: /search
+
+User-agent: Googlebot
+User-agent: *
+Disallow: /admin
+Crawl-delay: 2 # секунды
+"""
+
+
+class TestCrawlDelay:
+    """Тесты parse_crawl_delay"""
+
+    def test_default_group(self):
+        """Для неизвестного агента берётся группа *"""
+        assert parse_crawl_delay(ROBOTS) == 2.0
+        assert parse_crawl_delay(ROBOTS, "Mozilla/5.0 (Windows NT 10.0)") == 2.0
+
+    def test_specific_group(self):
+        """Группа по имени агента важнее группы * (дробные значения допустимы)"""
+        assert parse_crawl_delay(ROBOTS, "YandexBot/3.0") == 0.5
+        assert parse_crawl_delay(ROBOTS, "Googlebot/2.1") == 2.0
+
+    def test_missing_or_invalid(self):
+        """Нет директивы или значение не число — None"""
+        assert parse_crawl_delay("User-agent: *\nDisallow: /") is None
+        assert parse_crawl_delay("User-agent: *\nCrawl-delay: скоро") is None
+        assert parse_crawl_delay("") is None
+
+
+class TestCrawlDelayCallback:
+    """Тесты crawl_delay_callback"""
+
+    def test_reports_limit(self, capsys):
+        """Задержка берётся из robots.txt хоста url, лимит — не больше max_rate"""
+        with patch("robots.fetch_crawl_delay", return_value=0.5) as mock_delay:
+            crawl_delay = crawl_delay_callback("agent", http="http", max_rate=1.0)
+            assert crawl_delay("https://cdn.shop.ru/p/1") == 0.5
+        mock_delay.assert_called_once_with("https://cdn.shop.ru/p/1", "agent", "http")
+        assert "robots.txt cdn.shop.ru: Crawl-delay 0.5 сек, не больше 1.00 запросов/сек" in capsys.readouterr().out
+
+    def test_no_delay_silent(self, capsys):
+        """Без Crawl-delay ничего не печатается"""
+        with patch("robots.fetch_crawl_delay", return_value=None):
+            assert crawl_delay_callback()("https://shop.ru/") is None
+        assert capsys.readouterr().out == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
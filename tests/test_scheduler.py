@@ -0,0 +1,87 @@
+"""
+Юнит-тесты для scheduler.py
+Проверяет вес товаров и отбор по приоритету с учётом истории проверок
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from feed import Offer
+from result_store import ResultStore
+from scheduler import CheckScheduler, status_group
+
+NOW = 1_000_000.0
+HOUR = 3600.0
+
+
+def make_offer(pid, price):
+    return Offer(price, f"https://example.com/p?pid={pid}", str(pid), "true", None, None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    yield store
+    store.close()
+
+
+class TestScore:
+    """Вес товара"""
+
+    def test_status_group(self):
+        """Статусы проверки сводятся к группам весов"""
+        assert status_group("OK") == "OK"
+        assert status_group("DIFF_500") == "DIFF"
+        assert status_group("PRICE_NOT_FOUND") == "PRICE_NOT_FOUND"
+        assert status_group("HTTP_503") == "RETRY"
+        assert status_group("HTTP_404") == "ERROR"
+
+    def test_price_magnitude(self):
+        """Без истории дорогой товар важнее дешёвого"""
+        scheduler = CheckScheduler(jitter=0, now=NOW)
+        bolt, turbo = make_offer(1, 50.0), make_offer(2, 300_000.0)
+        assert scheduler.select([bolt, turbo], 1) == [turbo]
+        assert scheduler.select([bolt, turbo], 5) == [turbo, bolt]
+
+    def test_history(self, store):
+        """Прошлое расхождение, изменение цены и давность поднимают товар выше дорогого без проблем"""
+        offers = [make_offer(n, 10_000.0) for n in range(6)]
+        store.record_many([(o.price, o.url, o.price, "OK") for o in offers], now=NOW - HOUR)
+        store.record_many([(10_000.0, offers[1].url, 10_600.0, "DIFF_600")], now=NOW - HOUR)
+        store.record_many([(5_000.0, offers[2].url, 5_000.0, "OK")], now=NOW - HOUR)
+        store.record_many([(10_000.0, offers[3].url, 10_000.0, "OK")], now=NOW - 100 * HOUR)
+        expensive = make_offer(9, 100_000.0)
+        store.record_many([(expensive.price, expensive.url, expensive.price, "OK")], now=NOW - HOUR)
+
+        scheduler = CheckScheduler(store, stale_hours=72, jitter=0, now=NOW)
+        selected = scheduler.select(offers + [expensive], 3)
+        assert selected == [offers[1], offers[2], offers[3]]
+
+    def test_never_checked_first(self, store):
+        """Непроверенный товар важнее недавно проверенного успешно той же цены"""
+        checked, new = make_offer(1, 1000.0), make_offer(2, 1000.0)
+        store.record_many([(checked.price, checked.url, checked.price, "OK")], now=NOW)
+        assert CheckScheduler(store, jitter=0, now=NOW).select([checked, new], 1) == [new]
+
+
+class TestSelect:
+    """Отбор кучей"""
+
+    def test_top_budget(self):
+        """Отбираются budget товаров с наибольшей ценой, по убыванию; поток читается один раз"""
+        prices = [(n * 7919) % 100_000 + 1.0 for n in range(5000)]
+        offers = (make_offer(n, price) for n, price in enumerate(prices))
+        selected = CheckScheduler(jitter=0, now=NOW).select(offers, 10)
+        assert [o.price for o in selected] == sorted(prices, reverse=True)[:10]
+
+    def test_small_feed_and_zero_budget(self):
+        """Товаров меньше бюджета — берутся все; нулевой бюджет — ничего"""
+        offers = [make_offer(n, 100.0) for n in range(3)]
+        assert len(CheckScheduler(now=NOW).select(offers, 20)) == 3
+        assert CheckScheduler(now=NOW).select(offers, 0) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
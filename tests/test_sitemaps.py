@@ -5,9 +5,9 @@
 import pytest
 import sys
 import os
-import urllib.request
 from xml.etree import ElementTree as ET
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch, MagicMock
 
 # Импортируем модуль check_sitemaps
 sitemap_dir = os.path.join(os.path.dirname(__file__), 'sitemap')
@@ -18,6 +18,13 @@ spec = importlib.util.spec_from_file_location("check_sitemaps", check_sitemaps_p
 check_sitemaps = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(check_sitemaps)
 
+# Общий HTTP-клиент (модуль из корня репозитория, путь добавлен в check_sitemaps)
+import http_client
+from cassette import use_cassette
+
+# Записанные ответы robots.txt и sitemap-файлов (cassette.record_site)
+CASSETTE_PATH = os.path.join(os.path.dirname(__file__), "cassettes", "shop.jsonl.gz")
+
 # Импортируем необходимые константы и функции
 BASE_URL = check_sitemaps.BASE_URL
 SITEMAP_INDEX_URL = check_sitemaps.SITEMAP_INDEX_URL
@@ -28,6 +35,9 @@ check_robots_txt = check_sitemaps.check_robots_txt
 parse_sitemap_index = check_sitemaps.parse_sitemap_index
 get_lastmod_from_sitemap = check_sitemaps.get_lastmod_from_sitemap
 check_sitemap_freshness = check_sitemaps.check_sitemap_freshness
+scan_sitemap_stream = check_sitemaps.scan_sitemap_stream
+parse_lastmod = check_sitemaps.parse_lastmod
+crawl_sitemaps = check_sitemaps.crawl_sitemaps
 
 
 class TestRobotsTxt:
@@ -37,8 +47,8 @@ class TestRobotsTxt:
     def test_robots_txt_accessible(self):
         """Проверка доступности robots.txt"""
         try:
-            with urllib.request.urlopen(ROBOTS_URL, timeout=10) as resp:
-                assert resp.getcode() == 200
+            with http_client.get(ROBOTS_URL, timeout=10) as resp:
+                assert resp.status_code == 200
         except Exception as e:
             pytest.fail(f"robots.txt недоступен: {e}")
     
@@ -46,8 +56,8 @@ class TestRobotsTxt:
     def test_robots_txt_content(self):
         """Проверка содержимого robots.txt"""
         try:
-            with urllib.request.urlopen(ROBOTS_URL, timeout=10) as resp:
-                content = resp.read().decode('utf-8')
+            with http_client.get(ROBOTS_URL, timeout=10) as resp:
+                content = resp.content.decode('utf-8')
                 assert len(content) > 0
                 # Проверяем наличие упоминания sitemap
                 assert 'sitemap' in content.lower()
@@ -105,8 +115,8 @@ class TestSitemapFiles:
         
         for url in sitemap_urls[:5]:  # Ограничиваем для скорости тестов
             try:
-                with urllib.request.urlopen(url, timeout=10) as resp:
-                    assert resp.getcode() == 200, f"{url} вернул статус {resp.getcode()}"
+                with http_client.get(url, timeout=10) as resp:
+                    assert resp.status_code == 200, f"{url} вернул статус {resp.status_code}"
             except Exception as e:
                 failed_urls.append((url, str(e)))
         
@@ -140,12 +150,52 @@ class TestSitemapFiles:
             pytest.fail(f"Невалидные XML в sitemap-файлах: {failed_urls}")
 
 
+@pytest.fixture
+def cassette(monkeypatch):
+    """Ответы сайта из кассеты; robots.txt и текущая дата — как при записи"""
+    with use_cassette(CASSETTE_PATH) as cassette:
+        site = cassette.meta["sitemap_url"].rsplit("/", 1)[0]
+        monkeypatch.setattr(check_sitemaps, "ROBOTS_URL", f"{site}/robots.txt")
+        # Актуальность sitemap проверяется на момент записи кассеты
+        recorded_at = datetime.fromisoformat(cassette.meta["recorded_at"])
+
+        class RecordedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return recorded_at
+
+        monkeypatch.setattr(check_sitemaps, "datetime", RecordedDatetime)
+        yield cassette
+
+
+class TestSitemapsReplay:
+    """Быстрые аналоги интеграционных тестов на записанных ответах (без сети)"""
+
+    def test_robots_txt(self, cassette):
+        """robots.txt доступен и ссылается на sitemap"""
+        check_robots_txt()
+        with http_client.get(check_sitemaps.ROBOTS_URL) as response:
+            assert response.status_code == 200
+            assert "sitemap" in response.text.lower()
+        assert not cassette.misses
+
+    def test_sitemap_files_freshness(self, cassette):
+        """Индекс разбирается, дочерние sitemap-файлы доступны и актуальны"""
+        root = fetch_xml(cassette.meta["sitemap_url"])
+        assert root is not None
+        sitemap_urls = parse_sitemap_index(root)
+        assert sitemap_urls
+        assert all(check_sitemap_freshness(url) for url in sitemap_urls)
+        assert all(ok for _, ok, _ in crawl_sitemaps(sitemap_urls, workers=4))
+        assert not cassette.misses
+
+
 class TestSitemapFunctions:
-    """Тесты для вспомогательных функций"""
+    """Тесты для вспомогательных функций (на записанных ответах)"""
     
-    def test_parse_sitemap_index(self):
+    def test_parse_sitemap_index(self, cassette):
         """Тест парсинга индекса sitemap"""
-        root = fetch_xml(SITEMAP_INDEX_URL)
+        root = fetch_xml(cassette.meta["sitemap_url"])
         if root is None:
             pytest.skip("Не удалось загрузить sitemap.xml")
         
@@ -154,9 +204,9 @@ class TestSitemapFunctions:
         for url in urls:
             assert url.startswith('http')
     
-    def test_get_lastmod_from_sitemap(self):
+    def test_get_lastmod_from_sitemap(self, cassette):
         """Тест извлечения lastmod из sitemap"""
-        root = fetch_xml(SITEMAP_INDEX_URL)
+        root = fetch_xml(cassette.meta["sitemap_url"])
         if root is None:
             pytest.skip("Не удалось загрузить sitemap.xml")
         
@@ -177,5 +227,123 @@ class TestSitemapFunctions:
             assert lastmod.tzinfo is not None
 
 
+def make_urlset(lastmods):
+    """Синтетический sitemap с заданными датами lastmod (None — без даты)"""
+    entries = []
+    for i, lastmod in enumerate(lastmods):
+        lastmod_xml = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+        entries.append(f"<url><loc>https://example.com/p/{i}</loc>{lastmod_xml}</url>")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        + "".join(entries) + "</urlset>"
+    ).encode("utf-8")
+
+
+def fake_response(body, status_code=200):
+    """Ответ http_get с потоковым телом"""
+    response = MagicMock(status_code=status_code)
+    response.__enter__.return_value = response
+    response.iter_content.side_effect = lambda size: (body[i:i + size] for i in range(0, len(body), size))
+    return response
+
+
+class TestSitemapStreaming:
+    """Юнит-тесты потоковой проверки sitemap-файла (без сети)"""
+
+    def test_parse_lastmod(self):
+        """Даты с Z, со смещением и без часового пояса"""
+        assert parse_lastmod("2026-01-02T03:04:05Z") == datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        assert parse_lastmod("2026-01-02").tzinfo is not None
+        assert parse_lastmod("вчера") is None
+
+    def test_scan_finds_max_lastmod_and_counts(self):
+        """Один проход находит самую свежую дату и считает url"""
+        body = make_urlset(["2026-01-01", None, "2026-03-01T10:00:00+03:00", "мусор", "2026-02-01"])
+        chunks = (body[i:i + 17] for i in range(0, len(body), 17))
+        lastmod, url_count, children = scan_sitemap_stream(chunks)
+        assert children == []
+        assert url_count == 5
+        assert lastmod == datetime(2026, 3, 1, 7, 0, tzinfo=timezone.utc)
+
+    def test_scan_matches_tree_parser(self):
+        """Результат совпадает с разбором через полное дерево"""
+        body = make_urlset(["2025-12-31", "2026-01-15T00:00:00Z"])
+        assert scan_sitemap_stream([body])[0] == get_lastmod_from_sitemap(ET.fromstring(body))
+
+    def test_freshness_single_download(self):
+        """Свежий sitemap скачивается ровно один раз"""
+        fresh = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        with patch.object(check_sitemaps, "http_get", return_value=fake_response(make_urlset([fresh]))) as mock_get:
+            assert check_sitemap_freshness("https://example.com/sitemap1.xml")
+        assert mock_get.call_count == 1
+
+    def test_freshness_stale_and_errors(self):
+        """Устаревший файл, ошибка статуса и битый XML"""
+        with patch.object(check_sitemaps, "http_get", return_value=fake_response(make_urlset(["2000-01-01"]))):
+            assert not check_sitemap_freshness("https://example.com/old.xml")
+        with patch.object(check_sitemaps, "http_get", return_value=fake_response(b"", status_code=404)):
+            assert not check_sitemap_freshness("https://example.com/missing.xml")
+        with patch.object(check_sitemaps, "http_get", return_value=fake_response(b"<urlset><url>")):
+            assert not check_sitemap_freshness("https://example.com/broken.xml")
+
+
+def make_index(urls):
+    """Синтетический индекс sitemap со ссылками на urls"""
+    entries = "".join(f"<sitemap><loc>{url}</loc></sitemap>" for url in urls)
+    return (
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' + entries + "</sitemapindex>"
+    ).encode("utf-8")
+
+
+class TestSitemapCrawler:
+    """Юнит-тесты параллельного обхода sitemap-файлов (без сети)"""
+
+    FRESH = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    def site(self):
+        """a.xml и c.xml — файлы, nested.xml — индекс с b.xml, a.xml и d.xml (устарел)"""
+        return {
+            "https://example.com/a.xml": make_urlset([self.FRESH]),
+            "https://example.com/nested.xml": make_index([
+                "https://example.com/b.xml", "https://example.com/a.xml", "https://example.com/d.xml",
+            ]),
+            "https://example.com/b.xml": make_urlset([self.FRESH, self.FRESH]),
+            "https://example.com/c.xml": make_urlset([self.FRESH]),
+            "https://example.com/d.xml": make_urlset(["2000-01-01"]),
+        }
+
+    def test_nested_index_order(self):
+        """Вложенный индекс раскрывается, порядок — обход в глубину, без повторов"""
+        site = self.site()
+        with patch.object(check_sitemaps, "http_get", side_effect=lambda url, stream=False: fake_response(site[url])):
+            results = crawl_sitemaps([
+                "https://example.com/a.xml", "https://example.com/nested.xml", "https://example.com/c.xml",
+            ], workers=3)
+
+        assert [url.rsplit("/", 1)[1] for url, _, _ in results] == ["a.xml", "nested.xml", "b.xml", "d.xml", "c.xml"]
+        assert [ok for _, ok, _ in results] == [True, True, True, False, True]
+        assert "вложенный индекс, sitemap-файлов: 3" in results[1][2]
+        assert results[3][2].startswith("[WARN]")
+
+    def test_max_depth(self):
+        """Индексы глубже max_depth не раскрываются"""
+        site = self.site()
+        with patch.object(check_sitemaps, "http_get", side_effect=lambda url, stream=False: fake_response(site[url])):
+            results = crawl_sitemaps(["https://example.com/nested.xml"], max_depth=0)
+        assert len(results) == 1
+
+    def test_crawl_index_children_after_processing(self):
+        """sitemaps.crawl_index берёт вложенные файлы после обработки результата"""
+        from sitemaps import crawl_index
+
+        tree = {"root": ["a", "b"], "a": ["b", "c"], "b": [], "c": ["d"], "d": []}
+        visited = []
+        for url, children in crawl_index(["root"], lambda url: [], lambda children: children, max_depth=2):
+            visited.append(url)
+            children.extend(tree[url])  # Заполняются уже после загрузки
+        assert visited == ["root", "a", "b", "c"]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "-m", "integration"])
@@ -0,0 +1,82 @@
+"""
+Юнит-тесты для timing.py
+Проверяет гистограммы фиксированных корзин и перцентили
+"""
+import pytest
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from timing import Histogram, RequestTimings, Timings, BUCKET_BOUNDS_MS, BUCKET_RATIO, MAX_BOUND_MS
+
+
+class TestHistogram:
+    """Тесты Histogram"""
+
+    def test_percentiles_within_bucket_width(self):
+        """Перцентиль не меньше точного значения и не больше него на ширину корзины"""
+        histogram = Histogram()
+        samples = [ms / 1000.0 for ms in range(1, 1001)]
+        for seconds in samples:
+            histogram.record(seconds)
+        for q, exact in ((50, 500), (95, 950), (99, 990)):
+            assert exact <= histogram.percentile(q) <= exact * BUCKET_RATIO
+        assert histogram.count == 1000
+        assert histogram.max_ms == pytest.approx(1000.0)
+        assert histogram.mean_ms == pytest.approx(500.5)
+
+    def test_percentile_capped_by_max(self):
+        """Оценка не превышает наибольший замер, в том числе за последней корзиной"""
+        histogram = Histogram()
+        histogram.record(0.0101)
+        assert histogram.percentile(99) == pytest.approx(10.1)
+        histogram.record(MAX_BOUND_MS / 1000.0 * 2)
+        assert histogram.percentile(99) == pytest.approx(MAX_BOUND_MS * 2)
+        assert Histogram().percentile(50) is None
+
+    def test_bounds_are_geometric(self):
+        """Границы корзин возрастают"""
+        assert BUCKET_BOUNDS_MS == sorted(BUCKET_BOUNDS_MS)
+        assert BUCKET_BOUNDS_MS[-1] == MAX_BOUND_MS
+
+
+class TestTimings:
+    """Тесты Timings"""
+
+    def test_concurrent_record_and_summary(self):
+        """Замеры из нескольких потоков не теряются; сводка по заданным фазам"""
+        timings = Timings()
+
+        def work():
+            for _ in range(1000):
+                timings.record("ответ", 0.05)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with timings.measure("разбор"):
+            pass
+
+        assert timings.histograms["ответ"].count == 4000
+        lines = timings.summary_lines(("ответ", "тело", "разбор"))
+        assert len(lines) == 2
+        assert lines[0].startswith("ответ: 4000 запросов, p50: 50")
+
+    def test_request_timings(self):
+        """Фазы пишутся в общие замеры, сумма — только по выбранным фазам"""
+        timings = Timings()
+        request = RequestTimings(timings, ("ответ", "тело"))
+        assert request.seconds is None
+        request.record("ответ", 0.2)
+        request.record("тело", 0.1)
+        request.record("разбор", 5.0)
+        assert request.seconds == pytest.approx(0.3)
+        assert sorted(timings.histograms) == sorted(["ответ", "тело", "разбор"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,122 @@
+"""
+Замеры времени по фазам запроса с гистограммами фиксированных корзин.
+Корзины растут геометрически (шаг 25%) от 1 мс до 2 минут, поэтому запись
+замера — O(log корзин) и постоянная память, а перцентили p50/p95/p99
+оцениваются с точностью до ширины корзины.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKET_RATIO = 1.25
+MIN_BOUND_MS = 1.0
+MAX_BOUND_MS = 120_000.0
+PERCENTILES = (50, 95, 99)
+
+
+def _bucket_bounds():
+    bounds = []
+    bound = MIN_BOUND_MS
+    while bound < MAX_BOUND_MS:
+        bounds.append(round(bound, 3))
+        bound *= BUCKET_RATIO
+    bounds.append(MAX_BOUND_MS)
+    return bounds
+
+
+BUCKET_BOUNDS_MS = _bucket_bounds()
+
+
+class Histogram:
+    """
+    Гистограмма длительностей: counts[i] — замеры не больше BUCKET_BOUNDS_MS[i]
+    (последняя корзина — всё, что дольше MAX_BOUND_MS).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q):
+        """Верхняя граница корзины, в которую попадает q-й перцентиль, мс (не больше максимума)"""
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                bound = BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else None
+
+
+class Timings:
+    """
+    Гистограммы по названиям фаз. Потокобезопасен: запись под общей блокировкой.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self.lock:
+            histogram = self.histograms.get(phase)
+            if histogram is None:
+                histogram = self.histograms[phase] = Histogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def measure(self, phase):
+        """Замеряет длительность блока with как фазу phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def summary_lines(self, phases=None):
+        """Строки отчёта: число замеров, p50/p95/p99, среднее и максимум по каждой фазе, мс"""
+        lines = []
+        with self.lock:
+            names = phases or sorted(self.histograms)
+            for name in names:
+                histogram = self.histograms.get(name)
+                if histogram is None or not histogram.count:
+                    continue
+                quantiles = ", ".join(f"p{q}: {histogram.percentile(q):.0f}" for q in PERCENTILES)
+                lines.append(f"{name}: {histogram.count} запросов, {quantiles}, "
+                             f"среднее: {histogram.mean_ms:.0f}, макс: {histogram.max_ms:.0f}")
+        return lines
+
+
+class RequestTimings:
+    """
+    Замеры одного запроса: record() пишет фазу в общие timings и суммирует
+    в seconds длительности фаз из phases (None, пока ни одной не было).
+    """
+
+    def __init__(self, timings, phases):
+        self.timings = timings
+        self.phases = frozenset(phases)
+        self.seconds = None
+
+    def record(self, phase, seconds):
+        self.timings.record(phase, seconds)
+        if phase in self.phases:
+            self.seconds = (self.seconds or 0.0) + seconds